@@ -1,4 +1,13 @@
 from acquisitioncontrol.acqcontrol import AcquisitionControl
-from acquisitioncontrol.acqgui import AcquisitionGUI
-from acquisitioncontrol.pyqtGUI import MainWindow
-# from simulation import DummyMicroscope
\ No newline at end of file
+# from simulation import DummyMicroscope
+
+
+def __getattr__(name):
+    '''The Tk and Qt GUIs are imported on first use, so headless and CLI runs do not load the GUI toolkits.'''
+    if name == 'AcquisitionGUI':
+        from acquisitioncontrol.acqgui import AcquisitionGUI
+        return AcquisitionGUI
+    if name == 'MainWindow':
+        from acquisitioncontrol.pyqtGUI import MainWindow
+        return MainWindow
+    raise AttributeError(f"module 'acquisitioncontrol' has no attribute '{name}'")
@@ -2,21 +2,55 @@ import os
 import time
 import json
 import numpy as np
-import tkinter as tk
 
 import numpy as np
 import math
+import itertools
 
+import io
 import traceback
 
+from tracing import ScanTracer
+from acquisitioncontrol.scanplan import ScanPlan
+from acquisitioncontrol.timing import ScanTimingDatabase, ScanDurationEstimator
+from acquisitioncontrol.journal import ScanJournal
+from acquisitioncontrol.progress import ScanProgressBus, callback_subscriber
+
+
+def format_duration(seconds):
+    '''Converts a duration in seconds to a (value, units) pair using seconds, minutes or hours as appropriate.'''
+    if 3600 > seconds >= 600:
+        return seconds / 60, 'minutes'
+    elif seconds >= 3600:
+        return seconds / 3600, 'hours'
+    return seconds, 'seconds'
+
+
 class ScanSequenceGenerator:
 
-    def __init__(self, acq_ctrl):
+    # Map scan axes, listed outermost to innermost in the default nesting order.
+    MAP_AXES = ('wavelength', 'polarization', 'y', 'x')
+
+    # Seconds spent changing each axis by one step. Used until measured costs are supplied.
+    DEFAULT_AXIS_CHANGE_COSTS = {
+        'wavelength': 10.0,
+        'polarization': 2.0,
+        'y': 0.5,
+        'x': 0.5,
+    }
+
+    def __init__(self, acq_ctrl, axis_change_costs=None):
         self.acq_ctrl = acq_ctrl
         self.scan_mode = acq_ctrl.scan_mode
         self.motion_parameters = acq_ctrl.motion_parameters
         self.wavelength_parameters = acq_ctrl.wavelength_parameters
         self.polarization_parameters = acq_ctrl.polarization_parameters
+        self.adaptive_parameters = acq_ctrl.adaptive_parameters
+
+        if axis_change_costs is None:
+            axis_change_costs = getattr(acq_ctrl, 'axis_change_costs', {})
+        self.axis_change_costs = dict(self.DEFAULT_AXIS_CHANGE_COSTS)
+        self.axis_change_costs.update(axis_change_costs)
 
     def _generate_array(self, start, end, step):
         """
@@ -31,49 +65,79 @@ class ScanSequenceGenerator:
             print(f"Error generating array from {start} to {end} step {step}: {e}")
             return [start]
 
-    def generate_map_sequence(self):
+    def _map_axis_values(self):
         """
-        Build a 3D map scan sequence over X, Y with varying polarization and wavelength.
+        Return a dict of axis name to the list of values visited along that axis in a map scan.
         Uses X resolution for both X and Y as a temporary workaround.
-        Returns list of [position, polarization, wavelength] entries, with None for unchanged values.
         """
-        # Unpack parameters
         wl_params = self.wavelength_parameters
         pol_params = self.polarization_parameters['input']
         motion = self.motion_parameters
-        z0 = motion['start_position']['z']
         x_res = motion['resolution']['x']
         y_res = x_res  # workaround: use X resolution for Y
 
-        # Generate axes
-        wl_list = self._generate_array(wl_params['start_wavelength'], wl_params['end_wavelength'], wl_params['resolution'])
-        pol_list = self._generate_array(pol_params['start_angle'], pol_params['end_angle'], pol_params['resolution'])
-        x_list = self._generate_array(motion['start_position']['x'], motion['end_position']['x'], x_res)
-        y_list = self._generate_array(motion['start_position']['y'], motion['end_position']['y'], y_res)
-
-        sequence = []
-        prev = [None, None, None]
-
-        for wl in wl_list:
-            for pol in pol_list:
-                for y in y_list:
-                    for x in x_list:
-                        pos = [x, y, z0]
-                        entry = [
-                            pos   if pos != prev[0] else None,
-                            pol   if pol != prev[1] else None,
-                            wl    if wl  != prev[2] else None
-                        ]
-                        sequence.append(entry)
-                        prev = [pos, pol, wl]
-
-        return sequence
+        return {
+            'wavelength': self._generate_array(wl_params['start_wavelength'], wl_params['end_wavelength'], wl_params['resolution']),
+            'polarization': self._generate_array(pol_params['start_angle'], pol_params['end_angle'], pol_params['resolution']),
+            'y': self._generate_array(motion['start_position']['y'], motion['end_position']['y'], y_res),
+            'x': self._generate_array(motion['start_position']['x'], motion['end_position']['x'], x_res),
+        }
+
+    def estimate_ordering_time(self, axis_order, axis_values=None):
+        """
+        Predict the total duration in seconds of a map scan nested in axis_order (outermost first).
+
+        Each change of an axis (see ScanPlan.change_counts) is charged at the per-axis change cost
+        and every point is charged the exposure time.
+        """
+        if axis_values is None:
+            axis_values = self._map_axis_values()
+
+        plan = ScanPlan(axis_values, axis_order)
+        exposure = self.acq_ctrl.general_parameters['acquisition_time'] * self.acq_ctrl.general_parameters['n_frames']
+        change_time = sum(count * self.axis_change_costs[axis] for axis, count in plan.change_counts().items())
+
+        return change_time + len(plan) * exposure
+
+    def rank_axis_orderings(self):
+        """
+        Return every possible nesting of the map axes with its predicted duration,
+        as a list of (axis_order, seconds) tuples sorted from fastest to slowest.
+        """
+        axis_values = self._map_axis_values()
+        ranked = [
+            (order, self.estimate_ordering_time(order, axis_values))
+            for order in itertools.permutations(self.MAP_AXES)
+        ]
+        # sorted() is stable, so ties keep the default ordering first
+        return sorted(ranked, key=lambda item: item[1])
+
+    def optimal_axis_order(self):
+        """Return the map axis nesting (outermost first) with the lowest predicted duration."""
+        return self.rank_axis_orderings()[0][0]
+
+    def generate_map_sequence(self, axis_order=None):
+        """
+        Build a 3D map scan plan over X, Y with varying polarization and wavelength.
+        Loops are nested in axis_order (outermost first); if not given, the ordering with the
+        lowest predicted duration under the current axis change costs is used.
+        Returns a ScanPlan yielding [position, polarization, wavelength] entries, with None for unchanged values.
+        """
+        if axis_order is None:
+            axis_order = self.optimal_axis_order()
+        self.axis_order = tuple(axis_order)
+
+        return ScanPlan(
+            self._map_axis_values(),
+            self.axis_order,
+            z_position=self.motion_parameters['start_position']['z'],
+        )
 
     def generate_linescan_sequence(self):
         """
-        Build a linescan sequence between start and end XY positions.
+        Build a linescan plan between start and end XY positions.
         Points are spaced by X resolution along the line. Z is fixed.
-        Returns list of [position, None, None] entries.
+        Returns a ScanPlan yielding [position, None, None] entries.
         """
         motion = self.motion_parameters
         start = motion['start_position']
@@ -85,36 +149,158 @@ class ScanSequenceGenerator:
         dx = end['x'] - start['x']
         dy = end['y'] - start['y']
         length = math.hypot(dx, dy)
-        num_steps = max(1, int(length / step))
+        num_steps = max(1, int(length / step)) if step > 0 else 1
 
         # Generate line points
-        xs = np.linspace(start['x'], end['x'], num_steps + 1)
-        ys = np.linspace(start['y'], end['y'], num_steps + 1)
+        path = np.column_stack([
+            np.linspace(start['x'], end['x'], num_steps + 1),
+            np.linspace(start['y'], end['y'], num_steps + 1),
+            np.full(num_steps + 1, z0, dtype=float),
+        ])
 
-        sequence = []
-        prev_pos = None
-        for x, y in zip(xs, ys):
-            pos = [x, y, z0]
-            entry = [pos if pos != prev_pos else None, None, None]
-            sequence.append(entry)
-            prev_pos = pos
+        return ScanPlan({'path': path})
 
-        return sequence
+    def _adaptive_grid(self):
+        """
+        Return the fine X and Y coordinate arrays of an adaptive map and the coarse grid spacing in fine steps.
+        The fine grid is the uniform map grid at the target resolution; the coarse spacing is 2**levels fine steps.
+        """
+        motion = self.motion_parameters
+        x_res = motion['resolution']['x']
+        x_values = np.asarray(self._generate_array(motion['start_position']['x'], motion['end_position']['x'], x_res), dtype=float)
+        y_values = np.asarray(self._generate_array(motion['start_position']['y'], motion['end_position']['y'], x_res), dtype=float)
+        coarse_step = 2 ** max(int(self.adaptive_parameters['levels']), 0)
+        return x_values, y_values, coarse_step
 
-    def generate_scan_sequence(self):
+    def _adaptive_plan(self, keys):
+        """
+        Build a path ScanPlan visiting the fine grid points in keys (a set of (i, j) index pairs) in serpentine
+        order along X, to keep stage travel short. The ordered keys are stored in self.adaptive_keys so that
+        acquired spectra can be matched to grid points.
+        """
+        ordered = sorted(keys, key=lambda key: (key[1], key[0] if key[1] % 2 == 0 else -key[0]))
+        self.adaptive_keys = ordered
+        z0 = self.motion_parameters['start_position']['z']
+        path = np.array([[self._adaptive_x[i], self._adaptive_y[j], z0] for i, j in ordered], dtype=float)
+        return ScanPlan({'path': path})
+
+    def _cell_corners(self, cell):
+        """Return the fine grid indices of the corners of a quadtree cell (i, j, size), clipped to the grid."""
+        i, j, size = cell
+        i1 = min(i + size, len(self._adaptive_x) - 1)
+        j1 = min(j + size, len(self._adaptive_y) - 1)
+        return {(i, j), (i1, j), (i, j1), (i1, j1)}
+
+    def generate_adaptive_sequence(self):
+        """
+        Start an adaptive coarse-to-fine map over the X/Y region of the motion parameters.
+
+        The region is divided into quadtree cells 2**levels fine steps wide, and a ScanPlan visiting the
+        cell corners (the coarse grid) is returned. After acquiring it, pass the measured spectra to
+        refine_adaptive_sequence to get the next, finer set of points. Wavelength and polarization stay at
+        their start values, which are set by the caller before the map begins.
+        """
+        self._adaptive_x, self._adaptive_y, coarse_step = self._adaptive_grid()
+        nx, ny = len(self._adaptive_x), len(self._adaptive_y)
+
+        self.adaptive_cells = [
+            (i, j, coarse_step)
+            for j in range(0, max(ny - 1, 1), coarse_step)
+            for i in range(0, max(nx - 1, 1), coarse_step)
+        ]
+        keys = set()
+        for cell in self.adaptive_cells:
+            keys |= self._cell_corners(cell)
+        self.adaptive_acquired = set(keys)
+        return self._adaptive_plan(keys)
+
+    def adaptive_cell_metric(self, corner_spectra, reference_intensity=1.0):
+        """
+        Return the feature metric of one quadtree cell from the spectra (1D arrays) measured at its corners.
+
+        'spectral_distance': largest Euclidean distance between unit-normalised corner spectra (0 to sqrt(2)),
+            i.e. how much the spectral shape changes across the cell.
+        'band_intensity': range of the summed intensity between band_start and band_end pixels across the
+            corners, relative to reference_intensity (typically the mean band intensity of the coarse map).
+        """
+        params = self.adaptive_parameters
+        spectra = np.asarray(corner_spectra, dtype=float)
+        if len(spectra) < 2:
+            return 0.0
+
+        if params['metric'] == 'band_intensity':
+            band_end = params['band_end'] if params['band_end'] > params['band_start'] else spectra.shape[1]
+            intensities = spectra[:, params['band_start']:band_end].sum(axis=1)
+            return float(np.ptp(intensities) / reference_intensity) if reference_intensity else 0.0
+
+        if params['metric'] == 'spectral_distance':
+            norms = np.linalg.norm(spectra, axis=1, keepdims=True)
+            unit = spectra / np.where(norms > 0, norms, 1.0)
+            distances = np.linalg.norm(unit[:, None, :] - unit[None, :, :], axis=-1)
+            return float(distances.max())
+
+        raise ValueError(f"Unknown adaptive metric: {params['metric']}. Choose 'spectral_distance' or 'band_intensity'.")
+
+    def refine_adaptive_sequence(self, spectra):
+        """
+        Subdivide every quadtree cell whose feature metric exceeds the adaptive threshold into four child cells,
+        down to the target resolution (cells one fine step wide).
+
+        spectra maps fine grid keys (i, j) to the 1D spectrum measured there. Returns a ScanPlan of the new
+        points required by the refined cells, or None when no further refinement is needed.
+        """
+        params = self.adaptive_parameters
+        reference_intensity = 1.0
+        if params['metric'] == 'band_intensity' and spectra:
+            band_end = params['band_end'] if params['band_end'] > params['band_start'] else None
+            reference_intensity = float(np.mean([np.sum(spectrum[params['band_start']:band_end]) for spectrum in spectra.values()]))
+
+        refined_cells = []
+        for cell in self.adaptive_cells:
+            i, j, size = cell
+            corners = [spectra[key] for key in self._cell_corners(cell) if key in spectra]
+            if size <= 1 or self.adaptive_cell_metric(corners, reference_intensity) <= params['threshold']:
+                continue
+            half = size // 2
+            refined_cells.extend(
+                (ci, cj, half)
+                for ci, cj in ((i, j), (i + half, j), (i, j + half), (i + half, j + half))
+                if ci < max(len(self._adaptive_x) - 1, 1) and cj < max(len(self._adaptive_y) - 1, 1)
+            )
+
+        self.adaptive_cells = refined_cells
+        new_keys = set()
+        for cell in refined_cells:
+            new_keys |= self._cell_corners(cell)
+        new_keys -= self.adaptive_acquired
+        if not new_keys:
+            return None
+
+        self.adaptive_acquired |= new_keys
+        return self._adaptive_plan(new_keys)
+
+    def generate_scan_sequence(self, axis_order=None):
         """
         Dispatch to the appropriate scan sequence generator based on scan_mode.
+        axis_order fixes the map loop nesting (e.g. when rebuilding a journalled scan); it is ignored for linescans.
+        For adaptive maps this returns the coarse grid only; see refine_adaptive_sequence.
         """
         if self.scan_mode == 'linescan':
             return self.generate_linescan_sequence()
         elif self.scan_mode == 'map':
-            return self.generate_map_sequence()
+            return self.generate_map_sequence(axis_order)
+        elif self.scan_mode == 'adaptive':
+            return self.generate_adaptive_sequence()
         else:
-            raise ValueError(f"Not yet implemented: {self.scan_mode}. Supported modes are 'linescan' and 'map'.")
+            raise ValueError(f"Not yet implemented: {self.scan_mode}. Supported modes are 'linescan', 'map' and 'adaptive'.")
 
 
 class CameraScanner:
 
+    # Timing database operation for each entry of AcquisitionControl.scan_command_hierarchy
+    SCAN_OPERATIONS = ('stage_move', 'polarization_change', 'wavelength_change')
+    # Device each operation is traced against (see ScanTracer)
+    OPERATION_DEVICES = {'stage_move': 'stage', 'polarization_change': 'polarizer', 'wavelength_change': 'microscope'}
 
     def __init__(self, acq_ctrl, timeout=100000):
         self.acq_ctrl = acq_ctrl
@@ -122,6 +308,10 @@ class CameraScanner:
         self.camera = acq_ctrl.interface.camera
         self.timeout = timeout
         self.logger = acq_ctrl.interface.logger.getChild('camera_scanner')
+        self.timings = acq_ctrl.timing_database
+        self.estimator = acq_ctrl.duration_estimator
+        self.progress = acq_ctrl.progress_bus
+        self.tracer = acq_ctrl.tracer
 
     def _acquire_once(self):
         """acquires a single frame and saves it."""
@@ -150,99 +340,326 @@ class CameraScanner:
             self.camera.camera_lock.release()
 
 
-    def _acquire_scan(self, cancel_event, status_cb, progress_cb, timeout=100000):
+    def _acquire_scan(self, cancel_event, status_cb, progress_cb, timeout=100000, step_indices=None, journal=None, retry_passes=1):
         """
-        Acquire a series of averaged frames according to self.scan_sequence.
-        Opens stream once, iterates steps, and cleans up safely.
-        Returns a list of (step_index, step) for any failed steps.
+        Acquire a series of averaged frames according to the scan plan in acq_ctrl.scan_sequence.
+        Opens stream once, streams steps from the plan, and cleans up safely.
+
+        step_indices restricts the scan to a subset of plan steps (used to resume an interrupted scan).
+        Each step outcome is appended to journal, if given. Steps that fail are retried at the end of the
+        scan, up to retry_passes times.
+        Returns a list of (step_index, step) for any steps that still failed.
         """
-        total_steps = len(self.acq_ctrl.scan_sequence)
+        scan_plan = self.acq_ctrl.scan_sequence
+        if step_indices is None:
+            step_indices = range(len(scan_plan))
+        total_steps = len(step_indices)
         start_time = time.time()
-        failed_steps = []
+        failed_indices = []
+        previous_idx = None
+        self.estimator.start(scan_plan)
+        subscriber = self._start_progress(status_cb, progress_cb)
 
         # Lock camera and open stream
         self.camera.camera_lock.acquire()
         try:
             self.camera.open_stream()
 
-            for idx, step in enumerate(self.acq_ctrl.scan_sequence):
-                self.acq_ctrl.hidden_parameters['scan_index'] = idx
-
+            for count, idx in enumerate(step_indices):
                 if cancel_event.is_set():
-                    status_cb("Scan cancelled.")
+                    self.progress.event('status', message="Scan cancelled.")
                     break
 
+                step = self._step_commands(scan_plan, idx, previous_idx)
+                previous_idx = idx
+
                 # Report progress
-                self._report_step(idx, step, total_steps, start_time, status_cb, progress_cb)
+                self._report_step(count, step, total_steps, start_time, len(failed_indices), plan_index=idx)
 
-                # Execute hardware commands and grab frames
-                success, image_data = self._execute_step(step, timeout)
+                success, _ = self._run_step(idx, step, timeout, journal, position=scan_plan.point(idx)['position'])
                 if not success:
-                    failed_steps.append((idx, step))
-                    continue
+                    failed_indices.append(idx)
 
-                # Save transient spectrum for this step
-                self.acq_ctrl.save_spectrum_transient(
-                    image_data,
-                    wavelength_axis=self.microscope.wavelength_axis,
-                    report=False
-                )
-
-                self.acq_ctrl.save_spectrum(image_data, scan_index=idx)
+            for retry_pass in range(1, retry_passes + 1):
+                if not failed_indices or cancel_event.is_set():
+                    break
+                self.progress.event('status', message=f"Retrying {len(failed_indices)} failed steps (pass {retry_pass}/{retry_passes})...")
+                retry_indices, failed_indices = failed_indices, []
+                for idx in retry_indices:
+                    if cancel_event.is_set():
+                        failed_indices.append(idx)
+                        continue
+                    # steps are no longer consecutive, so command every axis absolutely
+                    step = self._step_commands(scan_plan, idx, None)
+                    previous_idx = idx
+                    self.progress.event('status', message=f"Retrying step {idx + 1}: {step}")
+                    success, _ = self._run_step(idx, step, timeout, journal, position=scan_plan.point(idx)['position'])
+                    if not success:
+                        failed_indices.append(idx)
 
         except Exception as e:
             # get the traceback
             tb = traceback.format_exc()
             self.logger.error(f"Unexpected error during scan: {tb}")
-            status_cb(f"Scan aborted due to unexpected error: {e}")
+            self.progress.event('status', message=f"Scan aborted due to unexpected error: {e}")
 
         finally:
             self.camera.close_stream()
             self.camera.camera_lock.release()
+            self._save_timings()
+            self._finish_progress(subscriber, cancel_event, len(failed_indices), start_time)
+
+        return [(idx, scan_plan[idx]) for idx in failed_indices]
+
+    def _step_commands(self, scan_plan, idx, previous_idx):
+        """
+        Return the [position, polarization, wavelength] commands for step idx. If the previous executed step
+        was not idx - 1 (first step of a resumed scan, or a retry), unchanged values cannot be skipped, so every
+        axis defined in the plan is commanded to its absolute value.
+        """
+        if previous_idx is not None and previous_idx == idx - 1:
+            return scan_plan[idx]
+        point = scan_plan.point(idx)
+        return [point[command] for command in scan_plan.COMMANDS]
+
+    def _run_step(self, idx, step, timeout, journal=None, scan_index=None, position=None):
+        """
+        Execute one plan step, save the spectrum and journal the outcome.
+        scan_index numbers the saved file (defaults to idx); position is the true stage coordinate stored with it.
+        Returns (True, averaged_image) or (False, None).
+        """
+        scan_index = idx if scan_index is None else scan_index
+        self.acq_ctrl.hidden_parameters['scan_index'] = scan_index
+        self.tracer.step = scan_index
+
+        # Execute hardware commands and grab frames
+        success, image_data = self._execute_step(step, timeout)
+        if not success:
+            self.progress.event('step_failed', step=idx, message=f"Step {idx + 1} failed")
+            if journal is not None:
+                journal.record_step(idx, 'failed', self.acq_ctrl.hardware_state())
+            return False, None
+
+        # Save transient spectrum for this step
+        save_start = time.perf_counter()
+        with self.tracer.span('write', 'transient'):
+            self.acq_ctrl.save_spectrum_transient(
+                image_data,
+                wavelength_axis=self.microscope.wavelength_axis,
+                report=False
+            )
+
+        self.acq_ctrl.save_spectrum(image_data, scan_index=scan_index, position=position)
+        self.timings.record(f'file_save:{self.estimator.codec}', time.perf_counter() - save_start, image_data.size)
+
+        if journal is not None:
+            journal.record_step(idx, 'done', self.acq_ctrl.hardware_state())
+        return True, image_data
+
+    def _acquire_adaptive_scan(self, cancel_event, status_cb, progress_cb, timeout=100000):
+        """
+        Acquire an adaptive coarse-to-fine map. The coarse grid is acquired first, then each refinement level
+        adds points only in quadtree cells whose feature metric exceeds the adaptive threshold.
+        Spectra are saved with consecutive scan indices and their true stage coordinates.
+        Returns a list of (scan_index, position) for any failed points.
+        """
+        generator = ScanSequenceGenerator(self.acq_ctrl)
+        scan_plan = generator.generate_adaptive_sequence()
+        spectra = {}
+        failed_steps = []
+        scan_index = 0
+        level = 0
+        start_time = time.time()
+        subscriber = self._start_progress(status_cb, progress_cb)
+
+        # wavelength and polarization are fixed for an adaptive map
+        fixed_commands = [
+            None,
+            self.acq_ctrl.polarization_parameters['input']['start_angle'],
+            self.acq_ctrl.wavelength_parameters['start_wavelength'],
+        ]
+
+        self.camera.camera_lock.acquire()
+        try:
+            self.camera.open_stream()
+
+            while scan_plan is not None and not cancel_event.is_set():
+                self.progress.event('status', message=f"Adaptive map level {level}: {len(scan_plan)} points")
+                self.acq_ctrl.scan_sequence = scan_plan
+                self.estimator.start(scan_plan)
+
+                for idx, key in enumerate(generator.adaptive_keys):
+                    if cancel_event.is_set():
+                        self.progress.event('status', message="Scan cancelled.")
+                        break
+
+                    position = scan_plan.point(idx)['position']
+                    step = [position] + fixed_commands[1:] if scan_index == 0 else [position, None, None]
+                    self._report_step(idx, step, len(scan_plan), start_time, len(failed_steps))
+
+                    success, image_data = self._run_step(idx, step, timeout, scan_index=scan_index, position=position)
+                    if success:
+                        spectra[key] = image_data.sum(axis=0)
+                    else:
+                        failed_steps.append((scan_index, position))
+                    scan_index += 1
+
+                if cancel_event.is_set():
+                    break # a cancelled level is neither refined nor counted
+                scan_plan = generator.refine_adaptive_sequence(spectra)
+                level += 1
+
+            self.progress.event('status', message=f"Adaptive map acquired {scan_index} points over {level} levels.")
+
+        except Exception as e:
+            tb = traceback.format_exc()
+            self.logger.error(f"Unexpected error during adaptive scan: {tb}")
+            self.progress.event('status', message=f"Scan aborted due to unexpected error: {e}")
+
+        finally:
+            self.camera.close_stream()
+            self.camera.camera_lock.release()
+            self._save_timings()
+            self._finish_progress(subscriber, cancel_event, len(failed_steps), start_time)
 
         return failed_steps
 
-    def _report_step(self, idx, step, total, start_time, status_cb, progress_cb):
+    def _start_progress(self, status_cb, progress_cb):
         """
-        Helper to update UI callbacks at the start of each scan step.
+        Subscribes the scan's status and progress callbacks to the progress bus for the duration of the scan, and
+        marks the timing database so per-phase times can be reported for this scan alone.
         """
-        status_cb(f"Running step {idx + 1}/{total}: {step}")
-        percentage = round((idx / total) * 100)
-        progress_cb(percentage)
+        self._phase_start = {name: timing.time_spent for name, timing in list(self.timings.operations.items())}
+        if self.tracer.enabled:
+            self.tracer.clear() # the trace covers one scan
+        subscriber = callback_subscriber(status_cb, progress_cb)
+        self.progress.subscribe(subscriber)
+        return subscriber
+
+    def _finish_progress(self, subscriber, cancel_event, failed, start_time):
+        """Publishes the end of the scan, stops the progress dispatcher after delivering any pending events and unsubscribes the scan's callbacks."""
+        self.progress.event('finished', state='cancelled' if cancel_event.is_set() else 'finished', failed=failed, elapsed=time.time() - start_time)
+        self.progress.close()
+        self.progress.unsubscribe(subscriber)
+        self._finish_trace()
+
+    def _finish_trace(self):
+        """If tracing is enabled, logs the per-phase summary of the scan and saves its Chrome trace under status/traces."""
+        if not self.tracer.enabled:
+            return
+        try:
+            self.logger.info(self.tracer.report())
+            trace_path = os.path.join(self.microscope.dataDir, 'status', 'traces', f"{self.acq_ctrl.filename}.trace.json")
+            self.tracer.export_chrome_trace(trace_path)
+            self.logger.info(f"Scan trace saved to {trace_path} (open in chrome://tracing or ui.perfetto.dev)")
+        except Exception as e:
+            self.logger.error(f"Could not save scan trace: {e}")
+
+    def _phase_times(self):
+        """Returns {operation: seconds} spent on each timed operation since the scan started."""
+        phases = {}
+        for name, timing in list(self.timings.operations.items()):
+            spent = timing.time_spent - self._phase_start.get(name, 0.0)
+            if spent > 0:
+                phases[name] = spent
+        return phases
+
+    def _report_step(self, idx, step, total, start_time, failed=0, plan_index=None):
+        """
+        Publishes progress at the start of each scan step. Returns immediately; subscribers receive the latest
+        update at most ScanProgressBus.max_rate times a second.
+        idx counts steps within this run; plan_index is the position of the step in the scan plan.
+        """
+        eta = float(self.estimator.eta(idx if plan_index is None else plan_index))
+        remaining, units = format_duration(eta)
+        elapsed = time.time() - start_time
+        self.progress.progress(
+            step=idx + 1,
+            total=total,
+            percent=round((idx / total) * 100),
+            elapsed=elapsed,
+            eta=eta,
+            throughput=idx / elapsed if elapsed > 0 else 0.0,
+            phases=self._phase_times(),
+            failed=failed,
+            message=f"Running step {idx + 1}/{total}: {step} (ETA {remaining:.1f} {units})",
+        )
 
     def _execute_step(self, step, timeout, retries=5):
         """
         Apply scan commands for a step, then grab and average frames.
         Returns (True, averaged_image) or (False, None).
         """
+        tracer = self.tracer
+
         # 1) Apply hardware commands
-        for command, change in zip(self.acq_ctrl.scan_command_hierarchy, step):
+        for command, change, operation in zip(self.acq_ctrl.scan_command_hierarchy, step, self.SCAN_OPERATIONS):
             if change is not None:
-                command(change)
+                with tracer.span(operation, self.OPERATION_DEVICES[operation]):
+                    self._timed_command(command, change, operation)
 
         # 2) Acquire frames and average
         image_data = None
         n_frames = self.acq_ctrl.general_parameters['n_frames']
+        exposure = self.acq_ctrl.general_parameters['acquisition_time']
         for frame_idx in range(n_frames):
+            grab_start = time.perf_counter()
             new_frame = self.camera.grab_frame_safe(timeout=timeout)
-            if new_frame is None:
-                new_frame = self._retry_frame(timeout, retries)
+            grab_end = time.perf_counter()
+            if new_frame is not None:
+                self.timings.record('frame_readout', max(grab_end - grab_start - exposure, 0.0), new_frame.size)
+                if tracer.enabled:
+                    # the grab returns after the exposure and readout; the exposure is taken to come first
+                    exposure_end = min(grab_start + exposure, grab_end)
+                    tracer.record('exposure', grab_start, exposure_end, 'camera')
+                    tracer.record('readout', exposure_end, grab_end, 'camera')
+            else:
+                with tracer.span('frame_retry', 'camera'):
+                    new_frame = self._retry_frame(timeout, retries)
 
             if new_frame is None:
-                print(f"Step failed at frame {frame_idx + 1}/{n_frames}")
+                self.logger.error("Step failed at frame %d/%d", frame_idx + 1, n_frames)
                 return False, None
 
-            image_data = new_frame.astype(np.float32) if frame_idx == 0 else (image_data + new_frame.astype(np.float32)) / 2
+            with tracer.span('accumulate', 'host'):
+                image_data = new_frame.astype(np.float32) if frame_idx == 0 else (image_data + new_frame.astype(np.float32)) / 2
 
 
         return True, image_data
 
+    def _timed_command(self, command, change, operation):
+        """
+        Run one scan hardware command and record its duration in the timing database.
+        Stage moves are recorded against the distance travelled. Time spent moving the TRIAX
+        (recorded separately by the spectrometer) is excluded from wavelength changes.
+        """
+        quantity = 0.0
+        if operation == 'stage_move':
+            current = np.asarray(self.acq_ctrl.current_stage_coordinates, dtype=float)
+            quantity = float(np.linalg.norm(np.asarray(change, dtype=float) - current))
+        triax_before = self.timings.time_spent('triax_move')
+
+        command_start = time.perf_counter()
+        command(change)
+        duration = time.perf_counter() - command_start
+
+        if operation == 'wavelength_change':
+            duration -= self.timings.time_spent('triax_move') - triax_before
+        self.timings.record(operation, max(duration, 0.0), quantity)
+
+    def _save_timings(self):
+        """Persist the timing database, logging rather than raising on failure so a scan never fails on it."""
+        try:
+            self.timings.save()
+        except Exception as e:
+            self.logger.error(f"Could not save scan timing database: {e}")
+
     def _retry_frame(self, timeout, retries):
         """
         Retry grab_frame up to `retries` times. Returns first non-None frame or None.
         """
         for attempt in range(1, retries + 1):
-            print(f"Retry {attempt}/{retries} for image data...")
+            self.logger.warning("Retry %d/%d for image data...", attempt, retries)
             frame = self.camera.grab_frame_safe(timeout=timeout)
             if frame is not None:
                 return frame
@@ -341,6 +758,16 @@ class AcquisitionControl:
             'output': {'start_angle': 0.0, 'end_angle': 0.0, 'resolution': 1.0}
         }
 
+        # Adaptive map: coarse grid spacing is 2**levels X resolution steps. Cells whose metric
+        # ('spectral_distance' or 'band_intensity' over band_start:band_end pixels) exceeds threshold are refined.
+        self.adaptive_parameters = {
+            'levels': 3,
+            'threshold': 0.05,
+            'metric': 'spectral_distance',
+            'band_start': 0,
+            'band_end': 0,
+        }
+
         self._current_parameters = {
             'sample_position': {'x': 0.0, 'y': 0.0, 'z': 0.0},
             'laser_wavelength': 0.0,
@@ -360,9 +787,28 @@ class AcquisitionControl:
         # Optional/UI-linked parameters
         self.separate_resolution = False
         self.z_scan = False
-        self.scan_mode_types = ['linescan', 'map']
+        self.scan_mode_types = ['linescan', 'map', 'adaptive']
+
+        # Measured seconds per single-step change of each map axis, used to choose the loop nesting
+        self.axis_change_costs = dict(ScanSequenceGenerator.DEFAULT_AXIS_CHANGE_COSTS)
+        self.scan_axis_order = ScanSequenceGenerator.MAP_AXES
+
+        # Devices a scan waits for (see Interface.startup) before its first step
+        self.scan_required_devices = ('controller', 'spectrometer', 'camera', 'laser')
+
+        self.timing_database = ScanTimingDatabase(os.path.join(self.acquisitionControlDir, 'scan_timings.json'))
+        self.duration_estimator = ScanDurationEstimator(self, self.timing_database)
+
+        # Timed spans of each phase of a scan step; disabled until switched on (Interface 'trace on')
+        self.tracer = ScanTracer()
+
+        # Scan progress is delivered to subscribers at most progress_rate times a second (see ScanProgressBus)
+        self.progress_rate = 10.0
+        self.progress_bus = ScanProgressBus(max_rate=self.progress_rate, logger=self.logger.getChild('scan_progress'))
+        self.progress_bus.subscribe(self._publish_scan_status)
 
         self.scan_sequence = []
+        self.motor_targets = {}
         self.estimated_scan_time = {'duration': 0.0, 'units': 'seconds'}
         self.all_parameters = {dict_name: getattr(self, dict_name) for dict_name in self.__dict__.keys() if dict_name.endswith('_parameters')}
         self.load_config()
@@ -370,7 +816,8 @@ class AcquisitionControl:
         print("Acquisition Control initialized.")
 
     def toggle_scan_mode(self):
-        self.scan_mode = 'linescan' if self.scan_mode == 'map' else 'map'
+        next_mode = (self.scan_mode_types.index(self.scan_mode) + 1) % len(self.scan_mode_types)
+        self.scan_mode = self.scan_mode_types[next_mode]
         print("Set scan mode to {}".format(self.scan_mode))
 
     @property
@@ -448,26 +895,24 @@ class AcquisitionControl:
 
 
     def estimate_scan_duration(self):
-        '''Estimates the duration of the scan in seconds. This is a rough estimate based on the number of steps in the scan and the acquisition time.'''
-
-        frames = self.general_parameters['n_frames']
-        acq_time = self.general_parameters['acquisition_time']
-        return self.scan_size * acq_time * frames * 1.2
+        '''Estimates the duration of the scan in seconds from measured per-operation timings applied to the scan plan. See estimate_scan_phases for a breakdown.'''
+        return self.estimate_scan_phases()['total']
+
+    def estimate_scan_phases(self, scan_plan=None):
+        '''
+        Predicts the duration of a scan plan (by default, the one described by the current parameters).
+        Returns {'total': seconds, 'phases': {phase: seconds}, 'steps': n_steps}, where phases cover
+        exposure, frame readout, file saving, stage moves, polarization and wavelength changes and TRIAX moves.
+        '''
+        if scan_plan is None:
+            self.set_axis_change_costs(self.duration_estimator.axis_change_costs())
+            scan_plan = ScanSequenceGenerator(self).generate_scan_sequence()
+        return self.duration_estimator.estimate(scan_plan)
     
     def update_scan_estimate(self):
         try:
             duration = self.estimate_scan_duration()
-
-
-            if 3600 > duration >= 600:
-                scan_time = duration / 60
-                units = 'minutes'
-            elif duration >= 3600:
-                scan_time = duration / 3600
-                units = 'hours'
-            else:
-                scan_time = duration
-                units = 'seconds'
+            scan_time, units = format_duration(duration)
 
             scan_time = {
                 'duration': round(scan_time, 2),
@@ -522,6 +967,8 @@ class AcquisitionControl:
             'motion_parameters': self.motion_parameters,
             'wavelength_parameters': self.wavelength_parameters,
             'polarization_parameters': self.polarization_parameters,
+            'adaptive_parameters': self.adaptive_parameters,
+            'axis_change_costs': self.axis_change_costs,
         }
 
         filepath = os.path.join(self.acquisitionControlDir, filename)
@@ -550,6 +997,8 @@ class AcquisitionControl:
         self.motion_parameters.update(config.get('motion_parameters', self.motion_parameters))
         self.wavelength_parameters.update(config.get('wavelength_parameters', self.wavelength_parameters))
         self.polarization_parameters.update(config.get('polarization_parameters', self.polarization_parameters))
+        self.adaptive_parameters.update(config.get('adaptive_parameters', self.adaptive_parameters))
+        self.axis_change_costs.update(config.get('axis_change_costs', {}))
 
         print("Acquisition Control configuration loaded successfully.")
 
@@ -560,105 +1009,17 @@ class AcquisitionControl:
         return relative_motion
 
     def generate_scan_sequence(self):
-        # TODO: Add linescan
-        def generate_array(start, end, resolution):
-            if resolution == 0 or start == end:
-                return [start]
-            try:
-                return np.arange(start, end, resolution).tolist()
-            except Exception as e:
-                print(f"Error generating array: {e}")
-                return [start]
-
-        sequence = []
-        wavelength_list = generate_array(
-            self.wavelength_parameters['start_wavelength'],
-            self.wavelength_parameters['end_wavelength'],
-            self.wavelength_parameters['resolution']
-        )
-        polarization_list = generate_array(
-            self.polarization_parameters['input']['start_angle'],
-            self.polarization_parameters['input']['end_angle'],
-            self.polarization_parameters['input']['resolution']
-        )
-        x_positions = generate_array(
-            self.motion_parameters['start_position']['x'],
-            self.motion_parameters['end_position']['x'],
-            self.motion_parameters['resolution']['x']
-        )
-        y_positions = generate_array(
-            self.motion_parameters['start_position']['y'],
-            self.motion_parameters['end_position']['y'],
-            self.motion_parameters['resolution']['y']
-        )
-        z_val = self.motion_parameters['start_position']['z']
+        '''Kept for backwards compatibility with older scripts. Builds the scan plan via build_scan_sequence.'''
+        return self.build_scan_sequence()
 
-        if self.scan_mode == 'linescan':
-            self.generate_linescan_sequence()
-
-        prev = [self.current_stage_coordinates, None, None]
-        for wl in wavelength_list:
-            for pol in polarization_list:
-                for y in y_positions:
-                    for x in x_positions:
-                        # current_positions = self.current_stage_coordinates
-                        target_positions = [x, y, z_val]
-                        # relative_motion = self.calculate_relative_motion(current_positions, target_positions)
-                        current = [target_positions, pol, wl]
-                        entry = [current[i] if current[i] != prev[i] else None for i in range(3)]
-                        sequence.append(entry)
-                        prev = current
-
-        self.scan_sequence = sequence
-        return sequence
-    
     @property
     def scan_size(self):
-        '''Returns an extimate of the scan length by calculating the distance between the start and end positions. Used as a quick scan length estimate.'''
-
-        def get_size(start, end, resolution):
-            if resolution == 0 or start == end:
-                return 1
-            try:
-                return abs((end - start)) / resolution
-            except Exception as e:
-                print(f"Error generating array: {e}")
-                return 1
-            
-        wavelength_list = get_size(
-            self.wavelength_parameters['start_wavelength'],
-            self.wavelength_parameters['end_wavelength'],
-            self.wavelength_parameters['resolution']
-        )
-        polarization_list = get_size(
-            self.polarization_parameters['input']['start_angle'],
-            self.polarization_parameters['input']['end_angle'],
-            self.polarization_parameters['input']['resolution']
-        )
-        x_positions = get_size(
-            self.motion_parameters['start_position']['x'],
-            self.motion_parameters['end_position']['x'],
-            self.motion_parameters['resolution']['x']
-        )
-        y_positions = get_size(
-            self.motion_parameters['start_position']['y'],
-            self.motion_parameters['end_position']['y'],
-            self.motion_parameters['resolution']['y']
-        )
-        z_val = get_size(
-            self.motion_parameters['start_position']['z'],
-            self.motion_parameters['end_position']['z'],
-            self.motion_parameters['resolution']['z']
-        )
-
-        if self.hidden_parameters['scan_mode'] == 'linescan':
-            length = math.hypot(x_positions, y_positions)
-            num_steps = max(1, int(length / self.motion_parameters['resolution']['x']))
-            scan_size = wavelength_list * polarization_list * num_steps
-        elif self.hidden_parameters['scan_mode'] == 'map':
-            scan_size = wavelength_list * polarization_list * x_positions * y_positions * z_val
-        
-        return scan_size
+        '''Returns the exact number of steps in the scan described by the current parameters. The plan is evaluated lazily, so this is cheap even for large maps.'''
+        try:
+            return len(ScanSequenceGenerator(self).generate_scan_sequence())
+        except Exception as e:
+            print(f"Error calculating scan size: {e}")
+            return 1
 
 
     def move_stage_absolute(self, new_coordinates):
@@ -676,8 +1037,8 @@ class AcquisitionControl:
         motor_dict = self.interface.microscope.calibration_service.microns_to_steps(micron_dict)
         # self.interface.microscope.move_motors(motor_dict)  # Uncomment this line to actually move the stage
         self.interface.microscope.motion_control.move_motors(motor_dict)
-        print("Sent Command {}".format(motor_dict))
-        print("Stage moved ({})".format(", ".join([f"{value:.2f}" for value in new_coordinates])))
+        self.logger.cmd("Sent Command %s", motor_dict)
+        self.logger.info("Stage moved (%s)", ", ".join([f"{value:.2f}" for value in new_coordinates]))
 
         self.interface.microscope.motion_control
 
@@ -693,10 +1054,74 @@ class AcquisitionControl:
     def build_scan_sequence(self):
         '''Builds the scan sequence from GUI parameters. Confirms parameters then calls the scan sequence.'''
 
+        self.set_axis_change_costs(self.duration_estimator.axis_change_costs())
         sequence_generator = ScanSequenceGenerator(self)
         self.scan_sequence = sequence_generator.generate_scan_sequence()
+        self.scan_axis_order = getattr(sequence_generator, 'axis_order', ScanSequenceGenerator.MAP_AXES)
+        self.precompute_motor_targets(self.scan_sequence)
 
         return self.scan_sequence
+
+    def precompute_motor_targets(self, scan_plan):
+        '''
+        Evaluates the motor targets of every wavelength in a scan plan in one vectorised pass per action group and
+        checks them against the microscope hard limits before the scan starts. The targets are cached by the
+        calibration service, so wavelength moves during the scan become table lookups.
+        The monochromator targets follow the current Raman shift, as in Microscope.go_to_wavelength_all.
+        Raises ValueError listing every out-of-range wavelength, or if a motor has no calibration. Returns {group: (motor_labels, steps)}.
+        '''
+        self.motor_targets = {}
+        if 'wavelength' not in scan_plan.axis_order:
+            return self.motor_targets
+
+        microscope = self.interface.microscope
+        calibration = getattr(microscope, 'calibration_service', None)
+        action_groups = getattr(microscope, 'action_groups', None)
+        if calibration is None or not action_groups:
+            return self.motor_targets
+
+        wavelengths = np.unique(scan_plan.axis_values['wavelength'])
+        shift = getattr(microscope, 'current_shift', 0) or 0
+        monochromator_wavelengths = 10_000_000 / (10_000_000 / wavelengths - shift)
+
+        group_wavelengths = {
+            'laser_wavelength': wavelengths,
+            'grating_wavelength': wavelengths,
+            'monochromator_wavelength': monochromator_wavelengths,
+        }
+
+        hard_limits = getattr(microscope, 'hard_limits', {})
+        violations = []
+        for group, values in group_wavelengths.items():
+            if group not in hard_limits:
+                continue
+            low, high = hard_limits[group]
+            outside = values[(values <= low) | (values >= high)]
+            if outside.size:
+                violations.append(f"{group} {', '.join(f'{wl:.2f}' for wl in outside)} nm outside ({low}, {high})")
+        if violations:
+            raise ValueError("Scan wavelengths exceed hard limits: " + "; ".join(violations))
+
+        self.motor_targets = calibration.precompute_motor_targets(
+            wavelengths,
+            {group: (action_groups[group], values) for group, values in group_wavelengths.items() if group in action_groups},
+        )
+        return self.motor_targets
+
+    def set_axis_change_costs(self, costs):
+        '''Updates the measured time in seconds to change each map axis by one step. Keys must be one of ScanSequenceGenerator.MAP_AXES.'''
+        for axis, cost in costs.items():
+            if axis not in ScanSequenceGenerator.MAP_AXES:
+                raise ValueError(f"Invalid scan axis: {axis}. Choose one of: {', '.join(ScanSequenceGenerator.MAP_AXES)}")
+            if cost < 0:
+                raise ValueError(f"Axis change cost for {axis} must be non-negative, got {cost}")
+            self.axis_change_costs[axis] = float(cost)
+
+    def rank_scan_orderings(self):
+        '''Returns a list of (axis_order, seconds) for every map loop nesting, fastest first. Empty for scan modes where the ordering is fixed.'''
+        if self.scan_mode != 'map':
+            return []
+        return ScanSequenceGenerator(self).rank_axis_orderings()
     
     def _acquire_one_frame(self):
         '''Acquires a single frame and returns it without saving'''
@@ -742,30 +1167,217 @@ class AcquisitionControl:
         self.acquire_scan(
             cancel_event=CancelEvent(),
             status_callback=lambda msg: print(msg),
-            progress_callback=lambda step, total, start_time: print(f"Step {step}/{total} completed in {time.time() - start_time:.2f} seconds") 
+            progress_callback=lambda percentage: None,
         )
         self.logger.info("Scan complete.")
 
     def acquire_scan(self, cancel_event, status_callback, progress_callback, timeout=100000):
         """Acquires a confirmed scan sequence. Should only be called from the UI after completing the confirmation dialogue."""
+        if not self.wait_for_devices(status_callback):
+            return
+
+        if self.scan_mode == 'adaptive':
+            self.acquire_adaptive_scan(cancel_event, status_callback, progress_callback, timeout)
+            return
+
+        journal = ScanJournal(self.journal_path())
+        journal.start(self.scan_sequence, self._journal_parameters(), self.scan_axis_order)
+
+        camera_scanner = CameraScanner(self)
+        failed_steps = camera_scanner._acquire_scan(cancel_event, status_callback, progress_callback, timeout, journal=journal)
+
+        self._finish_scan(failed_steps, journal, status_callback)
+
+    def acquire_adaptive_scan(self, cancel_event, status_callback, progress_callback, timeout=100000):
+        """
+        Acquires an adaptive coarse-to-fine map. Because later points depend on the spectra measured, adaptive
+        maps are not journalled and cannot be resumed; failed points are recorded in failed_steps.json.
+        """
+        if not self.wait_for_devices(status_callback):
+            return
+        camera_scanner = CameraScanner(self)
+        failed_steps = camera_scanner._acquire_adaptive_scan(cancel_event, status_callback, progress_callback, timeout)
+
+        self.logger.info("Scan complete.")
+        if failed_steps:
+            status_dir = os.path.join(self.interface.microscope.dataDir, 'status')
+            os.makedirs(status_dir, exist_ok=True)
+            with open(os.path.join(status_dir, 'failed_steps.json'), 'w') as f:
+                json.dump(failed_steps, f, indent=2)
+            self.logger.warning(f"Failed steps recorded in {os.path.join(status_dir, 'failed_steps.json')}")
+        status_callback("Scan complete.")
+
+    def resume_scan(self, cancel_event, status_callback, progress_callback, timeout=100000, filename=None):
+        """
+        Continues an interrupted scan from its journal. The scan parameters recorded when the scan started are
+        restored, the plan is rebuilt and checked against the journalled plan hash, the current hardware state is
+        compared with the state at the last journalled step, and only steps not yet acquired are run.
+        """
+        if filename is not None:
+            self.general_parameters['filename'] = filename
+        if not self.wait_for_devices(status_callback):
+            return
+
+        journal_path = self.journal_path()
+        summary = ScanJournal.read(journal_path)
+        start_record = summary['start']
+        if start_record is None:
+            status_callback(f"No scan journal found at {journal_path}. Nothing to resume.")
+            return
+        if start_record['parameters']['hidden_parameters'].get('scan_mode') == 'adaptive':
+            status_callback("Adaptive maps cannot be resumed.")
+            return
+
+        for name, values in start_record['parameters'].items():
+            getattr(self, name).update(values)
+
+        axis_order = start_record.get('axis_order')
+        self.scan_sequence = ScanSequenceGenerator(self).generate_scan_sequence(axis_order)
+        if axis_order is not None:
+            self.scan_axis_order = tuple(axis_order)
+
+        if self.scan_sequence.plan_hash != start_record['plan_hash']:
+            status_callback("Rebuilt scan plan does not match the journalled scan. Resume aborted.")
+            self.logger.error(f"Plan hash mismatch: journal {start_record['plan_hash']}, rebuilt {self.scan_sequence.plan_hash}")
+            return
+
+        self._verify_hardware_state(summary['last_state'])
+
+        pending = [idx for idx in range(len(self.scan_sequence)) if idx not in summary['completed']]
+        if not pending:
+            status_callback("All steps of the journalled scan are already complete.")
+            return
+
+        status_callback(f"Resuming scan '{self.filename}': {len(summary['completed'])} steps complete, {len(pending)} remaining.")
+        self.prepare_acquisition_params()
+
+        journal = ScanJournal(journal_path)
+        journal.resume(self.scan_sequence, len(pending))
 
         camera_scanner = CameraScanner(self)
-        failed_steps = camera_scanner._acquire_scan(cancel_event, status_callback, progress_callback, timeout)
+        failed_steps = camera_scanner._acquire_scan(cancel_event, status_callback, progress_callback, timeout, step_indices=pending, journal=journal)
+
+        self._finish_scan(failed_steps, journal, status_callback)
+
+    def cli_resume_scan(self, filename=None):
+        """Resumes an interrupted scan from the command line."""
+        self.logger.info("Resuming scan...")
+
+        class CancelEvent:
+            def is_set(self):
+                return False
+
+        self.resume_scan(
+            cancel_event=CancelEvent(),
+            status_callback=lambda msg: print(msg),
+            progress_callback=lambda percentage: None,
+            filename=filename,
+        )
+
+    def _publish_scan_status(self, event):
+        """Progress bus subscriber that keeps the scan status in the instrument state store up to date for the GUI."""
+        if event['type'] == 'progress':
+            status = {key: event[key] for key in ('step', 'total', 'percent', 'eta', 'throughput', 'failed')}
+            self.interface.microscope.state.set('scan_status', {'state': 'running', **status})
+        elif event['type'] == 'finished':
+            self.interface.microscope.state.set('scan_status', {'state': event['state'], 'failed': event['failed']})
+
+    def wait_for_devices(self, status_callback=print, timeout=None):
+        '''
+        Readiness barrier run before a scan: blocks until every device in scan_required_devices has finished
+        initialising (TRIAX reset, camera at temperature, laser warmed up). Returns False if a device failed or
+        timeout seconds passed first.
+        '''
+        startup = getattr(self.interface, 'startup', None)
+        if startup is None:
+            return True
+        waiting = [name for name in self.scan_required_devices if not startup.is_ready(name)]
+        if waiting:
+            status_callback(f"Waiting for {', '.join(waiting)} to become ready...")
+        try:
+            startup.wait_until_ready(self.scan_required_devices, timeout=timeout)
+        except (TimeoutError, RuntimeError) as e:
+            status_callback(f"Scan not started: {e}")
+            return False
+        return True
+
+    def _finish_scan(self, failed_steps, journal, status_callback):
+        """Closes the scan journal and records any steps that failed after retrying."""
+        journal.finish([idx for idx, _ in failed_steps])
+        journal.close()
 
         self.logger.info("Scan complete.")
 
         if failed_steps:
-            record_failed_steps = json.dumps(failed_steps)
             status_dir = os.path.join(self.interface.microscope.dataDir, 'status')
             if not os.path.exists(status_dir):
                 os.makedirs(status_dir)
             with open(os.path.join(status_dir, 'failed_steps.json'), 'w') as f:
                 json.dump(failed_steps, f, indent=2)
-            print(f"Failed steps recorded in {os.path.join(status_dir, 'failed_steps.json')}")
+            self.logger.warning(f"Failed steps recorded in {os.path.join(status_dir, 'failed_steps.json')}")
         else:
-            print("All steps completed successfully.")
+            self.logger.info("All steps completed successfully.")
         status_callback("Scan complete.")
-        
+
+    def journal_path(self, filename=None):
+        """Returns the path of the scan journal for a filename (by default the current one)."""
+        if filename is None:
+            filename = self.general_parameters['filename']
+        return os.path.join(self.interface.microscope.dataDir, 'status', 'journals', f"{filename}.jsonl")
+
+    def _journal_parameters(self):
+        """Returns a JSON-safe copy of the parameters needed to rebuild the current scan plan."""
+        parameters = {
+            'general_parameters': self.general_parameters,
+            'hidden_parameters': self.hidden_parameters,
+            'motion_parameters': self.motion_parameters,
+            'wavelength_parameters': self.wavelength_parameters,
+            'polarization_parameters': self.polarization_parameters,
+        }
+        return json.loads(json.dumps(parameters))
+
+    def hardware_state(self):
+        """Returns a snapshot of the tracked hardware state (no hardware is queried) for the scan journal."""
+        microscope = self.interface.microscope
+        return {
+            'stage_position': list(self.current_stage_coordinates),
+            'laser_wavelengths': dict(getattr(microscope, 'laser_wavelengths', {}) or {}),
+            'grating_wavelengths': dict(getattr(microscope, 'grating_wavelengths', {}) or {}),
+            'monochromator_wavelengths': dict(getattr(microscope, 'monochromator_wavelengths', {}) or {}),
+            'triax_steps': getattr(getattr(self.interface, 'spectrometer', None), 'triax_steps', None),
+        }
+
+    def _verify_hardware_state(self, recorded_state, stage_tolerance=0.5, wavelength_tolerance=0.05):
+        """
+        Compares the current tracked hardware state with the state journalled at the last completed step and logs
+        any differences. The first resumed step commands every axis absolutely, so differences are corrected before
+        acquisition continues. Returns a list of mismatch descriptions.
+        """
+        if not recorded_state:
+            return []
+
+        current_state = self.hardware_state()
+        mismatches = []
+
+        stage_offset = np.subtract(current_state['stage_position'], recorded_state['stage_position'])
+        if np.any(np.abs(stage_offset) > stage_tolerance):
+            mismatches.append(f"stage at {current_state['stage_position']}, journal {recorded_state['stage_position']}")
+
+        for group in ('laser_wavelengths', 'grating_wavelengths', 'monochromator_wavelengths'):
+            for motor, wavelength in recorded_state.get(group, {}).items():
+                current = current_state[group].get(motor)
+                if current is None or abs(current - wavelength) > wavelength_tolerance:
+                    mismatches.append(f"{motor} at {current} nm, journal {wavelength} nm")
+
+        if current_state['triax_steps'] != recorded_state.get('triax_steps'):
+            mismatches.append(f"triax at {current_state['triax_steps']} steps, journal {recorded_state.get('triax_steps')}")
+
+        for mismatch in mismatches:
+            self.logger.warning(f"Hardware state differs from scan journal: {mismatch}")
+        if not mismatches:
+            self.logger.info("Hardware state matches the scan journal.")
+        return mismatches
+
     def acquire_custom_scan(self):
         camera_scanner = CameraScanner(self)
         camera_scanner.acquire_custom_scan()
@@ -789,17 +1401,34 @@ class AcquisitionControl:
         wavelength_axis = kwargs.get('wavelength_axis', self.interface.microscope.wavelength_axis)
         filename       = kwargs.get('filename',       self.general_parameters['filename'])
         save_dir       = kwargs.get('save_dir',       self.interface.microscope.dataDir)
+        position       = kwargs.get('position',       None)
 
         file_path = os.path.join(save_dir, f"{filename}", f"{filename}_{scan_index:06d}.npz")
         if not os.path.exists(os.path.dirname(file_path)):
             os.makedirs(os.path.dirname(file_path))
 
-        np.savez_compressed(
-            file_path,
-            image=image_data,
-            wavelength=wavelength_axis,
-            metadata=json.dumps(self.metadata)
-        )
+        with self.tracer.span('metadata', 'host'):
+            metadata = json.dumps(self.metadata)
+        arrays = {
+            'image': image_data,
+            'wavelength': wavelength_axis,
+            'metadata': metadata,
+        }
+        # true stage coordinates (microns) of the spectrum, when acquired as part of a scan
+        if position is not None:
+            arrays['position'] = np.asarray(position, dtype=float)
+
+        if not self.tracer.enabled:
+            np.savez_compressed(file_path, **arrays)
+            return
+
+        # traced saves compress in memory first, so compression and the disk write are timed separately
+        with self.tracer.span('compress', 'host'):
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, **arrays)
+        with self.tracer.span('write', 'disk'):
+            with open(file_path, 'wb') as f:
+                f.write(buffer.getbuffer())
 
     @property
     def wavelength_axis(self):
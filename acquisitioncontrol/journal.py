@@ -0,0 +1,114 @@
+import os
+import json
+import time
+
+import numpy as np
+
+
+def _to_json(value):
+    '''json.dump fallback for NumPy scalars and arrays found in hardware state snapshots.'''
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class ScanJournal:
+    '''
+    Append-only, crash-safe record of a scan's progress, stored as JSON lines.
+
+    Each line is a self-contained record and is flushed and fsynced before the scan moves on, so
+    after a crash or power loss the journal holds every step that completed. Record types:
+        start   plan hash, plan length, map axis order and the acquisition parameters used to build the plan
+        resume  plan hash and the number of steps still to acquire
+        step    step index, status ('done' or 'failed') and a snapshot of the hardware state
+        end     indices of steps that still failed after the retry pass
+    A partially written final line (e.g. from a crash mid-write) is ignored when reading.
+    '''
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        self._file = None
+
+    def _append(self, record):
+        '''Writes one record and forces it to disk.'''
+        if self._file is None:
+            self._file = open(self.filepath, 'a')
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                self._file.write('\n') # terminate a torn last line so it does not swallow this record
+        record['time'] = time.time()
+        self._file.write(json.dumps(record, default=_to_json) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _ends_with_newline(self):
+        with open(self.filepath, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def start(self, plan, parameters, axis_order=None):
+        '''Records the start of a new scan. Any previous records for this file are superseded.'''
+        self._append({
+            'event': 'start',
+            'plan_hash': plan.plan_hash,
+            'length': len(plan),
+            'axis_order': list(axis_order) if axis_order is not None else None,
+            'parameters': parameters,
+        })
+
+    def resume(self, plan, pending):
+        '''Records that an interrupted scan is being continued with `pending` steps remaining.'''
+        self._append({'event': 'resume', 'plan_hash': plan.plan_hash, 'pending': pending})
+
+    def record_step(self, index, status, state=None):
+        '''Records the outcome of one step together with the hardware state at that step.'''
+        self._append({'event': 'step', 'index': int(index), 'status': status, 'state': state})
+
+    def finish(self, failed_indices):
+        '''Records the end of the scan and the steps that could not be acquired.'''
+        self._append({'event': 'end', 'failed': [int(index) for index in failed_indices]})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def read(filepath):
+        '''
+        Parses a journal and returns the state of the most recent scan in it as a dict:
+            start      the 'start' record (None if the journal is empty or missing)
+            completed  set of step indices acquired successfully
+            failed     set of step indices whose latest attempt failed
+            last_state hardware state recorded at the most recent step
+            finished   True if an 'end' record follows the start
+        '''
+        summary = {'start': None, 'completed': set(), 'failed': set(), 'last_state': None, 'finished': False}
+        if not os.path.exists(filepath):
+            return summary
+
+        with open(filepath, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                event = record.get('event')
+                if event == 'start':
+                    summary = {'start': record, 'completed': set(), 'failed': set(), 'last_state': None, 'finished': False}
+                elif event == 'step':
+                    index = record['index']
+                    if record['status'] == 'done':
+                        summary['completed'].add(index)
+                        summary['failed'].discard(index)
+                    else:
+                        summary['failed'].add(index)
+                    summary['last_state'] = record.get('state')
+                elif event == 'resume':
+                    summary['finished'] = False
+                elif event == 'end':
+                    summary['finished'] = True
+        return summary
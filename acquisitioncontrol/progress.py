@@ -0,0 +1,121 @@
+import time
+import logging
+import threading
+from collections import deque
+
+
+class ScanProgressBus:
+    '''
+    Rate-limited, coalesced delivery of scan progress events to subscribers.
+
+    The scan thread publishes with progress() and event(). Both only store the event and return, so a scan never
+    waits on a slow subscriber (a busy Qt event loop, a terminal). A dispatcher thread delivers the stored events at
+    most max_rate times a second. Progress updates are coalesced, so each delivery carries only the latest one however
+    many steps ran since the previous delivery. Discrete events (status messages, failed steps, end of scan) are never
+    dropped and keep their order relative to the progress updates around them. close() stops the dispatcher once a
+    scan has ended; it is started again by the next event published.
+
+    Subscribers are called as callback(event) from the dispatcher thread, with a dict whose 'type' is one of:
+        progress     step, total, percent, elapsed, eta (seconds), throughput (steps per second),
+                     phases ({operation: seconds spent in this scan}), failed (steps failed so far), message
+        status       message
+        step_failed  step (plan index), message
+        finished     state ('finished' or 'cancelled'), failed, elapsed
+    '''
+
+    def __init__(self, max_rate=10.0, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_rate = max_rate
+        self.interval = 1.0 / max_rate
+        self._lock = threading.Lock()
+        self._delivery_lock = threading.Lock() # one delivery at a time, from the dispatcher or flush()
+        self._subscribers = []
+        self._latest = None # latest undelivered progress update
+        self._events = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def progress(self, **payload):
+        '''Publishes a progress update, replacing any not yet delivered.'''
+        with self._lock:
+            self._latest = {'type': 'progress', **payload}
+        self._notify()
+
+    def event(self, event_type, **payload):
+        '''Publishes a discrete event, which is always delivered.'''
+        with self._lock:
+            if self._latest is not None:
+                self._events.append(self._latest) # progress published before the event is delivered before it
+                self._latest = None
+            self._events.append({'type': event_type, **payload})
+        self._notify()
+
+    def _notify(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name='scan-progress', daemon=True)
+                    self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self._deliver()
+            if self._stop.wait(self.interval): # events published meanwhile are coalesced into the next delivery
+                return
+
+    def _deliver(self):
+        with self._delivery_lock:
+            with self._lock:
+                events = list(self._events)
+                if self._latest is not None:
+                    events.append(self._latest)
+                self._events.clear()
+                self._latest = None
+                subscribers = list(self._subscribers)
+
+            for event in events:
+                for callback in subscribers:
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        self.logger.exception(f"Scan progress subscriber failed: {e}")
+
+    def flush(self):
+        '''Delivers everything still pending on the calling thread.'''
+        self._deliver()
+
+    def close(self, timeout=1.0):
+        '''Stops and joins the dispatcher thread, then delivers anything still pending on the calling thread. Used once a scan has ended.'''
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._deliver()
+
+
+def callback_subscriber(status_cb, progress_cb):
+    '''Adapts the status_cb(message) and progress_cb(percentage) callbacks taken by the scan functions to a bus subscriber.'''
+    def deliver(event):
+        if event.get('message'):
+            status_cb(event['message'])
+        if event['type'] == 'progress':
+            progress_cb(event['percent'])
+    return deliver
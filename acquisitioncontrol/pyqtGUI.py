@@ -12,7 +12,7 @@ from PyQt5.QtCore import Qt, pyqtSignal, QMetaObject, QTimer, pyqtSlot
 from PyQt5.QtWidgets import QProgressBar
 
 
-from acquisitioncontrol.acqcontrol import AcquisitionControl
+from acquisitioncontrol.acqcontrol import AcquisitionControl, format_duration
 import sys
 import traceback
 import time
@@ -102,6 +102,8 @@ class MainWindow(QMainWindow):
     scan_complete_signal = pyqtSignal()
     progress_update_signal = pyqtSignal(int)
 
+    STATE_REFRESH_INTERVAL_MS = 200 # fastest rate at which the instrument state panel is redrawn
+
     def __init__(self, acq_ctrl, interface):
         super().__init__()
         self.acq_ctrl = acq_ctrl
@@ -121,6 +123,17 @@ class MainWindow(QMainWindow):
         self.progress_update_signal.connect(self.update_progress_bar)
 
         self.init_ui()
+
+        # The instrument state panel is drawn from the microscope's state store, which devices update as they move,
+        # so redrawing never waits on serial or GPIB I/O. Changes only mark the panel dirty; a timer redraws it at
+        # most every STATE_REFRESH_INTERVAL_MS, however often the devices report.
+        self.state = self.interface.microscope.state
+        self._state_dirty = True
+        self.state.subscribe(self._on_state_changed)
+        self.state_timer = QTimer(self)
+        self.state_timer.timeout.connect(self.refresh_instrument_state)
+        self.state_timer.start(self.STATE_REFRESH_INTERVAL_MS)
+
         self.refresh_ui()
 
                 # Create a new QtLogHandler specific to this GUI
@@ -152,10 +165,12 @@ class MainWindow(QMainWindow):
     def confirm_scan(self, scan_sequence):
         '''Create a popup window to confirm the scan sequence.'''
         estimated_time = self.acq_ctrl.update_scan_estimate()
+        phase_estimate = self.acq_ctrl.estimate_scan_phases(scan_sequence)
 
         # Format the scan sequence for display
         scan_details = (
             f"Scan mode: {self.acq_ctrl.scan_mode}\n"
+            f"Scan steps: {len(scan_sequence)}\n"
             f"Start position: {self.acq_ctrl.start_position()}\n"
             f"Stop position: {self.acq_ctrl.stop_position()}\n"
             f"Wavelengths: {self.acq_ctrl.scan_wavelengths}\n"
@@ -167,6 +182,13 @@ class MainWindow(QMainWindow):
             f"Laser power: {self.acq_ctrl.general_parameters['laser_power']} mW\n"
             f"Filename: {self.acq_ctrl.general_parameters['filename']}\n"
         )
+        if len(scan_sequence):
+            scan_details += (
+                f"First point: {self._format_scan_point(scan_sequence.point(0))}\n"
+                f"Last point: {self._format_scan_point(scan_sequence.point(-1))}\n"
+            )
+        scan_details += self._format_phase_breakdown(phase_estimate)
+        scan_details += self._format_axis_orderings()
 
         # Create a message box
         msg_box = QMessageBox(self)
@@ -189,6 +211,43 @@ class MainWindow(QMainWindow):
             self.logger.info("Scan cancelled.")
             return False
 
+    def _format_scan_point(self, point):
+        '''Formats the coordinates of a single scan plan point for display.'''
+        parts = []
+        if point['position'] is not None:
+            parts.append("pos ({})".format(", ".join(f"{value:.2f}" for value in point['position'])))
+        if point['polarization'] is not None:
+            parts.append(f"pol {point['polarization']:.2f}")
+        if point['wavelength'] is not None:
+            parts.append(f"wl {point['wavelength']:.2f} nm")
+        return ", ".join(parts)
+
+    def _format_phase_breakdown(self, phase_estimate):
+        '''Formats the predicted time spent in each scan phase for the confirmation dialog.'''
+        lines = ["\nPredicted time per phase:"]
+        for phase, seconds in phase_estimate['phases'].items():
+            if seconds <= 0:
+                continue
+            duration, units = format_duration(seconds)
+            lines.append(f"  {phase.replace('_', ' ')}: {duration:.2f} {units}")
+        duration, units = format_duration(phase_estimate['total'])
+        lines.append(f"  total: {duration:.2f} {units}")
+        return "\n".join(lines) + "\n"
+
+    def _format_axis_orderings(self):
+        '''Formats the predicted duration of each map loop nesting for the confirmation dialog, marking the ordering that will be used.'''
+        ranked = self.acq_ctrl.rank_scan_orderings()
+        if not ranked:
+            return ""
+
+        selected = tuple(self.acq_ctrl.scan_axis_order)
+        lines = ["\nAxis ordering (outer > inner): predicted time"]
+        for order, seconds in ranked:
+            duration, units = format_duration(seconds)
+            marker = "*" if tuple(order) == selected else " "
+            lines.append(f"{marker} {' > '.join(order)}: {duration:.2f} {units}")
+        return "\n".join(lines) + "\n"
+
     def cancel_scan(self):
         """
         Cancel the scan. This method is called when the user clicks the "Cancel Scan" button.
@@ -205,7 +264,11 @@ class MainWindow(QMainWindow):
         Called when the user clicks 'Run Scan'. Builds the scan, asks for confirmation,
         then launches the scan in a background thread.
         """
-        scan_sequence = self.acq_ctrl.build_scan_sequence()
+        try:
+            scan_sequence = self.acq_ctrl.build_scan_sequence()
+        except ValueError as e:
+            self.update_status(f"Scan not started: {e}")
+            return
         if not self.confirm_scan(scan_sequence):
             return
         
@@ -276,7 +339,8 @@ class MainWindow(QMainWindow):
             'General':      self.acq_ctrl.general_parameters,
             'Motion':       self.acq_ctrl.motion_parameters,
             'Wavelength':   self.acq_ctrl.wavelength_parameters,
-            'Polarization': self.acq_ctrl.polarization_parameters
+            'Polarization': self.acq_ctrl.polarization_parameters,
+            'Adaptive':     self.acq_ctrl.adaptive_parameters
         }
 
         for name, params in sections.items():
@@ -403,17 +467,9 @@ class MainWindow(QMainWindow):
         self.lbl_stop.setText(self.acq_ctrl.stop_position())
         self.lbl_est.setText(f"{scan_time['duration']:.2f} {scan_time['units']}")
 
-        # Stage position update
-        stage_pos = self.acq_ctrl.current_stage_coordinates
-        self.lbl_stage_x.setText(f"{stage_pos[0]:.2f}")
-        self.lbl_stage_y.setText(f"{stage_pos[1]:.2f}")
-        self.lbl_stage_z.setText(f"{stage_pos[2]:.2f}")
-
-        # instrument state update
-        self.lbl_laser.setText(f"{self.interface.microscope.report_laser_wavelength:.2f} nm")
-        self.lbl_grating.setText(f"{self.interface.microscope.report_grating_wavelength:.2f} nm")
-        self.lbl_monochromator.setText(f"{self.interface.microscope.report_monochromator_wavelength:.2f} nm")
-        self.lbl_spectrometer.setText(f"{self.interface.microscope.report_spectrometer_wavelength:.2f} nm")
+        # Stage position and instrument state update
+        self._state_dirty = True
+        self.refresh_instrument_state()
         # self.lbl_entrance_slit.setText(f"{self.interface.microscope.report_entrance_slit:.2f} nm")
 
         # self.update_instrument_state()
@@ -421,6 +477,47 @@ class MainWindow(QMainWindow):
         # self.set_stop()
 
 
+    def _on_state_changed(self, keys):
+        '''State store subscriber. Runs on the device or scan thread that made the change, so only marks the panel dirty.'''
+        self._state_dirty = True
+
+    @staticmethod
+    def _format_wavelength(wavelengths, motor):
+        wavelength = (wavelengths or {}).get(motor)
+        return "N/A" if wavelength is None else f"{wavelength:.2f} nm"
+
+    @staticmethod
+    def _format_scan_status(status):
+        if not status:
+            return "Idle"
+        if status['state'] == 'running':
+            remaining, units = format_duration(status['eta'])
+            return f"Step {status['step']}/{status['total']} ({status['percent']}%, {status['throughput']:.2f} steps/s), ETA {remaining:.1f} {units}"
+        failed = f", {status['failed']} failed steps" if status.get('failed') else ''
+        return f"{status['state'].capitalize()}{failed}"
+
+    @pyqtSlot()
+    def refresh_instrument_state(self):
+        '''Redraws the stage position and instrument state labels from a snapshot of the state store, if it has changed.'''
+        if not self._state_dirty:
+            return
+        self._state_dirty = False
+        _, values = self.state.snapshot()
+
+        stage_pos = values.get('stage_positions') or {}
+        self.lbl_stage_x.setText(f"{stage_pos.get('x', 0.0):.2f}")
+        self.lbl_stage_y.setText(f"{stage_pos.get('y', 0.0):.2f}")
+        self.lbl_stage_z.setText(f"{stage_pos.get('z', 0.0):.2f}")
+
+        self.lbl_laser.setText(self._format_wavelength(values.get('laser_wavelengths'), 'l1'))
+        self.lbl_grating.setText(self._format_wavelength(values.get('grating_wavelengths'), 'g1'))
+        self.lbl_monochromator.setText(self._format_wavelength(values.get('monochromator_wavelengths'), 'g3'))
+        self.lbl_spectrometer.setText(self._format_wavelength(values.get('spectrometer_wavelength'), 'triax'))
+
+        temperature = values.get('detector_temperature')
+        self.lbl_detector_temperature.setText("N/A" if temperature is None else f"{temperature:.2f} °C")
+        self.lbl_scan_status.setText(self._format_scan_status(values.get('scan_status')))
+
     def init_ui(self):
         central = QWidget()
         main_layout = QHBoxLayout(central)
@@ -531,11 +628,15 @@ class MainWindow(QMainWindow):
         self.lbl_monochromator = QLabel("N/A")
         self.lbl_spectrometer = QLabel("N/A")
         self.lbl_entrance_slit = QLabel("N/A")
+        self.lbl_detector_temperature = QLabel("N/A")
+        self.lbl_scan_status = QLabel("Idle")
         sg_form.addRow("Laser wavelength:", self.lbl_laser)
         sg_form.addRow("Grating wavelength:", self.lbl_grating)
         sg_form.addRow("Monochromator wavelength:", self.lbl_monochromator)
         sg_form.addRow("Spectrometer wavelength:", self.lbl_spectrometer)
         sg_form.addRow("Entrance slit:", self.lbl_entrance_slit)
+        sg_form.addRow("Detector temperature:", self.lbl_detector_temperature)
+        sg_form.addRow("Scan:", self.lbl_scan_status)
         state_group.setLayout(sg_form)
 
         ctrl_state_layout.addWidget(state_group)
@@ -651,6 +752,9 @@ class MainWindow(QMainWindow):
         # (Optional) remove the handler so no Qt work happens at all
         self.interface.logger.removeHandler(self.qt_handler)
 
+        self.state_timer.stop()
+        self.state.unsubscribe(self._on_state_changed)
+
         super().closeEvent(event)
 
 
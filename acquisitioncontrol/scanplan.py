@@ -0,0 +1,195 @@
+import hashlib
+
+import numpy as np
+
+
+class ScanPlan:
+    '''
+    Lazily evaluated scan sequence defined by a set of nested axes.
+
+    Instead of materialising every step as a Python list, the plan stores one NumPy array of
+    values per axis and decodes a step index into per-axis indices on demand (mixed-radix, the
+    first axis in axis_order being the outermost loop). This gives an exact length, O(1) random
+    access, an O(1) "changed since previous step" mask and streaming iteration, regardless of
+    the number of points in the scan.
+
+    Steps are returned in the same [position, polarization, wavelength] form used by
+    AcquisitionControl.scan_command_hierarchy, with None marking values that are unchanged from
+    the previous step.
+
+    Supported axis names:
+        'x', 'y'        stage coordinates in microns (1D arrays). z is fixed at z_position.
+        'path'          stage coordinates in microns as an (n, 3) array, used for linescans.
+        'polarization'  input polarization angle (1D array).
+        'wavelength'    laser wavelength in nm (1D array).
+    Axes that are absent from the plan are never commanded (always None).
+    '''
+
+    # Order of the entries in each step, matching AcquisitionControl.scan_command_hierarchy
+    COMMANDS = ('position', 'polarization', 'wavelength')
+
+    def __init__(self, axis_values, axis_order=None, z_position=0.0):
+        if axis_order is None:
+            axis_order = tuple(axis_values.keys())
+        self.axis_order = tuple(axis_order)
+
+        missing = [axis for axis in self.axis_order if axis not in axis_values]
+        if missing:
+            raise ValueError(f"ScanPlan axis order refers to undefined axes: {', '.join(missing)}")
+        if 'path' in self.axis_order and ('x' in self.axis_order or 'y' in self.axis_order):
+            raise ValueError("ScanPlan cannot combine a 'path' axis with 'x' or 'y' axes.")
+
+        self.axis_values = {axis: np.asarray(axis_values[axis], dtype=float) for axis in self.axis_order}
+        for axis, values in self.axis_values.items():
+            if len(values) == 0:
+                raise ValueError(f"ScanPlan axis '{axis}' has no values.")
+
+        self.z_position = float(z_position)
+        self.shape = tuple(len(self.axis_values[axis]) for axis in self.axis_order)
+
+        # Number of steps taken before each axis advances by one value
+        strides = []
+        stride = 1
+        for size in reversed(self.shape):
+            strides.append(stride)
+            stride *= size
+        self.strides = tuple(reversed(strides))
+        self._length = stride
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __getitem__(self, index):
+        return self.step(index)
+
+    def __repr__(self):
+        axes = ", ".join(f"{axis}={size}" for axis, size in zip(self.axis_order, self.shape))
+        return f"ScanPlan({axes}, steps={self._length})"
+
+    def _normalise_index(self, index):
+        '''Converts a possibly negative step index into a valid positive index, raising IndexError if out of range.'''
+        index = int(index)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"Scan step {index} out of range for a plan of {self._length} steps.")
+        return index
+
+    @property
+    def plan_hash(self):
+        '''SHA-1 fingerprint of the axis definitions and ordering. Two plans with the same hash visit the same points in the same order.'''
+        digest = hashlib.sha1()
+        digest.update(repr((self.axis_order, self.shape, self.z_position)).encode())
+        for axis in self.axis_order:
+            digest.update(np.ascontiguousarray(self.axis_values[axis]).tobytes())
+        return digest.hexdigest()
+
+    def axis_indices(self, index):
+        '''Returns a dict of axis name to the value index used at the given step.'''
+        index = self._normalise_index(index)
+        return {
+            axis: (index // stride) % size
+            for axis, stride, size in zip(self.axis_order, self.strides, self.shape)
+        }
+
+    def point(self, index):
+        '''
+        Returns the full coordinates of a step as a dict with keys 'position' ([x, y, z] in microns),
+        'polarization' and 'wavelength'. Axes absent from the plan are None. Unlike step(), no
+        values are elided, so this is the form to store alongside acquired data.
+        '''
+        indices = self.axis_indices(index)
+        values = {axis: self.axis_values[axis][i] for axis, i in indices.items()}
+
+        if 'path' in values:
+            position = [float(v) for v in values['path']]
+        elif 'x' in values or 'y' in values:
+            position = [float(values.get('x', 0.0)), float(values.get('y', 0.0)), self.z_position]
+        else:
+            position = None
+
+        polarization = values.get('polarization')
+        wavelength = values.get('wavelength')
+        return {
+            'position': position,
+            'polarization': float(polarization) if polarization is not None else None,
+            'wavelength': float(wavelength) if wavelength is not None else None,
+        }
+
+    def _axis_changed(self, axis, index):
+        '''Returns True if the value of axis differs between step index-1 and step index.'''
+        if index == 0:
+            return True
+        position = self.axis_order.index(axis)
+        stride = self.strides[position]
+        size = self.shape[position]
+        if index % stride != 0:
+            return False
+        current = (index // stride) % size
+        previous = (current - 1) % size
+        return not np.array_equal(self.axis_values[axis][current], self.axis_values[axis][previous])
+
+    def changed_mask(self, index):
+        '''
+        Returns a boolean array of length 3 indicating which of position, polarization and wavelength
+        change on arriving at the given step. The first step always changes every defined command.
+        '''
+        index = self._normalise_index(index)
+        position_axes = [axis for axis in ('x', 'y', 'path') if axis in self.axis_order]
+        return np.array([
+            any(self._axis_changed(axis, index) for axis in position_axes),
+            'polarization' in self.axis_order and self._axis_changed('polarization', index),
+            'wavelength' in self.axis_order and self._axis_changed('wavelength', index),
+        ], dtype=bool)
+
+    def step(self, index):
+        '''Returns the [position, polarization, wavelength] command list for a step, with None for unchanged values.'''
+        index = self._normalise_index(index)
+        point = self.point(index)
+        mask = self.changed_mask(index)
+        return [
+            point[command] if changed else None
+            for command, changed in zip(self.COMMANDS, mask)
+        ]
+
+    def change_counts(self):
+        '''
+        Returns a dict of axis name to the number of times that axis changes value over the whole
+        scan, counting the wrap-around back to the first value and excluding the initial move.
+        '''
+        counts = {}
+        cycles = 1
+        for axis, size in zip(self.axis_order, self.shape):
+            cycles *= size
+            counts[axis] = cycles - 1 if size > 1 else 0
+        return counts
+
+    def axis_value_array(self, axis, start=0, stop=None):
+        '''Returns a NumPy array of the values taken by axis over steps [start, stop), computed without iterating in Python.'''
+        stop = self._length if stop is None else min(stop, self._length)
+        position = self.axis_order.index(axis)
+        steps = np.arange(start, stop)
+        indices = (steps // self.strides[position]) % self.shape[position]
+        return self.axis_values[axis][indices]
+
+    def position_array(self, start=0, stop=None):
+        '''Returns an (n, 3) array of stage positions in microns over steps [start, stop), or None if the plan has no position axes.'''
+        stop = self._length if stop is None else min(stop, self._length)
+        if 'path' in self.axis_order:
+            return self.axis_value_array('path', start, stop)
+        if 'x' not in self.axis_order and 'y' not in self.axis_order:
+            return None
+
+        n_steps = max(stop - start, 0)
+        positions = np.full((n_steps, 3), self.z_position, dtype=float)
+        for column, axis in enumerate(('x', 'y')):
+            positions[:, column] = self.axis_value_array(axis, start, stop) if axis in self.axis_order else 0.0
+        return positions
+
+    def to_list(self):
+        '''Materialises the full sequence as a list of steps. Intended for small plans and debugging only.'''
+        return list(self)
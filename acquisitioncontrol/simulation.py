@@ -6,6 +6,8 @@ import time
 import numpy as np
 import tkinter as tk
 
+from state_store import InstrumentState
+
 class DummyCLI:
 
     def __init__(self, microscope):
@@ -77,6 +79,12 @@ class DummyMicroscope:
         self.stage_positions_microns = {'x': 0.0, 'y': 0.0, 'z': 0.0}
         self.laser_wavelengths = {'l1': 532.0}
         self.monochromator_wavelengths = {'g3': 500.0}
+        self.state = InstrumentState()
+        self.state.update({
+            'stage_positions': dict(self.stage_positions_microns),
+            'laser_wavelengths': dict(self.laser_wavelengths),
+            'monochromator_wavelengths': dict(self.monochromator_wavelengths),
+        })
         self.dataDir = os.path.join(os.path.dirname(__file__), 'data')
         self.scriptDir = os.path.dirname(__file__)
         self.acquisitionControlDir = self.scriptDir
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+class OperationTiming:
+    '''
+    Rolling record of measured durations for a single scan operation.
+
+    Each sample pairs a duration in seconds with the "quantity" that drives it (e.g. microns moved,
+    TRIAX steps travelled, pixels read out). Durations are modelled as
+    duration = overhead + rate * quantity, fitted by least squares over the most recent samples.
+    Until enough varied samples exist the default overhead and rate are used.
+    '''
+
+    def __init__(self, default_overhead, default_rate=0.0, max_samples=200, samples=None):
+        self.default_overhead = float(default_overhead)
+        self.default_rate = float(default_rate)
+        self.samples = deque(samples or [], maxlen=max_samples)
+        self.time_spent = 0.0
+        self.count = 0
+
+    def record(self, duration, quantity=0.0):
+        '''Adds a measured duration (seconds) for the given quantity.'''
+        self.samples.append((float(quantity), float(duration)))
+        self.time_spent += duration
+        self.count += 1
+
+    @property
+    def measured(self):
+        return len(self.samples) > 0
+
+    def coefficients(self):
+        '''Returns (overhead, rate) in seconds and seconds per unit quantity.'''
+        if not self.samples:
+            return self.default_overhead, self.default_rate
+
+        quantities, durations = np.array(self.samples).T
+        if len(self.samples) >= 3 and np.ptp(quantities) > 0:
+            rate, overhead = np.polyfit(quantities, durations, 1)
+            if rate >= 0 and overhead >= 0:
+                return float(overhead), float(rate)
+
+        # Too few or too uniform samples to separate overhead from rate: scale the default rate
+        # so that the mean measured duration is reproduced at the mean measured quantity.
+        mean_quantity = float(np.mean(quantities))
+        mean_duration = float(np.mean(durations))
+        if self.default_rate > 0 and mean_quantity > 0:
+            expected = self.default_overhead + self.default_rate * mean_quantity
+            scale = mean_duration / expected if expected > 0 else 1.0
+            return self.default_overhead * scale, self.default_rate * scale
+        return mean_duration, 0.0
+
+    def predict_total(self, n_operations, total_quantity=0.0):
+        '''Predicts the combined duration of n_operations whose quantities sum to total_quantity.'''
+        overhead, rate = self.coefficients()
+        return n_operations * overhead + rate * total_quantity
+
+
+class ScanTimingDatabase:
+    '''
+    Persistent rolling database of measured per-operation durations, used to predict scan times.
+
+    Operations recorded by CameraScanner and the instruments:
+        stage_move          quantity: distance travelled in microns
+        polarization_change quantity: none
+        wavelength_change   quantity: none (laser, grating and monochromator motors, excluding the TRIAX)
+        triax_move          quantity: TRIAX steps travelled
+        frame_readout       quantity: ROI pixel count (time beyond the exposure per frame)
+        file_save:<codec>   quantity: ROI pixel count
+    Samples are stored as JSON in the acquisition control directory and reloaded on start-up.
+    '''
+
+    # (overhead seconds, seconds per unit quantity) used before any measurements exist
+    DEFAULTS = {
+        'stage_move': (0.3, 0.005),
+        'polarization_change': (2.0, 0.0),
+        'wavelength_change': (8.0, 0.0),
+        'triax_move': (0.5, 1e-4),
+        'frame_readout': (0.05, 1e-7),
+        'file_save:npz_compressed': (0.02, 2e-7),
+    }
+
+    def __init__(self, filepath, max_samples=200):
+        self.filepath = filepath
+        self.max_samples = max_samples
+        self.operations = {
+            name: OperationTiming(*defaults, max_samples=max_samples)
+            for name, defaults in self.DEFAULTS.items()
+        }
+        self.load()
+
+    def __getitem__(self, operation):
+        if operation not in self.operations:
+            overhead, rate = self.DEFAULTS.get(operation, (0.0, 0.0))
+            self.operations[operation] = OperationTiming(overhead, rate, max_samples=self.max_samples)
+        return self.operations[operation]
+
+    def record(self, operation, duration, quantity=0.0):
+        '''Records a measured duration in seconds for an operation.'''
+        self[operation].record(duration, quantity)
+
+    def time_spent(self, operation):
+        '''Returns the total time recorded for an operation during this session.'''
+        return self[operation].time_spent
+
+    def load(self):
+        '''Loads stored samples from disk. Missing or corrupt files leave the defaults in place.'''
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, 'r') as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not load scan timing database {self.filepath}: {e}. Using default timings.")
+            return
+
+        for operation, samples in stored.items():
+            self[operation].samples.extend(tuple(sample) for sample in samples)
+
+    def save(self):
+        '''Writes the current samples to disk, replacing the previous file atomically.'''
+        stored = {name: list(timing.samples) for name, timing in self.operations.items() if timing.samples}
+        tmp_path = self.filepath + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, self.filepath)
+
+
+class ScanDurationEstimator:
+    '''
+    Predicts scan durations by applying the measured timings in a ScanTimingDatabase to a ScanPlan.
+
+    The plan is processed in vectorised chunks so the estimate stays fast for very large maps.
+    Call start() when a scan begins and eta() at each step for a live estimate of the time remaining.
+    '''
+
+    PHASES = (
+        'exposure',
+        'frame_readout',
+        'file_save',
+        'stage_move',
+        'polarization_change',
+        'wavelength_change',
+        'triax_move',
+    )
+
+    def __init__(self, acq_ctrl, timing_database, codec='npz_compressed', chunk_size=100000, refresh_interval=30.0):
+        self.acq_ctrl = acq_ctrl
+        self.timings = timing_database
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self.refresh_interval = refresh_interval
+
+        self._plan = None
+        self._remaining = 0.0
+        self._refreshed_at = 0.0
+
+    @property
+    def roi_pixels(self):
+        '''Number of pixels read out per frame, taken from the camera ROI (HOffset, VOffset, Width, Height).'''
+        roi = getattr(self.acq_ctrl.camera, 'roi', None)
+        try:
+            return int(roi[2]) * int(roi[3])
+        except (TypeError, IndexError, ValueError):
+            return 2048 * 148
+
+    def _triax_steps(self, wavelengths):
+        '''Converts an array of wavelengths to TRIAX steps, or returns None if no calibration is loaded.'''
+        calibration = getattr(self.acq_ctrl.interface.microscope, 'calibration_service', None)
+        wl_to_triax = getattr(calibration, 'wl_to_triax', None)
+        if wl_to_triax is None:
+            return None
+        try:
+            return np.asarray(wl_to_triax(wavelengths), dtype=float)
+        except Exception:
+            return np.array([wl_to_triax(wl) for wl in wavelengths], dtype=float)
+
+    def estimate(self, plan, start=0):
+        '''
+        Predicts the duration of steps [start, len(plan)) of a scan plan.
+        Returns {'total': seconds, 'phases': {phase: seconds}, 'steps': n_steps}.
+        '''
+        general = self.acq_ctrl.general_parameters
+        n_frames = general['n_frames']
+        n_steps = max(len(plan) - start, 0)
+        pixels = self.roi_pixels
+
+        phases = dict.fromkeys(self.PHASES, 0.0)
+        phases['exposure'] = n_steps * n_frames * general['acquisition_time']
+        phases['frame_readout'] = self.timings['frame_readout'].predict_total(n_steps * n_frames, n_steps * n_frames * pixels)
+        phases['file_save'] = self.timings[f'file_save:{self.codec}'].predict_total(n_steps, n_steps * pixels)
+
+        for chunk_start in range(start, len(plan), self.chunk_size):
+            chunk_stop = min(chunk_start + self.chunk_size, len(plan))
+            # include the previous step so the first change in the chunk is counted
+            lead = 1 if chunk_start > 0 else 0
+            self._estimate_chunk(plan, chunk_start - lead, chunk_stop, lead, phases)
+
+        phases = {phase: float(seconds) for phase, seconds in phases.items()}
+        return {'total': sum(phases.values()), 'phases': phases, 'steps': n_steps}
+
+    def _estimate_chunk(self, plan, start, stop, lead, phases):
+        '''Adds the predicted hardware change times for steps [start + lead, stop) of plan to phases.'''
+        positions = plan.position_array(start, stop)
+        if positions is not None:
+            distances = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+            moves = distances > 0
+            n_moves = int(moves.sum()) + (1 - lead)  # the first step of the scan always moves
+            phases['stage_move'] += self.timings['stage_move'].predict_total(n_moves, distances[moves].sum())
+
+        if 'polarization' in plan.axis_order:
+            angles = plan.axis_value_array('polarization', start, stop)
+            n_changes = int(np.count_nonzero(np.diff(angles))) + (1 - lead)
+            phases['polarization_change'] += self.timings['polarization_change'].predict_total(n_changes)
+
+        if 'wavelength' in plan.axis_order:
+            wavelengths = plan.axis_value_array('wavelength', start, stop)
+            changed = np.diff(wavelengths) != 0
+            n_changes = int(changed.sum()) + (1 - lead)
+            phases['wavelength_change'] += self.timings['wavelength_change'].predict_total(n_changes)
+
+            triax_steps = self._triax_steps(wavelengths)
+            travel = np.abs(np.diff(triax_steps))[changed].sum() if triax_steps is not None else 0.0
+            phases['triax_move'] += self.timings['triax_move'].predict_total(n_changes, travel)
+
+    def axis_change_costs(self, plan=None):
+        '''
+        Returns measured seconds per single-step change of each map axis, for the scan ordering planner.
+        Only axes whose operations have been measured are included.
+        '''
+        costs = {}
+        motion = self.acq_ctrl.motion_parameters
+        if self.timings['stage_move'].measured:
+            step = motion['resolution']['x']
+            costs['x'] = costs['y'] = self.timings['stage_move'].predict_total(1, step)
+        if self.timings['polarization_change'].measured:
+            costs['polarization'] = self.timings['polarization_change'].predict_total(1)
+        if self.timings['wavelength_change'].measured:
+            costs['wavelength'] = self.timings['wavelength_change'].predict_total(1)
+            costs['wavelength'] += self.timings['triax_move'].predict_total(1)
+        return costs
+
+    def start(self, plan):
+        '''Begins live ETA tracking for a scan plan.'''
+        self._plan = plan
+        self._remaining = self.estimate(plan)['total']
+        self._refreshed_at = time.time()
+        self._refreshed_index = 0
+
+    def eta(self, index):
+        '''
+        Returns the predicted seconds remaining when about to execute step index. The full remaining
+        estimate is recomputed at most every refresh_interval seconds, so it picks up timings measured
+        during the scan; in between, the elapsed time is subtracted.
+        '''
+        if self._plan is None:
+            return 0.0
+        now = time.time()
+        if now - self._refreshed_at >= self.refresh_interval and index != self._refreshed_index:
+            self._remaining = self.estimate(self._plan, start=index)['total']
+            self._refreshed_at = now
+            self._refreshed_index = index
+            return self._remaining
+        return max(self._remaining - (now - self._refreshed_at), 0.0)
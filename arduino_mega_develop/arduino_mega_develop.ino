@@ -14,6 +14,10 @@
        Example: "c1A 2Xc" returns true/false for each motor (based on if distanceToGo() != 0).
     4. Set positions command (s…s)
        Example: "s1A1000 3Z-500s" sets the motor’s current position without moving.
+    5. LDR sweep command (w…w)
+       Example: "w1X4000 800 10w" moves motor 1X by +4000 steps at a constant 800 steps/s,
+       sampling the LDR every 10 steps. Samples are buffered during the sweep and returned
+       afterwards as "n<count>" followed by one "<position>,<ldr>" line per sample.
 */
 
 #include <AccelStepper.h>
@@ -81,6 +85,12 @@ const int ledPin2 = 10;
 
 const int homingLimitPin = 13; // Or whatever pin you use
 
+// LDR sweep sample buffer. Samples are held in RAM during the sweep so serial output
+// cannot stall the motor; 600 samples use 3.6 kB of the Mega's 8 kB SRAM.
+const int maxSweepSamples = 600;
+long sweepPositions[maxSweepSamples];
+int sweepValues[maxSweepSamples];
+
 
 
 // Global array pointer for easier access:
@@ -276,15 +286,72 @@ void toggleIllumination(String state) {
   }
 }
 
-void readLDR() {
+long sampleLDR() {
   int count = 0;
   long ldr0value = 0;
   while (count < 10) {
     ldr0value += analogRead(ldr0pin);
     count++;
   }
+  return ldr0value;
+}
+
+void readLDR() {
   Serial.print('t');
-  Serial.println(ldr0value);
+  Serial.println(sampleLDR());
+}
+
+// LDR sweep: e.g., w1X4000 800 10w
+// Moves one motor by a relative distance at constant speed (no acceleration ramp),
+// sampling the LDR every `interval` steps, then reports all samples at once.
+void sweepLDR(String cmdContent) {
+  cmdContent.trim();
+  int firstSpace = cmdContent.indexOf(' ');
+  int secondSpace = cmdContent.indexOf(' ', firstSpace + 1);
+  if (cmdContent.length() < 3 || firstSpace == -1 || secondSpace == -1) {
+    Serial.println("Invalid sweep command.");
+    return;
+  }
+
+  char module = cmdContent.charAt(0);
+  char motor = cmdContent.charAt(1);
+  long distance = cmdContent.substring(2, firstSpace).toInt();
+  float speed = cmdContent.substring(firstSpace + 1, secondSpace).toFloat();
+  long interval = cmdContent.substring(secondSpace + 1).toInt();
+  int idx = getStepperIndex(module, motor);
+  if (idx < 0 || idx >= 16 || speed <= 0 || interval <= 0) {
+    Serial.println("Invalid sweep command.");
+    return;
+  }
+
+  AccelStepper* m = steppers[idx];
+  int direction = distance >= 0 ? 1 : -1;
+  int count = 0;
+  long nextSample = m->currentPosition();
+
+  m->move(distance);
+  m->setSpeed(direction * speed); // must follow move(), which recalculates the speed
+  while (true) {
+    long pos = m->currentPosition();
+    if ((direction > 0 && pos >= nextSample) || (direction < 0 && pos <= nextSample)) {
+      if (count < maxSweepSamples) {
+        sweepPositions[count] = pos;
+        sweepValues[count] = sampleLDR();
+        count++;
+      }
+      nextSample = pos + direction * interval;
+    }
+    if (m->distanceToGo() == 0) break;
+    m->runSpeedToPosition();
+  }
+
+  Serial.print('n');
+  Serial.println(count);
+  for (int i = 0; i < count; i++) {
+    Serial.print(sweepPositions[i]);
+    Serial.print(',');
+    Serial.println(sweepValues[i]);
+  }
 }
 
 void homeMotor(char module, char motor) {
@@ -554,6 +621,11 @@ void parseCommand(String command) {
       Serial.println("Unknown hardware command.");
     }
   }
+  // LDR sweep command: w...w
+  else if (command.startsWith("w") && command.endsWith("w")) {
+    String content = command.substring(1, command.length() - 1);
+    sweepLDR(content);
+  }
   // Home a motor: e.g., h1A
   else if (command.startsWith("h") && command.length() == 3) {
     char module = command.charAt(1);
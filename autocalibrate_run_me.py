@@ -0,0 +1,37 @@
+'''
+Headless recalibration of every motor from the latest autocal_*.json files in autocalibration/.
+
+Each motor is peak-fitted and calibrated in a separate worker process, the autocal_<motor>_autocal.json
+files and calibration/autocal_report.json are written to calibration/, and the script exits with
+status 1 if any fit is bad, so it can run unattended after an LDR sweep session:
+
+    python autocalibrate_run_me.py --processes 4 --min-r2 0.99
+'''
+import sys
+import argparse
+
+from calibration_auto import AutoCalibration
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Recalibrate all motors from their latest autocalibration scans.')
+    parser.add_argument('--processes', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--poly-order', type=int, default=2, help='Polynomial order of the forward and inverse fits.')
+    parser.add_argument('--min-r2', type=float, default=0.95, help='Minimum R^2 of either fit direction before a motor is reported as a bad fit.')
+    parser.add_argument('--profile', default='pseudo_voigt', choices=('gaussian', 'lorentzian', 'pseudo_voigt'), help='Peak profile fitted to the LDR scans.')
+    parser.add_argument('--exclude', nargs='*', default=[], help='Motors to skip, e.g. --exclude l3 g4.')
+    parser.add_argument('--no-linked', action='store_true', help='Do not propagate the g1 calibration to g2-g4.')
+    args = parser.parse_args(argv)
+
+    autocal = AutoCalibration(showplots=False, exclude=args.exclude, peak_profile=args.profile)
+    report, ok = autocal.autocalibrate_batch(
+        processes=args.processes,
+        poly_order=args.poly_order,
+        min_r2=args.min_r2,
+        linked=not args.no_linked,
+    )
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
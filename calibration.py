@@ -1,7 +1,11 @@
 import os
+import io
+import hashlib
 import numpy as np
 import json
 from types import SimpleNamespace
+from dataclasses import dataclass
+from typing import Callable, Optional
 
 class PolySinModulation:
     def __init__(self, a2, a1, a0, A, B, C, D):
@@ -26,6 +30,10 @@ class PolySinModulation:
         modulation = self.A * np.sin(self.B * x + self.C) + self.D
         return poly + modulation
 
+    def deriv(self):
+        '''Returns the first derivative as a callable, matching the np.poly1d interface.'''
+        return lambda x: 2 * self.a2 * x + self.a1 + self.A * self.B * np.cos(self.B * x + self.C)
+
     def __repr__(self):
         """
         String representation of the polynomial and sinusoidal components.
@@ -48,6 +56,10 @@ class LinSinModulation:
         linear = self.a1 * x + self.a0
         modulation = self.A * np.sin(self.B * x + self.C) + self.D
         return linear + modulation
+
+    def deriv(self):
+        '''Returns the first derivative as a callable, matching the np.poly1d interface.'''
+        return lambda x: self.a1 + self.A * self.B * np.cos(self.B * x + self.C)
     
     def __repr__(self):
         linear_part = f"{self.a1}*x + {self.a0}"
@@ -55,6 +67,218 @@ class LinSinModulation:
         return f"LinSinModulation: ({linear_part}) + ({sin_part})"
     
 
+def build_calibration_model(coefficients):
+    '''Builds a callable calibration model from a coefficient list: 7 coefficients give a PolySinModulation, 6 a LinSinModulation and anything else an np.poly1d.
+    Returns (model_type, model).'''
+    if len(coefficients) == 7:
+        return 'poly_sin', PolySinModulation(*coefficients)
+    if len(coefficients) == 6:
+        return 'lin_sin', LinSinModulation(*coefficients)
+    return 'poly1d', np.poly1d(coefficients)
+
+
+class NumericalInverse:
+    '''
+    Inverse of a forward wavelength -> steps calibration, derived numerically so that it round-trips exactly.
+
+    At construction the forward model is sampled on a dense wavelength grid to build a monotonic lookup table.
+    Calls interpolate the table (binary search, O(log n) per value, vectorised over arrays) and then apply a few
+    Newton iterations using the analytic derivative of the forward model. If the forward model is not monotonic over
+    the domain, the table is restricted to the longest monotonic run.
+
+    Newton refinement is only applied to steps inside the table, since outside it the forward model may turn over
+    and the iteration diverges. Steps outside the table are passed to `fallback` (the fitted inverse, where one was
+    loaded) or return NaN.
+    '''
+
+    def __init__(self, forward, domain=(500.0, 1300.0), n_points=20001, newton_iterations=3, fallback=None):
+        self.forward = forward
+        self.derivative = forward.deriv()
+        self.newton_iterations = newton_iterations
+        self.fallback = fallback
+
+        wavelengths = np.linspace(domain[0], domain[1], n_points)
+        steps = np.asarray(forward(wavelengths), dtype=float)
+        wavelengths, steps = self._monotonic_run(wavelengths, steps)
+        if steps[0] > steps[-1]:
+            wavelengths, steps = wavelengths[::-1], steps[::-1]
+
+        self.table_wavelengths = wavelengths
+        self.table_steps = steps
+        self.domain = (float(wavelengths.min()), float(wavelengths.max()))
+
+    @classmethod
+    def from_table(cls, forward, table_wavelengths, table_steps, newton_iterations=3):
+        '''Rebuilds an inverse from a previously computed lookup table (e.g. from the calibration bundle) without resampling the forward model.'''
+        inverse = cls.__new__(cls)
+        inverse.forward = forward
+        inverse.derivative = forward.deriv()
+        inverse.newton_iterations = newton_iterations
+        inverse.fallback = None
+        inverse.table_wavelengths = np.asarray(table_wavelengths, dtype=float)
+        inverse.table_steps = np.asarray(table_steps, dtype=float)
+        inverse.domain = (float(inverse.table_wavelengths.min()), float(inverse.table_wavelengths.max()))
+        return inverse
+
+    @staticmethod
+    def _monotonic_run(wavelengths, steps):
+        '''Returns the longest contiguous section of the table over which steps is strictly monotonic.'''
+        direction = np.sign(np.diff(steps))
+        if np.all(direction == direction[0]) and direction[0] != 0:
+            return wavelengths, steps
+
+        breaks = np.flatnonzero(direction[1:] != direction[:-1]) + 1
+        bounds = np.concatenate(([0], breaks, [len(direction)]))
+        lengths = np.diff(bounds)
+        longest = np.argmax(lengths)
+        start, stop = bounds[longest], bounds[longest + 1] + 1
+        return wavelengths[start:stop], steps[start:stop]
+
+    def __call__(self, steps):
+        target = np.asarray(steps, dtype=float)
+        flat = np.atleast_1d(target)
+        inside = (flat >= self.table_steps[0]) & (flat <= self.table_steps[-1])
+
+        wavelengths = np.full(flat.shape, np.nan)
+        refined = np.interp(flat[inside], self.table_steps, self.table_wavelengths)
+        for _ in range(self.newton_iterations):
+            slope = self.derivative(refined)
+            slope = np.where(slope == 0, np.finfo(float).eps, slope)
+            refined = refined - (self.forward(refined) - flat[inside]) / slope
+        wavelengths[inside] = refined
+        if self.fallback is not None and not inside.all():
+            wavelengths[~inside] = self.fallback(flat[~inside])
+
+        wavelengths = wavelengths.reshape(target.shape)
+        return float(wavelengths) if wavelengths.ndim == 0 else wavelengths
+
+    def round_trip_error(self, n_points=1001):
+        '''Largest |inverse(forward(wl)) - wl| in nm over the table domain.'''
+        wavelengths = np.linspace(*self.domain, n_points)
+        return float(np.max(np.abs(self(self.forward(wavelengths)) - wavelengths)))
+
+
+@dataclass
+class MotorCalibration:
+    '''A single calibration function between wavelength and one device axis (a motor, the TRIAX or camera pixels).'''
+    name: str                   # attribute name, e.g. 'wl_to_l1' or 'l1_to_wl'
+    motor: str                  # device label, e.g. 'l1', 'triax', 'pixel'
+    direction: str              # 'forward' (wavelength -> steps) or 'inverse' (steps -> wavelength)
+    model_type: str             # 'poly1d', 'poly_sin' or 'lin_sin'
+    coefficients: list
+    function: Callable
+    source: Optional[str] = None  # file the coefficients were loaded from
+
+    def __call__(self, x):
+        return self.function(x)
+
+
+class CalibrationRegistry:
+    '''
+    Typed registry of all motor calibrations, keyed by device label.
+
+    Replaces lookups through dynamically assigned attributes: forward (wavelength -> steps) and inverse
+    (steps -> wavelength) calibrations are stored per motor and evaluated on NumPy arrays.
+    '''
+
+    NON_MOTOR_AXES = ('pixel',) # calibrations without a derived inverse; their domain is not the motor wavelength range
+
+    def __init__(self, domain=(500.0, 1300.0)):
+        self.domain = domain        # wavelength range (nm) of the derived inverses; spans the hard limits in microscope_config.json
+        self.forward = {}
+        self.inverse = {}           # fitted inverse models, as loaded from file
+        self.derived_inverse = {}   # NumericalInverse of each forward model
+
+    @staticmethod
+    def parse_name(name):
+        '''Splits a calibration name into (motor, direction). 'wl_to_l1' -> ('l1', 'forward'), 'l1_to_wl' -> ('l1', 'inverse').'''
+        if name.startswith('wl_to_'):
+            return name[len('wl_to_'):], 'forward'
+        if name.endswith('_to_wl'):
+            return name[:-len('_to_wl')], 'inverse'
+        raise ValueError(f"Calibration name '{name}' must be of the form 'wl_to_<motor>' or '<motor>_to_wl'.")
+
+    def register(self, name, coefficients, source=None, inverse_table=None):
+        '''
+        Builds the model for a named coefficient set and stores it. Returns the MotorCalibration.
+        inverse_table, a (wavelengths, steps) pair, reuses a stored lookup table for the derived inverse of a forward model.
+        '''
+        motor, direction = self.parse_name(name)
+        model_type, function = build_calibration_model(coefficients)
+        calibration = MotorCalibration(name, motor, direction, model_type, list(coefficients), function, source)
+        table = self.forward if direction == 'forward' else self.inverse
+        table[motor] = calibration
+        if direction == 'forward' and motor not in self.NON_MOTOR_AXES:
+            if inverse_table is not None:
+                self.derived_inverse[motor] = NumericalInverse.from_table(function, *inverse_table)
+            else:
+                self.derived_inverse[motor] = NumericalInverse(function, self.domain)
+        # steps outside the derived inverse's table are converted with the fitted inverse
+        if motor in self.derived_inverse:
+            self.derived_inverse[motor].fallback = self.inverse[motor].function if motor in self.inverse else None
+        return calibration
+
+    def inverse_function(self, motor):
+        '''Returns the steps -> wavelength function for a motor: the inverse derived from the forward model if there is one, otherwise the fitted inverse.'''
+        if motor in self.derived_inverse:
+            return self.derived_inverse[motor]
+        if motor in self.inverse:
+            return self.inverse[motor].function
+        raise KeyError(f"No inverse calibration for: {motor}")
+
+    def round_trip_errors(self):
+        '''
+        Returns {motor: {'derived': nm, 'fitted': nm or None}} for every motor with a derived inverse: the largest
+        round-trip error wl -> steps -> wl over the calibration domain, using the derived inverse and, where one was loaded, the independently fitted inverse.
+        '''
+        errors = {}
+        for motor, derived in self.derived_inverse.items():
+            forward = self.forward[motor]
+            fitted = None
+            if motor in self.inverse:
+                wavelengths = np.linspace(*derived.domain, 1001)
+                fitted = float(np.max(np.abs(self.inverse[motor](forward(wavelengths)) - wavelengths)))
+            errors[motor] = {'derived': derived.round_trip_error(), 'fitted': fitted}
+        return errors
+
+    def __contains__(self, motor):
+        return motor in self.forward
+
+    @property
+    def motors(self):
+        return list(self.forward.keys())
+
+    def wavelengths_to_steps(self, wavelengths, motors):
+        '''
+        Evaluates the forward calibrations of several motors over an array of wavelengths in one call.
+        Returns an integer step matrix of shape (len(wavelengths), len(motors)). Raises ValueError if a motor has no calibration.
+        '''
+        wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=float))
+        missing = [motor for motor in motors if motor not in self.forward]
+        if missing:
+            raise ValueError(f"No wavelength calibration for: {', '.join(missing)}")
+
+        steps = np.empty((len(wavelengths), len(motors)), dtype=np.int64)
+        for column, motor in enumerate(motors):
+            steps[:, column] = np.rint(self.forward[motor](wavelengths))
+        return steps
+
+    def steps_to_wavelengths(self, steps, motors):
+        '''
+        Evaluates the inverse calibrations of several motors on a step matrix of shape (n, len(motors)).
+        Returns a float wavelength matrix of the same shape. Raises ValueError if a motor has no inverse calibration.
+        '''
+        steps = np.atleast_2d(np.asarray(steps, dtype=float))
+        missing = [motor for motor in motors if motor not in self.forward and motor not in self.inverse]
+        if missing:
+            raise ValueError(f"No inverse calibration for: {', '.join(missing)}")
+
+        wavelengths = np.empty(steps.shape, dtype=float)
+        for column, motor in enumerate(motors):
+            wavelengths[:, column] = self.inverse_function(motor)(steps[:, column])
+        return wavelengths
+
+
 class LdrScan:
 
 
@@ -105,8 +329,146 @@ class Calibration:
         self.y_steps_per_micron = 1 / 0.0625 
         self.z_steps_per_micron = 1 / 0.00625 
 
-        self.generate_master_calibration()
+        self.registry = CalibrationRegistry()
+        self.all_calibrations = {}
+        self._target_cache = {}
+        self._parsed_sources = {}
+        self.version = 0 # incremented whenever a calibration changes, so dependent caches can invalidate
+
+        self.load_calibration_bundle()
     
+    def register_calibration(self, name, coefficients, source=None, inverse_table=None):
+        '''
+        Adds or replaces a named calibration (e.g. 'wl_to_l1') in the registry. The model is also exposed as an attribute
+        of the same name so existing callers such as calibration_service.wl_to_triax keep working.
+        Returns the model type.
+        '''
+        calibration = self.registry.register(name, coefficients, source, inverse_table)
+        self.all_calibrations[name] = list(coefficients)
+        self.__setattr__(name, calibration.function)
+        # steps -> wavelength always uses the inverse derived from the forward model when one exists
+        if calibration.motor in self.registry.derived_inverse or calibration.motor in self.registry.inverse:
+            self.__setattr__('{}_to_wl'.format(calibration.motor), self.registry.inverse_function(calibration.motor))
+        self._target_cache.clear()
+        self.version += 1
+        return calibration.model_type
+
+    def report_round_trip_errors(self):
+        '''Prints the worst-case wavelength -> steps -> wavelength error per motor for the derived and fitted inverses. Returns the error dictionary.'''
+        errors = self.registry.round_trip_errors()
+        print("Calibration round-trip error (nm): derived inverse | fitted inverse")
+        for motor, error in errors.items():
+            fitted = f"{error['fitted']:.3g}" if error['fitted'] is not None else '-'
+            print(f"  {motor}: {error['derived']:.3g} | {fitted}")
+        return errors
+
+    @staticmethod
+    def _source_signature(filepath):
+        '''Returns the (mtime_ns, size) of a source file, used to skip re-hashing files that have not been touched.'''
+        stat = os.stat(filepath)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _file_hash(filepath):
+        with open(filepath, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _read_json_source(self, filepath):
+        '''
+        Parses a calibration JSON file, reusing the previous parse if the file is unchanged since it was last read this
+        session (same modification time and size, or same content hash). Returns the parsed data.
+        '''
+        signature = self._source_signature(filepath)
+        cached = self._parsed_sources.get(filepath)
+        if cached is not None:
+            if cached['signature'] == signature:
+                return cached['data']
+            file_hash = self._file_hash(filepath)
+            if cached['sha1'] == file_hash:
+                cached['signature'] = signature
+                return cached['data']
+
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        self._parsed_sources[filepath] = {'signature': signature, 'sha1': hashlib.sha1(raw).hexdigest(), 'data': data}
+        return data
+
+    def bundle_path(self, microsteps=32):
+        return os.path.join(self.calibrationDir, 'calibration_bundle_microsteps_{}.npz'.format(microsteps))
+
+    def load_calibration_bundle(self, microsteps=32):
+        '''
+        Loads every calibration for a microstep setting from the compiled bundle (calibration_bundle_microsteps_N.npz)
+        with a single file read. The bundle holds the coefficients and model type of every calibration, the microstep
+        setting, the hash of each source JSON and the lookup tables of the derived inverses. If the bundle is missing,
+        unreadable or a source JSON has changed, the calibrations are rebuilt from JSON and the bundle is rewritten.
+        '''
+        bundle_path = self.bundle_path(microsteps)
+        source_path = os.path.join(self.calibrationDir, 'master_calibration_microsteps_{}.json'.format(microsteps))
+
+        try:
+            with open(bundle_path, 'rb') as f:
+                bundle = np.load(io.BytesIO(f.read()), allow_pickle=False)
+                manifest = json.loads(str(bundle['manifest']))
+                arrays = {key: bundle[key] for key in bundle.files if key != 'manifest'}
+        except (OSError, ValueError, KeyError) as e:
+            print('Calibration bundle not available ({}). Rebuilding from JSON.'.format(e))
+            return self.rebuild_calibration_bundle(microsteps)
+
+        source = manifest['sources'].get(os.path.basename(source_path))
+        if manifest.get('microsteps') != microsteps or source is None or not os.path.exists(source_path):
+            return self.rebuild_calibration_bundle(microsteps)
+        if list(self._source_signature(source_path)) != source['signature'] and self._file_hash(source_path) != source['sha1']:
+            print('Calibration source {} has changed. Rebuilding bundle.'.format(os.path.basename(source_path)))
+            return self.rebuild_calibration_bundle(microsteps)
+
+        for entry in manifest['calibrations']:
+            motor, direction = CalibrationRegistry.parse_name(entry['name'])
+            inverse_table = None
+            if direction == 'forward' and 'lut_{}_wl'.format(motor) in arrays:
+                inverse_table = (arrays['lut_{}_wl'.format(motor)], arrays['lut_{}_steps'.format(motor)])
+            self.register_calibration(entry['name'], entry['coefficients'], entry['source'], inverse_table)
+
+        print('Calibration bundle loaded: {} calibrations at {} microsteps.'.format(len(manifest['calibrations']), microsteps))
+
+    def rebuild_calibration_bundle(self, microsteps=32):
+        '''Builds the calibrations from the master JSON file and writes them, with their inverse lookup tables, to the bundle.'''
+        self.generate_master_calibration(microsteps)
+        self.save_calibration_bundle(microsteps)
+
+    def save_calibration_bundle(self, microsteps=32):
+        '''Writes the currently registered calibrations to the bundle file, replacing it atomically.'''
+        source_path = os.path.join(self.calibrationDir, 'master_calibration_microsteps_{}.json'.format(microsteps))
+        calibrations = [
+            {'name': calibration.name, 'source': calibration.source, 'model_type': calibration.model_type, 'coefficients': calibration.coefficients}
+            for table in (self.registry.forward, self.registry.inverse)
+            for calibration in table.values()
+        ]
+        manifest = {
+            'version': 1,
+            'microsteps': microsteps,
+            'domain': list(self.registry.domain),
+            'sources': {
+                os.path.basename(source_path): {
+                    'sha1': self._file_hash(source_path),
+                    'signature': list(self._source_signature(source_path)),
+                },
+            },
+            'calibrations': calibrations,
+        }
+
+        arrays = {'manifest': np.array(json.dumps(manifest))}
+        for motor, inverse in self.registry.derived_inverse.items():
+            arrays['lut_{}_wl'.format(motor)] = inverse.table_wavelengths
+            arrays['lut_{}_steps'.format(motor)] = inverse.table_steps
+
+        bundle_path = self.bundle_path(microsteps)
+        tmp_path = bundle_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, bundle_path)
+
     def _load_calibrations(self):
         """
         Load the calibration data from the calibrations_main.json file.
@@ -131,16 +493,9 @@ class Calibration:
         self.all_calibrations = self._load_calibrations()
         # self.calibrations = SimpleNamespace()
         
-        for name, calib in self.all_calibrations.items():
-            if len(calib) == 7:
-                print("Loading {} as poly_sin".format(name))
-                self.__setattr__(name, PolySinModulation(*calib))
-            if len(calib) == 6:
-                print("Loading {} as poly_sin".format(name))
-                self.__setattr__(name, LinSinModulation(*calib))
-            else:
-                print("Loading {} as poly1d".format(name))
-                self.__setattr__(name, np.poly1d(calib))
+        for name, calib in list(self.all_calibrations.items()):
+            model_type = self.register_calibration(name, calib, 'calibrations_main.json')
+            print("Loading {} as {}".format(name, model_type))
 
         print("Calibrations successfully built.")
 
@@ -167,19 +522,12 @@ class Calibration:
     def generate_master_calibration(self, microsteps=32):
         master_calibration = self.load_master_calibration(microsteps)
 
-        for action_group, dataset in master_calibration.items():
-            print("---> Loading {} calibrations".format(action_group))
+        for source, dataset in master_calibration.items():
+            print("---> Loading {} calibrations".format(source))
             for name, calib in dataset.items():
-                if len(calib) == 7:
-                    print("Loading {} as poly_sin".format(name))
-                    self.__setattr__(name, PolySinModulation(*calib))
-                if len(calib) == 6:
-                    print("Loading {} as poly_sin".format(name))
-                    self.__setattr__(name, LinSinModulation(*calib))
-                else:
-                    print("Loading {} as poly1d".format(name))
-                    self.__setattr__(name, np.poly1d(calib))
-        
+                model_type = self.register_calibration(name, calib, source)
+                print("Loading {} as {}".format(name, model_type))
+
         print("Master calibrations successfully built.")
 
     def generate_wavelength_axis(self, spectrometer_wavelength, array_length=2048):
@@ -237,34 +585,54 @@ class Calibration:
         steps_dict = {}
 
         for motor in action_group.keys():
-            calibration_name = 'wl_to_{}'.format(motor)
-            if hasattr(self, calibration_name):
-                calibration = getattr(self, calibration_name)
-                steps_dict[motor] = round(calibration(wavelength)) # round to nearest integer
+            cached = self._target_cache.get((motor, float(wavelength)))
+            if cached is not None:
+                steps_dict[motor] = cached
+            elif motor in self.registry:
+                steps_dict[motor] = int(self.registry.wavelengths_to_steps([wavelength], [motor])[0, 0])
             else:
                 print(f'{motor} not found in calibrations')
-                self.__dict__[calibration_name] = np.poly1d([0]) # default to zero
                 steps_dict[motor] = 0
 
         return steps_dict
+
+    def wl_to_step_matrix(self, wavelengths, action_group):
+        '''
+        Vectorised wl_to_steps: evaluates every motor of an action group over an array of wavelengths in one call.
+        Returns (motor_labels, steps) where steps is an integer array of shape (len(wavelengths), len(motor_labels)).
+        Raises ValueError if any motor in the group has no calibration.
+        '''
+        motors = list(action_group.keys())
+        return motors, self.registry.wavelengths_to_steps(wavelengths, motors)
+
+    def precompute_motor_targets(self, wavelengths, action_groups):
+        '''
+        Pre-computes the motor targets of several action groups for a set of wavelengths, so that wl_to_steps becomes a
+        table lookup during a scan. action_groups maps a group name to (action_group, group_wavelengths), where
+        group_wavelengths is the wavelength each group is driven to for each entry of wavelengths (e.g. shifted for the
+        monochromator). Returns {group_name: (motor_labels, steps)}. Raises ValueError if a motor has no calibration.
+        '''
+        targets = {}
+        for group_name, (action_group, group_wavelengths) in action_groups.items():
+            group_wavelengths = np.atleast_1d(np.asarray(group_wavelengths, dtype=float))
+            motors, steps = self.wl_to_step_matrix(group_wavelengths, action_group)
+            for row, wavelength in enumerate(group_wavelengths):
+                for column, motor in enumerate(motors):
+                    self._target_cache[(motor, float(wavelength))] = int(steps[row, column])
+            targets[group_name] = (motors, steps)
+        return targets
     
     def steps_to_wl(self, motor_steps: dict):
         '''Convert motor steps to wavelength. Takes a dictionary of motor labels ('l1', ...) and their steps'''
         wl_dict = {}
 
-        # if 'triax' in motor_steps.keys():
-        #     breakpoint()
-        # g3 -2740 50 inside
         # IMPORTANT: triax steps at 805 nm = 142073
 
         for motor, steps in motor_steps.items():
-            calibration_name = '{}_to_wl'.format(motor)
-            if hasattr(self, calibration_name):
-                calibration = getattr(self, calibration_name)
-                wl_dict[motor] = calibration(steps)
+            if motor in self.registry.forward or motor in self.registry.inverse:
+                wl_dict[motor] = self.registry.inverse_function(motor)(steps)
             else:
                 print(f'{motor} not found in calibrations')
-                self.__dict__[calibration_name] = np.poly1d([0]) # default to zero
                 wl_dict[motor] = None
 
         return wl_dict
@@ -282,26 +650,10 @@ class Calibration:
 
         for file in json_files:
 
-            with open(os.path.join(self.calibrationDir, file), 'r') as f:
-                data = json.load(f)
+            data = self._read_json_source(os.path.join(self.calibrationDir, file))
 
             for name, calib in data.items():
-                # print("Updating {} with autocalibration data".format(name))
-                if len(calib) == 7:
-                    # print("Loading {} as poly_sin".format(name))
-                    report_dict[name] ='poly_sin'
-                    self.all_calibrations[name] = calib
-                    self.__setattr__(name, PolySinModulation(*calib))
-                elif len(calib) == 6:
-                    # print("Loading {} as lin_sin".format(name))
-                    report_dict[name] = 'lin_sin'
-                    self.all_calibrations[name] = calib
-                    self.__setattr__(name, LinSinModulation(*calib))
-                else:
-                    # print("Loading {} as poly1d".format(name))
-                    report_dict[name] = 'poly1d'
-                    self.all_calibrations[name] = calib
-                    self.__setattr__(name, np.poly1d(calib))
+                report_dict[name] = self.register_calibration(name, calib, file)
 
         if report:
             for key, value in report_dict.items():
@@ -313,8 +665,7 @@ class Calibration:
         '''Updates g3 and g4 calibrations using the final monochromator calibration'''
 
         try:
-            with open(os.path.join(self.calibrationDir, 'monochromator_calibrations.json'), 'r') as f:
-                data = json.load(f)
+            data = self._read_json_source(os.path.join(self.calibrationDir, 'monochromator_calibrations.json'))
         except FileNotFoundError:
             print('No monochromator calibration data found.')
             return
@@ -325,23 +676,7 @@ class Calibration:
         report_dict = {}
         
         for name, calib in data.items():
-            #TODO: refactor the generation code into a function
-
-            if len(calib) == 7:
-                # print("Loading {} as poly_sin".format(name))
-                report_dict[name] ='poly_sin'
-                self.all_calibrations[name] = calib
-                self.__setattr__(name, PolySinModulation(*calib))
-            elif len(calib) == 6:
-                # print("Loading {} as lin_sin".format(name))
-                report_dict[name] = 'lin_sin'
-                self.all_calibrations[name] = calib
-                self.__setattr__(name, LinSinModulation(*calib))
-            else:
-                # print("Loading {} as poly1d".format(name))
-                report_dict[name] = 'poly1d'
-                self.all_calibrations[name] = calib
-                self.__setattr__(name, np.poly1d(calib))
+            report_dict[name] = self.register_calibration(name, calib, 'monochromator_calibrations.json')
 
         if report:
             for key, value in report_dict.items():
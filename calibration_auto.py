@@ -3,14 +3,22 @@ import sys
 import numpy as np
 import csv
 import json
+from concurrent.futures import ProcessPoolExecutor
 import scipy.optimize as opt
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
 from scipy.interpolate import interp1d
 import matplotlib.pyplot as plt
 from dataclasses import dataclass
 
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'analysis-spectroscopy','analysis_spectroscopy'))
 
-from analysis_spectroscopy import dataset_analysis as asp
+try:
+    from analysis_spectroscopy import dataset_analysis as asp
+except ImportError:
+    asp = None # only needed for interactive peak fitting and stored peakfit databases
+
+import peakfitting
 
 
 '''make a quick plot of calibration data'''
@@ -179,6 +187,8 @@ class AutoCalibration:
             'g4': (self.g2_to_wavelength, self.wavelength_to_g2),
         } # dict of possible motor calibrations and their methods. Update here as new autocals are created
         self.scriptDir = os.path.dirname(__file__)
+        self.autocalibrationDir = os.path.join(self.scriptDir, 'autocalibration')
+        self.calibrationDir = os.path.join(self.scriptDir, 'calibration')
         self.showplots = showplots
         self.calibration_metrics = {}
         self.calibrations = {}
@@ -219,7 +229,7 @@ class AutoCalibration:
 
         if load:
             filename = f'peakfit_autocal_{motor_label}'
-            dataSet = asp.DataSet(dataDir)
+            dataSet = asp.DataSet(self.autocalibrationDir)
             dataSet.load_database(filename)
         else:
             dataSet = self._extract_peak_positions(file, motor_label, manual=manual, **kwargs)
@@ -233,11 +243,13 @@ class AutoCalibration:
 
         return calibration_result
     
-    def _propagate_linked_calibrations(self, source_label, source_calibration):
-        """Propagate calibration from one motor to others using predefined scalar relations."""
+    def _propagate_linked_calibrations(self, source_label, source_calibration, save=True, targets=None):
+        """Propagate calibration from one motor to others using predefined scalar relations. targets optionally restricts the motors updated."""
         for target_label, (base_label, scalar) in self.linked_motor_scalars.items():
             if base_label != source_label:
                 continue  # Only apply if the calibration was for the linked base motor
+            if targets is not None and target_label not in targets:
+                continue
 
             print(f"Propagating calibration to {target_label} using scalar {scalar}")
 
@@ -264,15 +276,33 @@ class AutoCalibration:
             self.calibration_metrics[f'wl_to_{target_label}'] = metrics_fwd
             self.calibration_metrics[f'{target_label}_to_wl'] = metrics_inv
 
-            self.save_calibration(f'autocal_{target_label}')
-
-            print(f"Saved propagated calibration for {target_label}")
+            if save:
+                self.save_calibration(f'autocal_{target_label}')
+                print(f"Saved propagated calibration for {target_label}")
 
     
     def _extract_peak_positions(self, file, motor_label, manual=False, **kwargs):
-        smoothing = self.kwargs.get('smoothing', 3)
-        dataSet = asp.DataSet(dataDir, fileList=[file])
+        '''
+        Fits the LDR peak at every wavelength of an autocal file. By default the in-repo peakfitting engine is used
+        and a PeakTable is returned. Manual fitting, or engine='asp', uses the analysis_spectroscopy DataSet instead.
+        Optional kwargs (or AutoCalibration kwargs): data_mask, engine, peak_profile, processes.
+        '''
         data_mask = kwargs.get('data_mask', self.data_mask_dict.get(motor_label))
+        engine = kwargs.get('engine', self.kwargs.get('engine', 'internal'))
+
+        if not manual and engine != 'asp':
+            return peakfitting.fit_autocal_file(
+                os.path.join(self.autocalibrationDir, file),
+                profile=kwargs.get('peak_profile', self.kwargs.get('peak_profile', 'pseudo_voigt')),
+                data_mask=data_mask,
+                processes=kwargs.get('processes', self.kwargs.get('processes')),
+            )
+
+        if asp is None:
+            raise ImportError("analysis_spectroscopy is required for manual peak fitting (engine='asp').")
+
+        smoothing = self.kwargs.get('smoothing', 3)
+        dataSet = asp.DataSet(self.autocalibrationDir, fileList=[file])
 
         fileObj = dataSet.dataDict.get(file)
         dataSet.dataDict = fileObj.data
@@ -296,10 +326,16 @@ class AutoCalibration:
         dataSet.save_database(tagList='', seriesName=f'peakfit_autocal_{motor_label}')
         return dataSet
 
-    def _generate_motor_calibration(self, motor_label, dataSet, poly_order=2, show=False):
+    def _generate_motor_calibration(self, motor_label, dataSet, poly_order=2, show=False, save=True):
         peak_positions = []
 
-        for wavelength, peakdict in dataSet.peakfitDict.items():
+        if isinstance(dataSet, peakfitting.PeakTable):
+            peak_positions = dataSet.peak_positions()
+            peakfit_items = {}
+        else:
+            peakfit_items = dataSet.peakfitDict
+
+        for wavelength, peakdict in peakfit_items.items():
             peaks = [Peak(*p) for p in peakdict.get('peaks', [])]
             if not peaks:
                 continue
@@ -351,7 +387,8 @@ class AutoCalibration:
             plt.tight_layout()
             plt.show()
 
-        self.save_calibration(f'autocal_{motor_label}')
+        if save:
+            self.save_calibration(f'autocal_{motor_label}')
 
         return {
             'forward': {
@@ -367,13 +404,67 @@ class AutoCalibration:
         }
 
     
-    def autocalibrate_all(self, manual=False):
+    def autocalibrate_all(self, manual=False, **kwargs):
+        '''Calibrates every motor with an autocal file. Runs the headless parallel batch unless manual peak fitting is requested.'''
+        if not manual:
+            return self.autocalibrate_batch(**kwargs)
+
         for motor_type, file in self.autocal_dict.items():
             if file is None or motor_type in self.excluded:
                 continue
             dataSet = self.peakfit_autocal(file, motor_type, manual=manual)
             self.generate_autocal(motor_type, dataSet=dataSet)
     
+    def autocalibrate_batch(self, processes=None, poly_order=2, min_r2=0.95, linked=True):
+        '''
+        Headless batch calibration of every motor's latest autocal file. Each motor is peak-fitted and calibrated in
+        its own worker process without plotting. Linked motors (g2-g4) are propagated from g1 unless they were
+        calibrated successfully from an autocal file of their own. Every autocal_<motor>_autocal.json and a consolidated fit report
+        (calibration/autocal_report.json) are written atomically.
+
+        A fit is bad if either direction has R^2 below min_r2 or the motor could not be calibrated.
+        Returns (report, ok) where ok is False if any fit was bad.
+        '''
+        jobs = {motor: file for motor, file in self.autocal_dict.items() if file is not None and motor not in self.excluded}
+        settings = {'peak_profile': self.kwargs.get('peak_profile', 'pseudo_voigt')}
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {
+                motor: pool.submit(_autocalibrate_motor_worker, motor, file, poly_order, self.data_mask_dict.get(motor), linked, settings)
+                for motor, file in jobs.items()
+            }
+            for motor, future in futures.items():
+                try:
+                    results[motor] = future.result()
+                except Exception as e:
+                    results[motor] = {'error': f'{type(e).__name__}: {e}'}
+
+        outputs = {}
+        report = {motor: {'file': jobs[motor], 'error': result['error'], 'ok': False} for motor, result in results.items() if 'error' in result}
+        for motor, result in results.items():
+            if 'error' in result:
+                continue
+            for label, calibration in result['calibrations'].items():
+                if label != motor and label in jobs and label not in report:
+                    continue # linked motor calibrated from its own autocal file
+                outputs[label] = calibration
+                report[label] = {'file': jobs[motor], 'source': motor, 'n_points': result['n_points'], **result['metrics'][label]}
+                report[label]['ok'] = all(metrics['r2'] >= min_r2 for metrics in result['metrics'][label].values())
+
+        for label, calibration in outputs.items():
+            _write_json_atomic(os.path.join(self.calibrationDir, f'autocal_{label}_autocal.json'), calibration)
+        _write_json_atomic(os.path.join(self.calibrationDir, 'autocal_report.json'), report)
+
+        ok = bool(report) and all(entry['ok'] for entry in report.values())
+        for label, entry in sorted(report.items()):
+            if 'error' in entry:
+                print(f"{label}: FAILED ({entry['error']})")
+                continue
+            summary = ', '.join(f"{name} R2={m['r2']:.4f} RMSE={m['rmse']:.3g}" for name, m in entry.items() if isinstance(m, dict))
+            print(f"{label}: {'ok' if entry['ok'] else 'BAD FIT'} ({summary})")
+        return report, ok
+
     def autocalibrate_single(self, motor_type, manual=False, load=False, **kwargs):
         file = self.autocal_dict.get(motor_type)
         if file is None:
@@ -383,7 +474,7 @@ class AutoCalibration:
         print(file)
         if load is True:
             filename = 'peakfit_autocal_{}'.format(motor_type)
-            dataSet = asp.DataSet(dataDir)
+            dataSet = asp.DataSet(self.autocalibrationDir)
             dataSet.load_database(filename)
         else:
             dataSet = self.peakfit_autocal(file, motor_type, manual=manual, **kwargs)
@@ -392,7 +483,7 @@ class AutoCalibration:
 
     def peakfit_autocal(self, file, motor_type, manual=False, **kwargs):
         smoothing = self.kwargs.get('smoothing', 3)
-        dataSet = asp.DataSet(dataDir, fileList=[file])
+        dataSet = asp.DataSet(self.autocalibrationDir, fileList=[file])
         data_mask = self.data_mask_dict[motor_type]
 
         fileObj = dataSet.dataDict.get(file)
@@ -429,7 +520,7 @@ class AutoCalibration:
         }
         if dataSet is None:
             calibration_name = input('Enter the filename of the calibration data to load: ')
-            dataSet = asp.DataSet(dataDir)
+            dataSet = asp.DataSet(self.autocalibrationDir)
             dataSet.load_database(calibration_name)
         # dataSet.plot_peaks()
         dataSet.plot_current()
@@ -1076,6 +1167,37 @@ class Peaks:
     def __repr__(self):
         return f'Peak Object(pos={round(self.pos, 2)}, amp={round(self.amp, 2)}, fwhm={round(self.fwhm, 2)})'
 
+def _write_json_atomic(filepath, data):
+    '''Writes JSON to a temporary file and renames it over the target, so readers never see a partial file.'''
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, filepath)
+
+def _autocalibrate_motor_worker(motor_label, file, poly_order, data_mask, linked, settings):
+    '''
+    Process pool entry point for AutoCalibration.autocalibrate_batch. Fits and calibrates one motor headless and
+    returns its calibrations, including propagated linked motors, with per-direction fit metrics.
+    '''
+    autocal = AutoCalibration(showplots=False, **settings)
+    peaks = autocal._extract_peak_positions(file, motor_label, data_mask=data_mask)
+    if len(peaks.peak_positions()) < poly_order + 2:
+        raise RuntimeError(f'Only {len(peaks.peak_positions())} peaks found for {motor_label}, need at least {poly_order + 2}.')
+
+    result = autocal._generate_motor_calibration(motor_label, peaks, poly_order=poly_order, show=False, save=False)
+    if linked:
+        autocal._propagate_linked_calibrations(motor_label, result, save=False)
+
+    calibrations = {}
+    metrics = {}
+    for name, coefficients in autocal.calibrations.items():
+        label = name[len('wl_to_'):] if name.startswith('wl_to_') else name[:-len('_to_wl')]
+        calibrations.setdefault(label, {})[name] = [float(c) for c in coefficients]
+        fit = autocal.calibration_metrics[name]
+        metrics.setdefault(label, {})[name] = {'r2': float(fit.r2), 'rmse': float(fit.rmse), 'mae': float(fit.mae), 'res_std': float(fit.res_std)}
+
+    return {'calibrations': calibrations, 'metrics': metrics, 'n_points': len(peaks.peak_positions())}
+
 def mask_data(dataDict, range:tuple):
     newData = {}
     for wavelength, data in dataDict.items():
@@ -1168,8 +1290,16 @@ class CameraCalibration:
         self.dataSet.save_database(tagList='', seriesName=f'camera_cal_peaks_{self.series_name}')
         return self.dataSet
     
-    def calibrate_camera_axis(self, poly_order=2, load=False, show=True, skiprows=0):
-        """Automatically calibrate a motor axis based on peak fitting of a spectral dataset."""
+    def calibrate_camera_axis(self, poly_order=2, load=False, show=True, skiprows=0, method='joint'):
+        """
+        Automatically calibrate the camera pixel axis based on peak fitting of a spectral dataset.
+        method='joint' fits one global model for all spectrometer positions at once (see fit_joint_pixel_calibration);
+        method='chained' stitches per-position fits sequentially as before. In both, skiprows drops the first
+        skiprows peaks (of the first spectrometer position, in order of laser wavelength) from the fit.
+
+        Note that the saved wl_to_pixel/pixel_to_wl models (camera_calibration.json) are polynomials of poly_order
+        (default 2) with method='joint', whereas method='chained' always saved linear ones.
+        """
 
         peak_dict = {}  # Dictionary to store peaks per spectrometer wavelength
 
@@ -1189,6 +1319,9 @@ class CameraCalibration:
                 peak_dict[spectrometer_wavelength] = {}
             peak_dict[spectrometer_wavelength][laser_wavelength] = peaks[0].pos
 
+        if method == 'joint':
+            return self.fit_joint_pixel_calibration(peak_dict, poly_order=poly_order, show=show, skiprows=skiprows)
+
         # Now perform the calibration using pixel shifts between consecutive sets
         # return self._calibrate_pixel_to_wavelength(peak_dict)
         extended_pixel_array, poly_list = self._build_pixel_array(peak_dict, show=show)
@@ -1264,6 +1397,87 @@ class CameraCalibration:
 
 
 
+    def fit_joint_pixel_calibration(self, peak_dict, poly_order=2, show=False, skiprows=0):
+        """
+        Fits a single global wavelength -> pixel model for all spectrometer positions at once.
+
+        Each measured peak i, at spectrometer position s and laser wavelength wl, is modelled as
+            pixel_i = P(wl_i) - offset_s
+        where P is a polynomial of poly_order giving the pixel in the frame of the first spectrometer position and
+        offset_s is a nuisance parameter per position (offset of the first position fixed at 0). All coefficients and
+        offsets are solved together as one sparse linear least-squares problem, so errors do not accumulate from
+        position to position as in _extend_pixel_calibration. The inverse (pixel -> wavelength) is fitted to the
+        offset-corrected pixels.
+
+        peak_dict: {spectrometer_wavelength: {laser_wavelength: pixel}}
+        skiprows: number of peaks left out of the fit, counted from the first spectrometer position in order of laser
+            wavelength (as skiprows in _calibrate_extended_pixels).
+        Returns a dict with 'wl_to_pixel', 'pixel_to_wl', 'offsets' ({spectrometer_wavelength: offset}) and
+        'residuals' (rows of [spectrometer_wavelength, laser_wavelength, pixel, residual in pixels]).
+        """
+        rows = [
+            (spec_wl, float(laser_wl), float(pixel))
+            for spec_wl in sorted(peak_dict) for laser_wl, pixel in sorted(peak_dict[spec_wl].items(), key=lambda item: float(item[0]))
+        ][skiprows:]
+        positions = sorted({spec_wl for spec_wl, _, _ in rows})
+        if len(rows) < poly_order + len(positions):
+            raise ValueError(f"Need at least {poly_order + len(positions)} peaks for a joint fit of {len(positions)} positions, got {len(rows)}.")
+
+        position_index = np.array([positions.index(spec_wl) for spec_wl, _, _ in rows])
+        wavelengths = np.array([wl for _, wl, _ in rows])
+        pixels = np.array([pixel for _, _, pixel in rows])
+
+        # Scale wavelengths to [-1, 1] so the polynomial columns are well conditioned
+        domain = [wavelengths.min(), wavelengths.max()]
+        scaled = np.polynomial.polyutils.mapdomain(wavelengths, domain, [-1, 1])
+        vandermonde = sparse.csr_matrix(np.vander(scaled, poly_order + 1, increasing=True))
+        offset_columns = sparse.csr_matrix(
+            (-np.ones(len(rows)), (np.arange(len(rows)), position_index)), shape=(len(rows), len(positions))
+        )[:, 1:]  # first position fixes the pixel frame
+        design = sparse.hstack([vandermonde, offset_columns]).tocsr()
+
+        solution = lsqr(design, pixels, atol=1e-12, btol=1e-12)[0]
+        residuals = pixels - design @ solution
+
+        forward = np.polynomial.Polynomial(solution[:poly_order + 1], domain=domain, window=[-1, 1]).convert()
+        coeff_fwd = forward.coef[::-1]
+        offsets = np.concatenate([[0.0], solution[poly_order + 1:]])
+
+        extended_pixels = pixels + offsets[position_index]
+        coeff_inv = np.polyfit(extended_pixels, wavelengths, poly_order)
+        pred_wl = np.polyval(coeff_inv, extended_pixels)
+
+        self.calibrations['wl_to_pixel'] = coeff_fwd.tolist()
+        self.calibrations['pixel_to_wl'] = coeff_inv.tolist()
+        self.calibration_metrics['wl_to_pixel'] = FitMetrics(r_squared(pixels, pixels - residuals), rmse(residuals, 0), mae(residuals, 0), residual_std(residuals))
+        self.calibration_metrics['pixel_to_wl'] = FitMetrics(r_squared(wavelengths, pred_wl), rmse(wavelengths, pred_wl), mae(wavelengths, pred_wl), residual_std(wavelengths - pred_wl))
+        self.position_offsets = dict(zip(positions, offsets.tolist()))
+        self.residuals = np.column_stack([[spec_wl for spec_wl, _, _ in rows], wavelengths, pixels, residuals])
+
+        print(f"Joint camera calibration: {len(rows)} peaks, {len(positions)} positions, RMSE {self.calibration_metrics['wl_to_pixel'].rmse:.3f} px")
+
+        if show:
+            fig, ax = plt.subplots(2, 1)
+            for index, spec_wl in enumerate(positions):
+                mask = position_index == index
+                ax[0].scatter(wavelengths[mask], extended_pixels[mask], label=spec_wl)
+                ax[1].plot(wavelengths[mask], residuals[mask], marker='o', linestyle='')
+            ax[0].plot(np.sort(wavelengths), np.polyval(coeff_fwd, np.sort(wavelengths)), color='black', label='Global fit')
+            ax[0].set_title('Joint Camera Calibration: Wavelength to Pixel')
+            ax[0].set_ylabel('Pixel')
+            ax[0].legend()
+            ax[1].set_xlabel('Wavelength (nm)')
+            ax[1].set_ylabel('Residuals (pixels)')
+            plt.tight_layout()
+            plt.show()
+
+        return {
+            'wl_to_pixel': self.calibrations['wl_to_pixel'],
+            'pixel_to_wl': self.calibrations['pixel_to_wl'],
+            'offsets': self.position_offsets,
+            'residuals': self.residuals,
+        }
+
     def _extend_pixel_calibration(self, curve_dict, poly_order=2, show=False):
         """Extend the pixel calibration using polynomial fitting."""
         poly_list = []
@@ -1351,31 +1565,32 @@ class CameraCalibration:
 
     
 
-dataDir = r'C:\Users\Raman\matchbook\RamanMicroscope\data\camera_calibration_data_17-04-25\processed_spectra'
-dataSet = asp.DataSet(dataDir)
-dataSet.access_database('camera_cal_peaks_processed_spectra')
-camcal = CameraCalibration(dataSet=dataSet, dataDir=dataDir)
-# breakpoint()
-# camcal.load_all_csv()
-# camcal._extract_peak_positions(manual=True)
-# camcal.dataSet.plot_peaks()
-camcal.calibrate_camera_axis(poly_order=2, load=True, show=True, skiprows=3)
-breakpoint()
-camcal._save_calibration('camera_calibration')
-breakpoint()
-
-# series name - name of file
-calibration_name = 'autocal_2'
-scriptDir = os.path.dirname(__file__)
-dataDir = os.path.join(scriptDir, 'autocalibration')
-
-autocal = AutoCalibration(showplots=True, smoothing=1)
-# autocal.autocalibrate_all(manual=False)
-autocal.autocalibrate_motor_axis('g1', manual=True, poly_order=2, load=False, linked=True, data_mask=(750,850)) # linked applies scalar calculation of g2-4 from g1 
-breakpoint()
-
-# TODO: create unit tests, create metric for quality assessment at a glance
-
-# OLD
-# peakfit_autocal(scriptDir, dataDir, calibration_name)
-# generate_autocal(scriptDir, dataDir, calibration_name)
+if __name__ == '__main__':
+    dataDir = r'C:\Users\Raman\matchbook\RamanMicroscope\data\camera_calibration_data_17-04-25\processed_spectra'
+    dataSet = asp.DataSet(dataDir)
+    dataSet.access_database('camera_cal_peaks_processed_spectra')
+    camcal = CameraCalibration(dataSet=dataSet, dataDir=dataDir)
+    # breakpoint()
+    # camcal.load_all_csv()
+    # camcal._extract_peak_positions(manual=True)
+    # camcal.dataSet.plot_peaks()
+    camcal.calibrate_camera_axis(poly_order=2, load=True, show=True, skiprows=3)
+    breakpoint()
+    camcal._save_calibration('camera_calibration')
+    breakpoint()
+
+    # series name - name of file
+    calibration_name = 'autocal_2'
+    scriptDir = os.path.dirname(__file__)
+    dataDir = os.path.join(scriptDir, 'autocalibration')
+
+    autocal = AutoCalibration(showplots=True, smoothing=1)
+    # autocal.autocalibrate_all(manual=False)
+    autocal.autocalibrate_motor_axis('g1', manual=True, poly_order=2, load=False, linked=True, data_mask=(750,850)) # linked applies scalar calculation of g2-4 from g1 
+    breakpoint()
+
+    # TODO: create unit tests, create metric for quality assessment at a glance
+
+    # OLD
+    # peakfit_autocal(scriptDir, dataDir, calibration_name)
+    # generate_autocal(scriptDir, dataDir, calibration_name)
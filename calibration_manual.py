@@ -30,6 +30,8 @@ import os
 import sys
 import numpy as np
 
+import motor_recordings
+
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'analysis-spectroscopy','analysis_spectroscopy'))
 
 # from analysis_spectroscopy import dataset_analysis as asp
@@ -178,19 +180,21 @@ class Calibration:
 
 
     def load_motor_recordings(self, filename=None):
+        '''
+        Loads motor recordings as NumPy arrays: {'wavelength': array, 'triax_positions': array, 'laser_positions': {'l1': array, ...}, ...}.
+        Defaults to the append-only motor_recordings.jsonl, falling back to the legacy motor_recordings.json. Both formats are accepted by filename.
+        '''
         if not filename:
-            motor_recordings_file = os.path.join(self.dataDir, 'motor_recordings.json')
+            motor_recordings_file = os.path.join(self.dataDir, motor_recordings.RECORDINGS_FILE)
+            if not os.path.exists(motor_recordings_file):
+                motor_recordings_file = os.path.join(self.dataDir, motor_recordings.LEGACY_RECORDINGS_FILE)
         else:
             motor_recordings_file = os.path.join(self.dataDir, filename)
 
         if not os.path.exists(motor_recordings_file):
             raise FileNotFoundError(f"Calibration file '{motor_recordings_file}' not found.")
-        
-        
-        with open(motor_recordings_file, 'r') as f:
-            data = json.load(f)
-        
-        self.full_data = self._flatten_calibration_data(data)
+
+        self.full_data = motor_recordings.load_recordings(motor_recordings_file)
         
         return self.full_data
     
@@ -201,32 +205,6 @@ class Calibration:
         # self.triax_positions = self.full_data['triax_positions']
         self.__dict__.update(self.full_data)
 
-    def _flatten_calibration_data(self, data):
-        # Prepare output structure
-        flattened = {}
-
-        # Sort top-level keys numerically
-        sorted_entries = [data[key] for key in sorted(data, key=int)]
-
-        for entry in sorted_entries:
-            for key, value in entry.items():
-                if isinstance(value, dict):
-                    if key not in flattened:
-                        flattened[key] = defaultdict(list)
-                    for subkey, subval in value.items():
-                        flattened[key][subkey].append(subval)
-                else:
-                    if key not in flattened:
-                        flattened[key] = []
-                    flattened[key].append(value)
-
-        # Convert nested defaultdicts to dicts
-        for key in flattened:
-            if isinstance(flattened[key], defaultdict):
-                flattened[key] = dict(flattened[key])
-
-        return flattened
-    
     def sort_flattened_data_by_wavelength(self):
         # Get the sorted indices from the wavelength list
         sorted_indices = np.argsort(self.full_data["wavelength"])
@@ -234,13 +212,13 @@ class Calibration:
         sorted_data = {}
 
         for key, value in self.full_data.items():
-            if isinstance(value, list):
-                # Directly sort 1D lists
-                sorted_data[key] = [value[i] for i in sorted_indices]
+            if isinstance(value, (list, np.ndarray)):
+                # Directly sort 1D columns
+                sorted_data[key] = np.asarray(value)[sorted_indices]
             elif isinstance(value, dict):
                 # Recursively sort each subkey in nested dictionaries
                 sorted_data[key] = {
-                    subkey: [subval[i] for i in sorted_indices]
+                    subkey: np.asarray(subval)[sorted_indices]
                     for subkey, subval in value.items()
                 }
             else:
@@ -86,7 +86,8 @@ import os
 import json
 import numpy as np
 import argparse
-import matplotlib.pyplot as plt
+
+from calibration import build_calibration_model
 
 def load_calibration(file_path):
     """Load a calibration JSON file."""
@@ -110,6 +111,8 @@ def process_calibration(calib_data, new_microsteps, poly_order=2, wl_min=700, wl
        - Re-fit the inverse polynomial from the scaled motor steps.
     Returns a new calibration dictionary with updated coefficients.
     """
+    import matplotlib.pyplot as plt # interactive use only; the batch re-scaler below is headless
+
     # Scale factor: new microsteps divided by old microsteps (128)
     scale = new_microsteps / 128.0
 
@@ -198,21 +201,144 @@ def main(input_dir, output_dir, microsteps, poly_order=2, wl_min=400, wl_max=800
     print(f"Processed calibrations saved in {output_folder}")
     print(f"Master calibration file saved as {master_file_path}")
 
-if __name__ == "__main__":
 
+def evaluate_forward_models(calibrations, wavelengths):
+    """
+    Evaluates many forward (wavelength -> steps) calibrations on one shared wavelength grid.
+    Polynomial models are evaluated together as a single matrix product with a common Vandermonde matrix; other
+    model types (sin-modulated fits) are evaluated individually.
+    Takes a list of coefficient lists and returns an array of shape (n_models, n_wavelengths).
+    """
+    steps = np.empty((len(calibrations), len(wavelengths)))
+    polynomial_rows = [row for row, coeffs in enumerate(calibrations) if build_calibration_model(coeffs)[0] == 'poly1d']
+
+    if polynomial_rows:
+        degree = max(len(calibrations[row]) for row in polynomial_rows) - 1
+        coefficients = np.zeros((len(polynomial_rows), degree + 1))
+        for i, row in enumerate(polynomial_rows):
+            coeffs = calibrations[row]
+            coefficients[i, degree + 1 - len(coeffs):] = coeffs  # right-align, highest power first
+        steps[polynomial_rows] = coefficients @ np.vander(wavelengths, degree + 1).T
+
+    for row, coeffs in enumerate(calibrations):
+        if row not in polynomial_rows:
+            steps[row] = build_calibration_model(coeffs)[1](wavelengths)
+    return steps
+
+def rescale_calibration_set(calibrations, microsteps_list, reference_microsteps=128, poly_order=2, wl_min=700.0, wl_max=900.0, n_points=2001, key_filter=('g1', 'g2', 'g3', 'g4')):
+    """
+    Rescales a complete calibration set ({source_file: {name: coefficients}}) to several microstep settings.
+
+    Every forward model of the axes in key_filter is evaluated once on a shared dense wavelength grid, scaled by
+    microsteps/reference_microsteps, and refitted as forward and inverse polynomials of poly_order. All forward fits
+    for a microstep setting are done in one polyfit call. Calibrations of other axes are copied unchanged.
+
+    Returns ({microsteps: scaled calibration set}, {microsteps: {source_file: {axis: residuals}}}) where residuals
+    hold the maximum forward error (steps), inverse error (nm) and round-trip error (nm) over the grid.
+    """
+    wavelengths = np.linspace(wl_min, wl_max, n_points)
+    scaled_keys = [
+        (source, name[len('wl_to_'):])
+        for source, dataset in calibrations.items()
+        for name in dataset
+        if name.startswith('wl_to_') and name[len('wl_to_'):] in key_filter
+    ]
+    reference_steps = evaluate_forward_models([calibrations[source]['wl_to_' + axis] for source, axis in scaled_keys], wavelengths)
+
+    rescaled = {}
+    report = {}
+    for microsteps in microsteps_list:
+        scale = microsteps / reference_microsteps
+        steps = reference_steps * scale
+
+        new_set = {
+            source: {
+                name: coeffs for name, coeffs in dataset.items()
+                if not any(name in ('wl_to_' + axis, axis + '_to_wl') for s, axis in scaled_keys if s == source)
+            }
+            for source, dataset in calibrations.items()
+        }
+        new_report = {}
+        if scaled_keys:
+            forward_coeffs = np.polyfit(wavelengths, steps.T, poly_order).T  # one fit per row
+            fitted_steps = forward_coeffs @ np.vander(wavelengths, poly_order + 1).T
+
+            for row, (source, axis) in enumerate(scaled_keys):
+                inverse_coeffs = np.polyfit(steps[row], wavelengths, poly_order)
+                new_set[source]['wl_to_' + axis] = forward_coeffs[row].tolist()
+                new_set[source][axis + '_to_wl'] = inverse_coeffs.tolist()
+                new_report.setdefault(source, {})[axis] = {
+                    'forward_max_error_steps': float(np.max(np.abs(fitted_steps[row] - steps[row]))),
+                    'inverse_max_error_nm': float(np.max(np.abs(np.polyval(inverse_coeffs, steps[row]) - wavelengths))),
+                    'round_trip_max_error_nm': float(np.max(np.abs(np.polyval(inverse_coeffs, fitted_steps[row]) - wavelengths))),
+                }
+
+        rescaled[microsteps] = new_set
+        report[microsteps] = new_report
+    return rescaled, report
+
+def _save_json_atomic(data, file_path):
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, file_path)
+
+def batch_rescale(input_dir, output_dir, microsteps_list, reference_microsteps=128, extra_files=(), **kwargs):
+    """
+    Loads every calibration JSON in input_dir (plus any extra_files, e.g. the camera calibration, which are copied
+    unchanged) and writes master_calibration_microsteps_N.json for each N in microsteps_list, together with
+    rescale_report.json holding the fit residuals of every rescaled axis.
+    """
+    calibrations = {}
+    for file_name in sorted(os.listdir(input_dir)):
+        if file_name.endswith('.json'):
+            calibrations[file_name] = load_calibration(os.path.join(input_dir, file_name))
+
+    rescaled, report = rescale_calibration_set(calibrations, microsteps_list, reference_microsteps, **kwargs)
+    for file_path in extra_files:
+        extra = load_calibration(file_path)
+        for calibration_set in rescaled.values():
+            calibration_set[os.path.basename(file_path)] = extra
 
-    input_dir = os.path.join(os.path.dirname(__file__), "calibration")
-    output_dir = os.path.join(os.path.dirname(__file__), "calibration", "scaled_calibrations")
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    for microsteps, calibration_set in rescaled.items():
+        master_file_path = os.path.join(output_dir, f"master_calibration_microsteps_{microsteps}.json")
+        _save_json_atomic(calibration_set, master_file_path)
+        print(f"Master calibration file saved as {master_file_path}")
 
+    report_path = os.path.join(output_dir, 'rescale_report.json')
+    _save_json_atomic({str(microsteps): entries for microsteps, entries in report.items()}, report_path)
+    for microsteps, entries in report.items():
+        worst = max((axis_report['round_trip_max_error_nm'] for source in entries.values() for axis_report in source.values()), default=0.0)
+        print(f"{microsteps} microsteps: {sum(len(source) for source in entries.values())} axes rescaled, worst round-trip error {worst:.2e} nm")
+    return rescaled, report
 
-    main(
-        input_dir=input_dir,
-        output_dir=output_dir,
-        microsteps=32,  # Example microsteps value
-        poly_order=2,
-        wl_min=700.0,
-        wl_max=900.0,
-        n_points=100
+
+if __name__ == "__main__":
+    calibration_dir = os.path.join(os.path.dirname(__file__), "calibration")
+
+    parser = argparse.ArgumentParser(description="Rescale a calibration set to new motor microstep settings.")
+    parser.add_argument("microsteps", nargs="+", type=int, help="Target microstep settings, e.g. 32 64 128.")
+    parser.add_argument("--input-dir", default=os.path.join(calibration_dir, "microstep_128"), help="Directory of reference calibration JSON files.")
+    parser.add_argument("--output-dir", default=os.path.join(calibration_dir, "scaled_calibrations"), help="Directory for the master calibration files and report.")
+    parser.add_argument("--reference-microsteps", type=int, default=128, help="Microstep setting of the reference calibrations.")
+    parser.add_argument("--extra", nargs="*", default=[], help="Calibration files copied unchanged into every master file, e.g. calibration/camera_calibration.json.")
+    parser.add_argument("--axes", nargs="*", default=['g1', 'g2', 'g3', 'g4'], help="Motor axes whose step counts depend on microstepping.")
+    parser.add_argument("--poly-order", type=int, default=2)
+    parser.add_argument("--wl-min", type=float, default=700.0)
+    parser.add_argument("--wl-max", type=float, default=900.0)
+    parser.add_argument("--n-points", type=int, default=2001)
+    args = parser.parse_args()
+
+    batch_rescale(
+        input_dir=args.input_dir,
+        output_dir=args.output_dir,
+        microsteps_list=args.microsteps,
+        reference_microsteps=args.reference_microsteps,
+        extra_files=args.extra,
+        poly_order=args.poly_order,
+        wl_min=args.wl_min,
+        wl_max=args.wl_max,
+        n_points=args.n_points,
+        key_filter=tuple(args.axes),
     )
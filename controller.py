@@ -1,7 +1,9 @@
 import serial
 import time
+import numpy as np
 
 from instruments_old import Instrument, ui_callable
+from tracing import tracer_for
 
 # class SerialComs:
 #     def __init__(self, com_port='COM10', baud=9600, report=True, dtr=False):
@@ -33,12 +35,15 @@ from instruments_old import Instrument, ui_callable
 
 class ArduinoMEGA:
 
+    MAX_SWEEP_SAMPLES = 600 # size of the LDR sweep buffer in the firmware (maxSweepSamples)
+
     def __init__(self, interface, com_port='COM10', baud=9600, simulate=False, report=True, dtr=False):
         self.interface = interface
         self.simulate = simulate
         self.com_port = com_port
         self.baud = baud
         self.report = report
+        self.logger = interface.logger.getChild('controller')
 
         # if the firmware commands change, update this dictionary
         self.message_map = {
@@ -144,10 +149,13 @@ class ArduinoMEGA:
         '''Simple command to send to the controller. Assumes command length is correct for buffer size'''
 
         if self.report is True:
-            print('>MEGA:{}'.format(command))
+            self.logger.cmd('>MEGA:%s', command)
 
-        self._send_command_to_UNO(command)
-        response = self._read_from_serial_until()
+        tracer = tracer_for(self.interface)
+        with tracer.span('serial_write', 'controller'):
+            self._send_command_to_UNO(command)
+        with tracer.span('serial_wait', 'controller'):
+            response = self._read_from_serial_until()
 
         return response
     
@@ -184,6 +192,28 @@ class ArduinoMEGA:
         response = self.send_command('mld0m')
         return response
 
+    def sweep_ldr0(self, motor_id, distance, speed, interval):
+        '''
+        Moves one motor by `distance` steps at a constant `speed` (steps/s) while the firmware samples LDR0 every
+        `interval` steps. All samples are returned in a single response and parsed into an (n, 2) integer array of
+        [position, raw LDR value] rows.
+        '''
+        report = self.report
+        self.report = False # a sweep returns hundreds of lines
+        try:
+            response = self.send_command('w{}{} {} {}w'.format(motor_id, int(distance), float(speed), int(interval)))
+        finally:
+            self.report = report
+
+        header = [line for line in response if line.startswith('n')]
+        samples = [line.split(',') for line in response if ',' in line]
+        if not header:
+            raise RuntimeError('LDR sweep failed: {}'.format(' '.join(response)))
+        if int(header[0][1:]) != len(samples):
+            print('LDR sweep returned {} of {} samples.'.format(len(samples), header[0][1:]))
+
+        return np.array(samples, dtype=int).reshape(-1, 2)
+
     def get_monochromator_motor_positions(self):
         response = self.send_command('get_monochromator_positions')
         if response == []:
@@ -257,7 +287,7 @@ class ArduinoMEGA:
                 continue
 
             if self.report is True:
-                print(response)
+                self.logger.cmd('<MEGA:%s', response.rstrip())
 
             split_responses = response.split('\r\n')
             for item in split_responses:
@@ -0,0 +1,111 @@
+'''
+Import-time benchmark for the entry modules.
+
+Each module is imported in a fresh interpreter with `python -X importtime`, and the cumulative import cost of every
+module it pulls in is reported, largest first. Use --save to store a baseline and --baseline to compare against it,
+so a change that drags a GUI toolkit, plotting library or vendor SDK back into a headless import path shows up:
+
+    python import_time_run_me.py                                   # interface_run_me
+    python import_time_run_me.py interface_run_me calibration_auto --top 15
+    python import_time_run_me.py --save calibration/import_times.json
+    python import_time_run_me.py --baseline calibration/import_times.json --budget 2.0
+
+The exit status is 1 if any module's total import time exceeds --budget seconds.
+'''
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+def measure_import(module, repeat=3):
+    '''
+    Imports module in a fresh interpreter repeat times and returns {imported module: (self seconds, cumulative seconds)},
+    keeping the fastest run of each so disk-cache warm-up does not count. The entry for module itself is its total import time.
+    '''
+    best = {}
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=script_dir, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+        for line in result.stderr.splitlines():
+            # import time:  self [us] | cumulative | imported package
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            timing = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+            if name not in best or timing[1] < best[name][1]:
+                best[name] = timing
+    return best
+
+
+def report(module, timings, top=20, baseline=None):
+    '''Prints the top imports of module by cumulative time, with the change from baseline if given.'''
+    total = timings.get(module, (0.0, 0.0))[1]
+    print(f"\n{module}: {total:.3f} s total import time")
+    header = f"  {'cumulative (s)':>14} {'self (s)':>9}"
+    if baseline is not None:
+        header += f" {'change (s)':>10}"
+    print(header + '  module')
+
+    ranked = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_time, cumulative) in ranked[:top]:
+        line = f"  {cumulative:14.3f} {self_time:9.3f}"
+        if baseline is not None:
+            previous = baseline.get(name)
+            line += f" {cumulative - previous[1]:+10.3f}" if previous is not None else f" {'new':>10}"
+        print(line + f'  {name}')
+
+    if baseline is not None:
+        dropped = [name for name in baseline if name not in timings]
+        if dropped:
+            print(f"  no longer imported: {', '.join(sorted(dropped))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report the cumulative import cost of each module pulled in by the entry modules.')
+    parser.add_argument('modules', nargs='*', default=['interface_run_me'], help='Modules to import (default: interface_run_me).')
+    parser.add_argument('--top', type=int, default=20, help='Number of imports to list per module.')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh-interpreter runs per module; the fastest is kept.')
+    parser.add_argument('--save', help='Write the measured timings to this JSON file.')
+    parser.add_argument('--baseline', help='JSON file from --save to compare against.')
+    parser.add_argument('--budget', type=float, default=None, help='Fail if any module takes longer than this many seconds to import.')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    measured = {}
+    over_budget = []
+    for module in args.modules:
+        timings = measure_import(module, repeat=args.repeat)
+        measured[module] = timings
+        report(module, timings, top=args.top, baseline=baseline.get(module) if args.baseline else None)
+        total = timings.get(module, (0.0, 0.0))[1]
+        if args.budget is not None and total > args.budget:
+            over_budget.append(f"{module} ({total:.3f} s)")
+
+    if args.save:
+        tmp_path = args.save + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(measured, f, indent=2)
+        os.replace(tmp_path, args.save)
+        print(f"\nTimings saved to {args.save}")
+
+    if over_budget:
+        print(f"\nOver the {args.budget} s import budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -42,6 +42,10 @@ class SimulatedCameraInterface:
         except ValueError:
             self.logger.error("Invalid exposure time value")
 
+    def is_cooled(self, tolerance=2.0):
+        """The simulated sensor is always at temperature"""
+        return True
+
     def check_camera_temperature(self):
         """Check the camera temperature"""
         # Simulate a temperature check
@@ -113,7 +117,7 @@ class SimulatedCameraInterface:
     def grab_frame(self, timeout=100000):        
         image_data = self._generate_simulated_image()
         # Simulate acquisition time
-        self.logger.info("Simulated camera acquiring frame...")
+        self.logger.debug("Simulated camera acquiring frame...")
         time.sleep(self.acqtime)
         return image_data
 
@@ -5,8 +5,6 @@ import os
 import threading
 import time
 import numpy as np
-import matplotlib.pyplot as plt
-from PIL import Image
 from ctypes import pointer, cast, POINTER
 from functools import wraps
 
@@ -83,6 +81,7 @@ class TucsenCamera(Camera):
         self.roi = (0, 1220, 2048, 148)
 
         self.timeout = kwargs.get('timeout', 100000)
+        self.target_temperature = None # °C, set by set_target_temperature
         # self.roi = (0, 0, 1000, 1000)
 
         self.camera_parameters = {}
@@ -234,6 +233,7 @@ class TucsenCamera(Camera):
         status = TUCAM_Capa_SetValue(self.TUCAMOPEN.hIdxTUCam, TUCAM_IDCAPA.TUIDC_RESOLUTION.value, binning_level)
 
         if status == TUCAMRET.TUCAMRET_SUCCESS:
+            self.binning = binning_level
             print(f"Hardware binning set to level {binning_level}.")
         else:
             print(f"Failed to set binning. Error code: {status}")
@@ -359,6 +359,12 @@ class TucsenCamera(Camera):
             print("Reshape failed:", e)
             return None
         
+    def is_cooled(self, tolerance=2.0):
+        '''True once the sensor is within tolerance °C of the target temperature (or no target has been set).'''
+        if self.target_temperature is None:
+            return True
+        return self.check_camera_temperature(report=False) <= self.target_temperature + tolerance
+
     def check_camera_temperature(self, report=True):
         """
         Checks and prints the current camera temperature.
@@ -540,6 +546,7 @@ class TucsenCamera(Camera):
             0
         )
         if status == TUCAMRET.TUCAMRET_SUCCESS:
+            self.target_temperature = t
             self.logger.info(f"Target temperature set to {t}°C (prop value {prop_val}).")
         else:
             self.logger.error(
@@ -291,6 +291,10 @@ class MillenniaLaser(Laser):
         response = self.send_command('?WARMUP%')
         return float(response[:-1])
 
+    def is_warmed_up(self):
+        """True once the laser reports 100% warmup."""
+        return self.get_warmup_status() >= 100
+
     @ui_callable
     def open_shutter(self):
         """Open the laser shutter to allow beam emission."""
@@ -1,16 +1,24 @@
 import time
-import pyvisa
+import threading
+from tracing import tracer_for
 from ..instrument_base import Instrument
 from ..ui_decorators import ui_callable
 from .simulated_triax import SimulatedTriaxSerial
 
 
 class Triax(Instrument):
+    # Move time model used before the timing database has measured any TRIAX moves: overhead (s) + rate (s/step) * distance
+    MOVE_OVERHEAD = 0.5
+    MOVE_RATE = 1e-4
+    # Time the TRIAX takes to complete its initialisation (A) sequence before it answers again
+    REINITIALISE_TIME = 100
+
     def __init__(self, interface, simulate=False):
         super().__init__()
         self.interface = interface
         self.simulate = simulate or interface.simulate
         self.calibration_service = interface.calibration_service
+        self.logger = interface.logger.getChild('triax')
 
         self.command_functions = {
             'get_spectrometer_position': self.get_spectrometer_position,
@@ -27,6 +35,15 @@ class Triax(Instrument):
         }
 
         self.spectrometer_position = 380000
+        self.triax_steps = None # last known grating position in steps, None when unknown (e.g. after an unverified move)
+        self.poll_interval = 0.02 # seconds between H0 queries once a move is predicted to have finished
+        self.settle_fraction = 0.8 # fraction of the predicted move time slept before polling starts
+        self.timeout_factor = 3.0 # timeout as a multiple of the predicted move time
+        self.min_timeout = 2.0
+
+        self.ready = threading.Event() # cleared while the initialisation sequence runs
+        self.ready.set()
+        self._gpib_lock = threading.RLock() # serialises GPIB exchanges between the reset thread and other callers
 
         # 108659 = 750 nm
 
@@ -64,22 +81,47 @@ class Triax(Instrument):
     def __str__(self):
         return "TRIAX Spectrometer"
     
-    def initialise(self):
-        '''Connect and establish primary attributes.'''
+    def initialise(self, reset=False):
+        '''Connect and establish primary attributes. If reset is True the initialisation sequence is started in the background and is_ready() reports when it has finished.'''
         self.connect()
-        self.get_spectrometer_position()
+        if reset:
+            self.initialise_spectrometer()
+            return None
+        self.get_spectrometer_position(refresh=True)
         # self.generate_wavelength_axis()
         self.interface.microscope.generate_wavelength_axis() # TODO: move from microscope to spectrometer. Use @property to generate wavelength axis on the fly
         return self.spectrometer_position
 
+    def is_ready(self):
+        '''True unless the initialisation sequence is still running.'''
+        return self.ready.is_set()
+
     @ui_callable
     def initialise_spectrometer(self):
-        '''Initialise the spectrometer.'''
-        response = self.send_command('initialise')
+        '''Initialise the spectrometer. Runs in the background; other TRIAX commands wait until it has finished.'''
+        if not self.ready.is_set():
+            self.logger.info('TRIAX initialisation already in progress.')
+            return
+        self.triax_steps = None
+        self.ready.clear()
+        threading.Thread(target=self._run_initialisation, name='triax-initialise', daemon=True).start()
+        self.logger.info('TRIAX initialising in the background ({} s).'.format(self.REINITIALISE_TIME))
+
+    def _run_initialisation(self):
+        try:
+            self.send_command('initialise')
+            self.get_spectrometer_position(refresh=True)
+            self.interface.microscope.generate_wavelength_axis()
+            self.logger.info('TRIAX initialisation complete.')
+        except Exception as e:
+            self.logger.exception('TRIAX initialisation failed: {}'.format(e))
+        finally:
+            self.ready.set()
 
     @ui_callable
     def default_grating(self):
         '''Set the default gratin;'g for the spectrometer.'''
+        self.triax_steps = None
         response = self.send_command('specgrat1')
         # print(response)
         return response
@@ -87,7 +129,7 @@ class Triax(Instrument):
     @ui_callable
     def other_grating(self):
         '''Set the other grating for the spectrometer.'''
-
+        self.triax_steps = None
         response = self.send_command('specgrat2')
         # print(response)
         return response
@@ -119,6 +161,7 @@ class Triax(Instrument):
     @ui_callable
     def move_grating_relative(self, position):
         '''Move the grating the specified number of steps.'''
+        self.triax_steps = None
         response = self.send_command('mg {}'.format(position))
         return response
     
@@ -127,10 +170,11 @@ class Triax(Instrument):
         try:
             wavelength = float(wavelength)
         except ValueError:
-            print('Invalid input')
+            self.logger.error('Invalid wavelength: %s', wavelength)
             return
         
-        triax_steps = self.get_triax_steps()
+        # the cache is kept current by our own moves, so only query the hardware when the position is unknown
+        triax_steps = self.triax_steps if self.triax_steps is not None else self.get_triax_steps()
         
         target_steps = round(self.interface.microscope.calibration_service.wl_to_triax(wavelength))
         # 
@@ -139,47 +183,82 @@ class Triax(Instrument):
         if new_steps == 0:
             return
         
-        print('UNO>g {}>triax'.format(new_steps))
+        self.logger.cmd('UNO>g %s>triax', new_steps)
 
+        move_start = time.perf_counter()
         response = self.send_command('mg {}'.format(new_steps))
         if response == 'o':
-            triax_res = self.wait_for_triax(target_steps)
+            with tracer_for(self.interface).span('serial_wait', 'triax'):
+                triax_res = self.wait_for_triax(target_steps, distance=abs(new_steps))
+            self._record_move_time(time.perf_counter() - move_start, abs(new_steps))
             if triax_res == 'S0':
-                print('Triax moved to {} nm'.format(wavelength))
+                self.logger.info('Triax moved to %s nm', wavelength)
                 self.triax_steps = target_steps
                 return 'S0'
             else:
-                print('Triax move failed: {}'.format(triax_res))
+                self.logger.error('Triax move failed: %s', triax_res)
                 return 'F0'
 
         else:
-            print('Triax communication failed:')
-            print(response)
+            self.logger.error('Triax communication failed: %s', response)
+
+    def _record_move_time(self, duration, steps):
+        '''Reports a measured move duration to the acquisition timing database, if one is available, for scan time estimates and move waits.'''
+        timing_database = self._timing_database()
+        if timing_database is not None:
+            timing_database.record('triax_move', duration, steps)
+
+    def _timing_database(self):
+        acq_ctrl = getattr(self.interface, 'acq_ctrl', None)
+        return getattr(acq_ctrl, 'timing_database', None)
+
+    def predict_move_time(self, distance):
+        '''Predicted duration in seconds of a grating move of distance steps, from measured moves when available.'''
+        timing_database = self._timing_database()
+        if timing_database is not None:
+            overhead, rate = timing_database['triax_move'].coefficients()
+        else:
+            overhead, rate = self.MOVE_OVERHEAD, self.MOVE_RATE
+        return overhead + rate * abs(distance)
 
-    def wait_for_triax(self, target_steps, timeout=10):
-        '''Polls the spectrometer until the target steps are reached. Note the MOTOR BUSY CHECK (E) on the spectrometer does not send a response with this configuration, so we use this command instead.'''
+    def wait_for_triax(self, target_steps, distance=None, timeout=None):
+        '''
+        Waits until the grating reaches target_steps. Note the MOTOR BUSY CHECK (E) on the spectrometer does not send a response with this configuration, so the position (H0) is polled instead.
+        The position is not queried until most of the predicted move time has passed, then it is polled every poll_interval seconds.
+        Unless given, the timeout scales with the predicted move time.
+        '''
         start = time.time()
+        if distance is None:
+            distance = abs(target_steps - self.triax_steps) if self.triax_steps is not None else 0
+        predicted = self.predict_move_time(distance)
+        if timeout is None:
+            timeout = max(self.min_timeout, self.timeout_factor * predicted)
+
+        time.sleep(self.settle_fraction * predicted)
         while True:
             response = self.get_triax_steps()
             if response == target_steps:
                 return 'S0'
-            time.sleep(0.1)
             if time.time() - start > timeout:
-                print('Timeout reached')
+                self.logger.error('Timeout reached waiting for the TRIAX to reach %s steps', target_steps)
                 return 'F0'
+            time.sleep(self.poll_interval)
+
 
-    
 
     @ui_callable
-    def get_spectrometer_position(self):
-        '''Get the current position of the spectrometer in motor steps.'''
-        self.spectrometer_position = self.get_triax_steps()
+    def get_spectrometer_position(self, refresh=False):
+        '''Get the current position of the spectrometer in motor steps. The cached position is returned unless it is unknown or refresh is True.'''
+        if refresh or self.triax_steps is None:
+            self.get_triax_steps()
+        self.spectrometer_position = self.triax_steps
         return self.spectrometer_position
     
     @ui_callable
     def go_to_position(self, position):
         print("Going to the position: {}".format(position))
         command = self.message_map['move_grating'] + str(position)
+        self.triax_steps = None
         response = self._send_command_to_spectrometer(command)
         return response
 
@@ -187,6 +266,7 @@ class Triax(Instrument):
         # Open a connection to the instrument
         if self.simulate:
             self.spectrometer = SimulatedTriaxSerial()
+        import pyvisa # VISA backend only needed when talking to the real instrument
         print("Connecting to TRIAX spectrometer...")
         rm = pyvisa.ResourceManager()
         rm.list_resources()
@@ -227,15 +307,13 @@ class Triax(Instrument):
         return response
     
     def _send_command_to_spectrometer(self, command, report=True):
-        self.spectrometer.write(command)
-        time.sleep(0.0001)
+        with self._gpib_lock:
+            self.spectrometer.write(command)
+            time.sleep(0.0001)
 
-        if command == 'A':
-            count = 100
-            while count > 0:
-                print('Initialising: Sleeping for {} seconds'.format(count))
-                time.sleep(1)
-                count -= 1
-        
-        response = self.spectrometer.read()
+            if command == 'A':
+                # the spectrometer does not answer until its initialisation sequence has finished
+                time.sleep(self.REINITIALISE_TIME)
+
+            response = self.spectrometer.read()
         return response
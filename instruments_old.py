@@ -4,25 +4,13 @@
 import inspect
 import serial
 import time
-import pyvisa
 import numpy as np
 import os
 import json
 import ctypes
 from copy import copy
 from ctypes import *
-try:
-    from tucsen.TUCam import *
-except Exception as e:  # catch all exceptions, not just ImportError
-    print(f"TUcam error: {e}. Can continue with simulated camera but will crash if camera is required.")
 import sys
-if sys.platform == "win32":
-    from ctypes import OleDLL
-if sys.platform == "linux":
-    print("Linux detected, using libtucam.so")
-    print("implementation not yet available")
-else:
-    print("Unsupported platform. Please use Windows or Linux.")
 
 
 from enum import Enum
@@ -30,15 +18,17 @@ import time
 import numpy as np
 import os
 import threading
-import tkinter as tk
-from tkinter import ttk, messagebox
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from functools import wraps
+from collections import OrderedDict
 
 from calibration import Calibration, LdrScan
-from acquisitioncontrol import AcquisitionControl, AcquisitionGUI
+from state_store import InstrumentState, StateWriter
+from tracing import tracer_for
+import motor_recordings
+from acquisitioncontrol import AcquisitionControl
 
 # def simulate(expected_value=None, function_handler=None):
 #     """
@@ -92,10 +82,12 @@ class MotionControl:
     - Homing commands to not apply backlash corrections to the homed position. This means if the backlash changes, the motor homes need to be recalibrated.
     - Home calibration is performed at the microscope level by calling "calhome" at the interface level. Home positions are stored in the config file.'''
 
-    def __init__(self, controller, motor_map, config):
+    def __init__(self, controller, motor_map, config, state=None):
         self.controller = controller
         self.motor_map = motor_map  # Dictionary mapping motor names to IDs
+        self.motor_labels = {motor_id: label for label, motor_id in motor_map.items()}
         self.config = config
+        self.state = state if state is not None else InstrumentState() # tracked motor positions, updated by every read, write and move
         self.home_positions = config.get("home_positions", {})
         self._monochromator_steps = None
         self._laser_steps = None
@@ -259,6 +251,7 @@ class MotionControl:
         response = self.controller.get_motor_positions(motors)
         pos_dict = self._parse_motor_positions(response)
         labelled_dict = self._return_labelled_positions(pos_dict, motor_dict)
+        self.state.update_motors(labelled_dict)
         
         return labelled_dict
     
@@ -267,6 +260,7 @@ class MotionControl:
         motor_id_dict = {self.motor_map[motor]: steps for motor, steps in motor_dict.items()}
         print("Writing motor positions {}".format(motor_id_dict))
         response = self.controller.write_motor_positions(motor_id_dict)
+        self.state.update_motors(motor_dict)
 
         print("Motor positions written: {}".format(response))
 
@@ -384,6 +378,7 @@ class MotionControl:
         else:
             response = self.controller.send_command(motion_command)
             self.wait_for_motors(list(motor_id_steps.keys()))
+        self.track_move(motor_id_steps)
 
         if backlash:
             motors_for_correction = {motor: steps for motor, steps in motor_id_steps.items() if int(steps) < 0} # Only apply backlash if moving backwards. i.e. forwards direction should already have the backlash taken up
@@ -392,6 +387,34 @@ class MotionControl:
         
         return response
 
+    def track_move(self, motor_id_steps):
+        '''Records a relative move, keyed by motor ID, in the tracked state. Used for moves sent to the controller directly.'''
+        self.state.move_motors({self.motor_labels.get(motor_id, motor_id): steps for motor_id, steps in motor_id_steps.items()})
+
+    def motors_changed_by(self, command):
+        '''
+        Returns the labels of the motors a raw controller command moves or re-zeroes: moves (o1X100 1Y-50o), position
+        writes (s1X0s), LDR sweeps (w1X200 500 10w), homing (h1X) and the firmware mode switches (ramanmode, imagemode),
+        which move the mode motor. Queries and other commands return an empty list.
+        '''
+        command = command.strip()
+        if command.lower() in ('ramanmode', 'imagemode'):
+            return ['mode'] if 'mode' in self.motor_map else []
+        if len(command) > 2 and command[0] in 'osw' and command[-1] == command[0]:
+            tokens = command[1:-1].split()
+            motor_ids = [token[:2] for token in (tokens[:1] if command[0] == 'w' else tokens)]
+        elif len(command) == 3 and command[0] == 'h':
+            motor_ids = [command[1:]]
+        else:
+            return []
+        return [self.motor_labels[motor_id.upper()] for motor_id in motor_ids if motor_id.upper() in self.motor_labels]
+
+    def invalidate_positions(self, command):
+        '''Forgets the tracked positions of the motors a raw controller command moved or re-zeroed, so they are re-queried on the next save.'''
+        labels = self.motors_changed_by(command)
+        if labels:
+            self.state.invalidate_motors(labels)
+
     @ui_callable
     def get_laser_motor_positions(self, *args):
         '''Get the current positions of the laser motors.'''
@@ -516,8 +539,13 @@ class Microscope(Instrument):
         self.microscope_mode = 'ramanmode'
 
         self.wavelength_axis = None
+        self.wavelength_axis_cache_size = 64
+        self._wavelength_axis_cache = OrderedDict()
         self.instrument_state = {}
         self.autosave = True
+        # Tracked instrument state, persisted in the background after it changes (see state_store.py)
+        self.state = InstrumentState(logger=self.logger.getChild('state'))
+        self.state_writer = StateWriter(self.state, os.path.join(self.scriptDir, 'instrument_state.json'), self._serialise_instrument_state, min_interval=2.0, logger=self.logger.getChild('state'))
 
         self.config_path = os.path.join(self.scriptDir, "microscope_config.json")
         self.config = self.load_config()
@@ -525,6 +553,7 @@ class Microscope(Instrument):
         self.stage_positions_microns = {
             'x': 0, 'y': 0, 'z': 0
         }
+        self.state.set('stage_positions', dict(self.stage_positions_microns))
 
         # self.ldr_scan_dict = self.config.get("ldr_scan_dict", {})
         # self.hard_limits = self.config.get("hard_limits", {})
@@ -538,7 +567,7 @@ class Microscope(Instrument):
         # acquisition parameters
 
         # Motion control
-        self.motion_control = MotionControl(self.controller, self.motor_map, self.config)
+        self.motion_control = MotionControl(self.controller, self.motor_map, self.config, state=self.state)
 
         self.command_functions = {
             'nyi': self.not_yet_implemented,
@@ -564,6 +593,8 @@ class Microscope(Instrument):
             'writemotors': self.write_motor_positions,
             'rldr': self.read_ldr0,
             'autocal': self.run_calibration,
+            'ldrsweep': self.run_ldr0_sweep,
+            'ldrsearch': self.run_ldr0_peak_search,
             'loadconfig': self.load_config,
             # Stage motion
             'x': self.move_x,
@@ -576,6 +607,7 @@ class Microscope(Instrument):
             'setstop': self.set_end_pos,
             'scanmode': self.toggle_scan_mode,
             'acquirescan': self.cli_acquire_scan,
+            'resumescan': self.cli_resume_scan,
 
             # GUI commands
             
@@ -682,6 +714,12 @@ class Microscope(Instrument):
         self.interface.acq_ctrl.cli_acquire_scan()
         return
 
+    @ui_callable
+    def cli_resume_scan(self, filename=None):
+        '''CLI command to resume an interrupted scan from its journal. Defaults to the current filename.'''
+        self.interface.acq_ctrl.cli_resume_scan(filename)
+        return
+
     # TODO: use setter and getter for stage_pos_microns and update_stage
     @ui_callable
     def get_stage_positions_microns(self):
@@ -692,12 +730,44 @@ class Microscope(Instrument):
     
     @ui_callable
     def generate_wavelength_axis(self):
-        spectrometer_wavelength = self.calculate_spectrometer_wavelength()['triax'] # TODO:change to getter
-        self.wavelength_axis = self.calibration_service.generate_wavelength_axis(spectrometer_wavelength)
+        '''
+        Sets the wavelength axis for the current TRIAX position. Axes are memoised (LRU) by TRIAX steps, camera ROI,
+        binning and calibration version, and the TRIAX position is taken from the tracked spectrometer state, so
+        returning to a previously visited grating position needs neither a GPIB read nor a recalculation.
+        '''
+        triax_steps = getattr(self.spectrometer, 'triax_steps', None)
+        if triax_steps is None:
+            triax_steps = self.spectrometer.get_spectrometer_position()
+
+        key = (
+            int(triax_steps),
+            tuple(getattr(self.camera, 'roi', ()) or ()),
+            getattr(self.camera, 'binning', None),
+            getattr(self.calibration_service, 'version', None),
+        )
+        cached = self._wavelength_axis_cache.get(key)
+        if cached is None:
+            spectrometer_wavelength = self.calculate_spectrometer_wavelength(triax_steps)
+            wavelength_axis = np.asarray(self.calibration_service.generate_wavelength_axis(spectrometer_wavelength['triax']))
+            wavelength_axis.setflags(write=False) # shared between cache hits
+            self._wavelength_axis_cache[key] = (spectrometer_wavelength, wavelength_axis)
+            if len(self._wavelength_axis_cache) > self.wavelength_axis_cache_size:
+                self._wavelength_axis_cache.popitem(last=False)
+        else:
+            self._wavelength_axis_cache.move_to_end(key)
+            self.spectrometer_position = triax_steps
+            self.spectrometer_wavelength, wavelength_axis = cached
+            self._publish_wavelengths('spectrometer_wavelength', self.spectrometer_wavelength)
+
+        self.wavelength_axis = wavelength_axis
+        return self.wavelength_axis
 
     
     @ui_callable
     def open_acquisition_gui(self):
+        import tkinter as tk # GUI toolkits are imported on use so headless runs do not load them
+        from acquisitioncontrol import AcquisitionGUI
+
         def run_gui():
             root = tk.Tk()
             params = self.interface.acq_ctrl
@@ -720,23 +790,33 @@ class Microscope(Instrument):
 
     
     def save_instrument_state(self):
-        '''Saves the state of the microscope and motors to a config, in case of reboot or crash. Uses motor labels as keys.'''
+        '''Saves the state of the microscope and motors to a config, in case of reboot or crash. Uses motor labels as keys. Motor positions come from the tracked state; the motors are only queried if some positions are unknown (not tracked yet, or invalidated by an untracked move).'''
         if self.autosave == False:
             return
-        
-        self.controller.report = False
-        motor_positions = self.get_all_motor_positions(report=False)
-        self.controller.report = True
 
-        instrument_state = {
-            "motor_dict": motor_positions,
-            "stage_positions": self.stage_positions_microns
+        self._query_unknown_motor_positions()
+        self.state_writer.flush()
+
+    def request_state_save(self):
+        '''Schedules a background save of the instrument state if it has changed since the last save. Only queries the motors if some positions are unknown, otherwise returns immediately.'''
+        if self.autosave:
+            self._query_unknown_motor_positions()
+            self.state_writer.request_save()
+
+    def _query_unknown_motor_positions(self):
+        '''Re-reads all motor positions if any motor has no tracked position, so a save never persists a partial motor_dict.'''
+        if any(label not in self.state.motor_positions for label in self.motor_map if label != 'triax'):
+            self.controller.report = False
+            self.get_all_motor_positions(report=False)
+            self.controller.report = True
+
+    @staticmethod
+    def _serialise_instrument_state(values):
+        '''Formats the tracked state as instrument_state.json.'''
+        return {
+            "motor_dict": values['motor_positions'],
+            "stage_positions": values['stage_positions'],
             }
-        
-        save_state_path = os.path.join(self.scriptDir, 'instrument_state.json')
-        
-        with open(save_state_path, 'w') as f:
-            json.dump(instrument_state, f, indent=2)
 
     def load_instrument_state(self):
         '''Loads the state of the microscope and motors from a config, in case of reboot or crash.'''
@@ -749,6 +829,7 @@ class Microscope(Instrument):
             self.micro_log.info('Instrument state loaded from file')
             self.write_motor_positions(motor_dict=motor_positions)
             self.stage_positions_microns = stage_positions
+            self.state.set('stage_positions', dict(stage_positions))
             
             self.get_all_current_wavelengths()
             self.detect_microscope_mode()
@@ -872,6 +953,7 @@ class Microscope(Instrument):
         # Save to config
         self.config.setdefault("home_positions", {})
         self.config["home_positions"][motor_id] = position
+        self.state.update_motors({label: position})
         self.micro_log.info(f"Saved home position {position} for {motor_id}")
 
         self.write_config()
@@ -989,6 +1071,7 @@ class Microscope(Instrument):
         motor_id_dict = {self.motor_map[motor]: steps for motor, steps in motor_dict.items() if motor in self.motor_map}
             
         self.controller.write_motor_positions(motor_id_dict)
+        self.state.update_motors({motor: steps for motor, steps in motor_dict.items() if motor in self.motor_map})
         self.micro_log.info('Motor positions written to file')
 
     
@@ -1006,20 +1089,11 @@ class Microscope(Instrument):
         if extra is None:
             extra = self.calculate_laser_wavelength()
 
-        try:
-            with open(os.path.join(self.interface.calibrationDir, 'motor_recordings', 'motor_recordings.json'), 'r') as f:
-                current_data = json.load(f)
-        except FileNotFoundError:
-            current_data = {}
-
-
         data = {'laser_positions':laser_motor_positions, 'grating_positions':grating_motor_positions, 'triax_positions':triax_position,'wavelength':float(extra)}
 
-        current_data[f'{len(current_data)}'] = data
-        # dump the data to a json file
-        with open(os.path.join(self.interface.calibrationDir, 'motor_recordings', 'motor_recordings.json'), 'w') as f:
-            json.dump(current_data, f)
-            # f.write('\n')
+        # append-only log; recordings from an older motor_recordings.json are carried over on first use
+        recordings_path = motor_recordings.migrate_legacy(os.path.join(self.interface.calibrationDir, 'motor_recordings'))
+        motor_recordings.append_recording(recordings_path, data)
             
         # with open(os.path.join(self.interface.calibrationDir, 'motor_recordings', 'motor_recordings.txt'), 'a') as f:
         #     f.write('{}:{}:{}:{}\n'.format(laser_motor_positions, monochromator_motor_positions, triax_position, extra))
@@ -1165,6 +1239,7 @@ class Microscope(Instrument):
                 self.stage_positions_microns[key] += value
             else:
                 raise ValueError(f"Invalid stage position: {key}")
+        self.state.set('stage_positions', dict(self.stage_positions_microns))
             
         self.interface.acq_ctrl.update_stage_positions()
         
@@ -1234,6 +1309,7 @@ class Microscope(Instrument):
 
         for key in self.stage_positions_microns.keys():
             self.stage_positions_microns[key] = 0
+        self.state.set('stage_positions', dict(self.stage_positions_microns))
         print('Stage home ({}) set to current position'.format(self.interface.acq_ctrl.current_stage_coordinates))
 
     @ui_callable
@@ -1283,8 +1359,12 @@ class Microscope(Instrument):
         return ldr_value
     
     @ui_callable
-    def run_calibration(self, motor:str, wavelength_range=(750, 850), resolution=5, safety=False):
-       
+    def run_calibration(self, motor:str, wavelength_range=(750, 850), resolution=5, safety=False, mode='sweep'):
+        '''
+        Runs an LDR autocalibration of a motor over a wavelength range. mode selects how each wavelength is scanned:
+        'sweep' (continuous firmware sweep, default), 'step' (point-by-point scan of the full window) or 'search'
+        (coarse-to-fine peak search centred on the peak predicted from the previous wavelength).
+        '''
         if motor.lower() not in self.ldr_scan_dict.keys():
             print("Invalid motor. Must be one of: ", self.ldr_scan_dict.keys())
             return
@@ -1297,6 +1377,10 @@ class Microscope(Instrument):
             wavelength_range = (float(vals[0]), float(vals[1]))
 
         resolution = float(resolution)
+        mode = str(mode).lower()
+        if mode not in ('sweep', 'step', 'search'):
+            print("Invalid mode. Must be one of: sweep, step, search")
+            return
 
         initial_grating = copy(self.grating_steps)
         initial_laser = copy(self.laser_steps)
@@ -1312,11 +1396,20 @@ class Microscope(Instrument):
         # initial_pinhole_pos = int(self.pinhole)
         # self.close_pinhole(pinhole_size)
         self.close_mono_shutter()
+
+        peak_offset = None # offset of the last measured peak from the calibrated position, used to predict the next one
         
         for wl in wavelengths:
             self.go_to_laser_wavelength(wl)
             self.go_to_grating_wavelength(wl)
-            scan_data = self.run_ldr0_scan(motor)
+            if mode == 'sweep':
+                scan_data = self.run_ldr0_sweep(motor).tolist()
+            elif mode == 'search':
+                search_length = None if peak_offset is None else self.ldr_scan_dict[motor]['range'] // 2
+                scan_data, peak_offset = self.run_ldr0_peak_search(motor, offset=peak_offset or 0, search_length=search_length)
+                scan_data = scan_data.tolist()
+            else:
+                scan_data = self.run_ldr0_scan(motor)
             # Apply the conversion to ensure the data is serializable
             calibrationDict[float(wl)] = scan_data
 
@@ -1465,6 +1558,135 @@ class Microscope(Instrument):
             current_pos = final_pos
         
         return scan_data
+
+    @ui_callable
+    def run_ldr0_peak_search(self, motor, offset=0, search_length=None, resolution=None, coarse_points=7):
+        """
+        Locate the LDR transmission peak of a motor with a coarse-to-fine search instead of sampling the whole window.
+        A coarse bracket of coarse_points samples is taken across +/- search_length around the predicted peak
+        (current position + offset), re-centred if the maximum falls on the edge of the window. The bracket around
+        the maximum is then narrowed by golden-section search down to the scan resolution. Moves towards lower
+        positions are backlash-corrected so every sample is approached from the same direction.
+        
+        Parameters:
+        motor (str): Motor name ('l1', 'l2', 'g1', etc.)
+        offset (int): Predicted peak position relative to the current position, in steps
+        search_length (int, optional): Half-width of the coarse bracket in steps
+        resolution (int, optional): Final bracket width in steps
+        coarse_points (int): Number of samples in the coarse bracket
+        
+        Returns:
+        tuple: ((n, 2) array of [position, LDR value] rows sorted by position, peak offset from the starting position)
+        """
+        if motor not in self.ldr_scan_dict.keys():
+            print("Invalid motor. Must be one of:", list(self.ldr_scan_dict.keys()))
+            return np.empty((0, 2), dtype=int), 0
+
+        motor_id = self.motor_map.get(motor)
+        if not motor_id:
+            print(f"Could not find motor ID for {motor}")
+            return np.empty((0, 2), dtype=int), 0
+
+        search_length = int(search_length or self.ldr_scan_dict[motor]['range'])
+        resolution = max(int(resolution or self.ldr_scan_dict[motor]['resolution']), 1)
+        coarse_points = max(int(coarse_points), 3)
+
+        motor_positions = self.motion_control.get_motor_positions(self.motion_control.generate_motor_dict([motor]))
+        start_pos = current_pos = motor_positions[motor]
+        samples = {}
+
+        def sample(position):
+            nonlocal current_pos
+            position = int(round(position))
+            if position not in samples:
+                steps = position - current_pos
+                if steps != 0:
+                    self.motion_control.move_motors({motor_id: steps}, backlash=steps < 0)
+                current_pos = position
+                samples[position] = 11000 - int(self.read_ldr0())
+            return samples[position]
+
+        # Coarse bracket, shifted up to twice if the maximum is at the edge of the window
+        centre = start_pos + int(offset)
+        for _ in range(3):
+            coarse = np.linspace(centre - search_length, centre + search_length, coarse_points).round().astype(int)
+            values = [sample(position) for position in coarse]
+            best = int(np.argmax(values))
+            if 0 < best < coarse_points - 1:
+                break
+            centre = coarse[best]
+        lower, upper = coarse[max(best - 1, 0)], coarse[min(best + 1, coarse_points - 1)]
+
+        # Golden-section refinement of the bracket around the maximum
+        ratio = (np.sqrt(5) - 1) / 2
+        while upper - lower > resolution:
+            inner_lower = upper - ratio * (upper - lower)
+            inner_upper = lower + ratio * (upper - lower)
+            if sample(inner_lower) >= sample(inner_upper):
+                upper = inner_upper
+            else:
+                lower = inner_lower
+
+        scan_data = np.array(sorted(samples.items()), dtype=int).reshape(-1, 2)
+        peak = self._parabolic_peak(scan_data)
+        print(f"{motor} LDR peak at {peak:.1f} steps from {len(scan_data)} samples")
+        return scan_data, int(round(peak - start_pos))
+
+    @staticmethod
+    def _parabolic_peak(scan_data):
+        '''Returns the position of the maximum of an (n, 2) [position, value] array, refined by a parabola through the highest sample and its neighbours.'''
+        best = int(np.argmax(scan_data[:, 1]))
+        if best == 0 or best == len(scan_data) - 1:
+            return float(scan_data[best, 0])
+
+        x = scan_data[best - 1:best + 2, 0].astype(float)
+        y = scan_data[best - 1:best + 2, 1].astype(float)
+        a, b, _ = np.polyfit(x, y, 2)
+        if a >= 0:
+            return float(scan_data[best, 0])
+        return float(np.clip(-b / (2 * a), x[0], x[2]))
+
+    @ui_callable
+    def run_ldr0_sweep(self, motor, search_length=None, resolution=None, speed=None):
+        """
+        Run an LDR scan as a single continuous sweep. The motor is moved to the start of the range, then the
+        controller firmware drives it through the range at constant speed, sampling the LDR every `resolution`
+        steps, and returns all samples in one response. Covers the same range as run_ldr0_scan with two serial
+        transactions instead of several per point.
+        
+        Parameters:
+        motor (str): Motor name ('l1', 'l2', 'g1', etc.)
+        search_length (int, optional): Range to scan either side of the current position, in steps
+        resolution (int, optional): Steps between LDR samples
+        speed (float, optional): Sweep speed in steps/s. Defaults to the motor's 'sweep_speed' in ldr_scan_dict, or 500
+        
+        Returns:
+        np.ndarray: (n, 2) array of [position, LDR value] rows, LDR values inverted as in run_ldr0_scan
+        """
+        if motor not in self.ldr_scan_dict.keys():
+            print("Invalid motor. Must be one of:", list(self.ldr_scan_dict.keys()))
+            return np.empty((0, 2), dtype=int)
+
+        motor_id = self.motor_map.get(motor)
+        if not motor_id:
+            print(f"Could not find motor ID for {motor}")
+            return np.empty((0, 2), dtype=int)
+
+        search_length = int(search_length or self.ldr_scan_dict[motor]['range'])
+        resolution = int(resolution or self.ldr_scan_dict[motor]['resolution'])
+        speed = float(speed or self.ldr_scan_dict[motor].get('sweep_speed', 500))
+
+        # the firmware buffers a limited number of samples per sweep
+        min_resolution = int(np.ceil(2 * search_length / (self.controller.MAX_SWEEP_SAMPLES - 1)))
+        if resolution < min_resolution:
+            print(f"LDR sweep resolution increased from {resolution} to {min_resolution} steps to fit the controller sample buffer.")
+            resolution = min_resolution
+
+        self.motion_control.move_motors({motor_id: -search_length}, backlash=False)
+        samples = self.controller.sweep_ldr0(motor_id, 2 * search_length, speed, resolution)
+        self.motion_control.track_move({motor_id: 2 * search_length})
+        samples[:, 1] = 11000 - samples[:, 1]
+        return samples
     
     @property
     def current_laser_wavenumber(self):
@@ -1643,7 +1865,9 @@ class Microscope(Instrument):
     @ui_callable
     def get_detector_temperature(self):
         '''Returns the camera temperature.'''
-        return round(self.camera.check_camera_temperature(), 2)
+        temperature = round(float(self.camera.check_camera_temperature()), 2)
+        self.state.set('detector_temperature', temperature)
+        return temperature
     
     @ui_callable
     def set_detector_temperature(self, temperature):
@@ -1679,17 +1903,22 @@ class Microscope(Instrument):
         shift (bool): If True, maintains the current Raman shift. If False, sets monochromator to same wavelength.
         """
         self.logger.info(f"Moving all components to wavelength: {wavelength} nm")
+        tracer = tracer_for(self.interface)
         # First move the laser
-        self.go_to_laser_wavelength(wavelength)
-        self.go_to_grating_wavelength(wavelength) # move all grating motors
+        with tracer.span('wavelength_move', 'laser'):
+            self.go_to_laser_wavelength(wavelength)
+        with tracer.span('wavelength_move', 'grating'):
+            self.go_to_grating_wavelength(wavelength) # move all grating motors
         
         # Then handle the monochromator
         if shift is True:
             # Maintain the current Raman shift by calculating new monochromator position
-            self.go_to_wavenumber(self.current_shift)
+            with tracer.span('wavelength_move', 'monochromator'):
+                self.go_to_wavenumber(self.current_shift)
 
         # Finally, move the spectrometer
-        self.go_to_spectrometer_wavelength(wavelength)
+        with tracer.span('wavelength_move', 'spectrometer'):
+            self.go_to_spectrometer_wavelength(wavelength)
         
         self.logger.info(f"All components set to wavelength: {wavelength} nm")
         return True
@@ -2164,6 +2393,7 @@ class Microscope(Instrument):
 
         # Calculate wavelengths for each motor using calibration functions
         self.monochromator_wavelengths = self.calibration_service.steps_to_wl(current_pos)
+        self._publish_wavelengths('monochromator_wavelengths', self.monochromator_wavelengths)
       
         return self.monochromator_wavelengths
 
@@ -2184,6 +2414,7 @@ class Microscope(Instrument):
         
         # Calculate wavelengths for each motor using calibration functions
         self.grating_wavelengths = self.calibration_service.steps_to_wl(current_pos)
+        self._publish_wavelengths('grating_wavelengths', self.grating_wavelengths)
         
         return self.grating_wavelengths
 
@@ -2226,7 +2457,7 @@ class Microscope(Instrument):
 
     @ui_callable
     def get_spectrometer_position(self):
-        '''Get the current position of the spectrometer in motor steps.'''
+        '''Get the current position of the spectrometer in motor steps, from the spectrometer's position cache.'''
         self.interface.spectrometer.get_spectrometer_position()
         print('Current spectrometer position: {}'.format(self.interface.spectrometer.spectrometer_position))
         return self.interface.spectrometer.spectrometer_position
@@ -2267,6 +2498,7 @@ class Microscope(Instrument):
             self.spectrometer_position = steps
 
         self.spectrometer_wavelength = self.calibration_service.steps_to_wl({'triax':self.spectrometer_position}) # TODO: rename triax_to_wl to spectrometer_steps_to_wl - requires change to calibration files and will be breaking until otherwise completed
+        self._publish_wavelengths('spectrometer_wavelength', self.spectrometer_wavelength)
         return self.spectrometer_wavelength
     
     def report_all_current_positions(self):
@@ -2326,8 +2558,13 @@ class Microscope(Instrument):
                
         # Calculate wavelengths for each motor using calibration functions
         self.laser_wavelengths = self.calibration_service.steps_to_wl(current_pos)
+        self._publish_wavelengths('laser_wavelengths', self.laser_wavelengths)
 
         return self.laser_wavelengths
+
+    def _publish_wavelengths(self, key, wavelengths):
+        '''Records calculated wavelengths in the instrument state as plain floats, keyed by motor label.'''
+        self.state.set(key, {motor: None if wavelength is None else float(wavelength) for motor, wavelength in wavelengths.items()})
     
     def calculate_polarization_angles(self):
         pass
@@ -2859,6 +3096,7 @@ class Triax(Instrument):
 
     def connect(self):
         # Open a connection to the instrument
+        import pyvisa
         print("Connecting to TRIAX spectrometer...")
         rm = pyvisa.ResourceManager()
         rm.list_resources()
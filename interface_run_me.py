@@ -1,5 +1,6 @@
 # TRIAX: ~ 700 nm at 131343 steps
 import os
+import sys
 import traceback
 
 from controller import ArduinoMEGA
@@ -7,21 +8,19 @@ from instruments_old import Instrument, Microscope
 from instruments.instrument_base import Instrument as InstrumentBase
 from instruments import MillenniaLaser, Triax
 from calibration import Calibration
+from startup import DeviceStartup
 from acquisitioncontrol import AcquisitionControl
-from acquisitioncontrol import MainWindow
-from PyQt5.QtWidgets import QApplication
 
 
 import logging
 
-from instruments.cameras.tucsencam import TucsenCamera
-
+# The Qt GUI and the Tucsen SDK wrapper are imported where they are used, so headless and simulated runs skip them
 # from tucsen.tucsen_camera_wrapper import TucsenCamera
 from logging_utils import LoggerInterface
 
 class Interface:
 
-    def __init__(self, simulate=False, com_port='COM10', baud=9600, debug_skip=[]):
+    def __init__(self, simulate=False, com_port='COM10', baud=9600, debug_skip=[], reset_triax=False):
 
         self.logger = LoggerInterface(name='interface')
 
@@ -29,6 +28,9 @@ class Interface:
             'triax': self.connect_to_triax,
             'camera': self.connect_to_camera,
             'laser': self.connect_to_laser,
+            'startup': self.show_startup_report,
+            'verbosity': self.set_verbosity,
+            'trace': self.scan_trace,
         }
 
         self.simulate = simulate
@@ -54,6 +56,7 @@ class Interface:
             from instruments.cameras.simulated_camera import SimulatedCameraInterface
             self.camera = SimulatedCameraInterface(self)
         else:
+            from instruments.cameras.tucsencam import TucsenCamera
             self.camera = TucsenCamera(self, simulate=simulate)
         self.spectrometer = Triax(self, simulate=simulate)
         self.laser = MillenniaLaser(self, simulate=simulate)
@@ -95,19 +98,61 @@ class Interface:
             '#CF': 'end of response',
         }
 
-        # Initialize hardware components in the correct order
-        self.spectrometer.initialise()
-        self.controller.initialise()
-        if not 'camera' in debug_skip:
-            self.camera.initialise()
-        # Initialize the high-level instrument classes
-        self.laser.initialise()
-        self.microscope.initialise()  #t be last as it relies on others
+        # Initialise hardware concurrently. The microscope needs the controller and spectrometer positions; the camera
+        # cooling, laser warm-up and any TRIAX reset continue in the background and scans wait for them (see startup.py)
+        self.startup = self._build_startup_graph(reset_triax=reset_triax)
+        self.startup.start()
+        self.startup.wait_until_ready(['microscope'])
 
         # self.microscope.set_acquisition_time(1) # workaround for the camera not responsing correctly on startup
         
         self._integrity_checker()
 
+    def show_startup_report(self):
+        '''Logs how long each device took to initialise and become ready (devices still cooling or warming up are shown as in progress).'''
+        report = self.startup.report()
+        self.logger.info(report)
+        return report
+
+    def set_verbosity(self, subsystem=None, level=None):
+        '''Shows the logging level of each subsystem, or sets it: verbosity <subsystem|all> <debug|cmd|info|warning|error>.'''
+        if subsystem is None:
+            return '\n'.join(f"  {name}: {level}" for name, level in self.logger.verbosity().items())
+        if level is None:
+            raise ValueError("Usage: verbosity <subsystem|all> <debug|cmd|info|warning|error>")
+        return self.logger.set_verbosity(subsystem, level)
+
+    def scan_trace(self, action=None, filepath=None):
+        '''Scan phase tracing: trace on|off switches it, trace shows the per-phase summary of the last scan, trace save [path] writes its Chrome trace.'''
+        tracer = self.acq_ctrl.tracer
+        if action == 'on':
+            tracer.enabled = True
+            return "Scan tracing enabled. A summary and Chrome trace are written at the end of each scan."
+        if action == 'off':
+            tracer.enabled = False
+            return "Scan tracing disabled."
+        if action == 'save':
+            filepath = filepath or os.path.join(self.dataDir, 'status', 'traces', f"{self.acq_ctrl.filename}.trace.json")
+            return f"Scan trace saved to {tracer.export_chrome_trace(filepath)}"
+        if action is None:
+            return tracer.report()
+        raise ValueError("Usage: trace [on|off|save [path]]")
+
+    def _build_startup_graph(self, reset_triax=False):
+        '''Declares each device's initialisation, what it depends on and how to tell when it is ready for use.'''
+        startup = DeviceStartup(logger=self.logger)
+        startup.add('controller', self.controller.initialise, timeout=30, retries=2)
+        if reset_triax and isinstance(self.spectrometer, Triax):
+            startup.add('spectrometer', lambda: self.spectrometer.initialise(reset=True), is_ready=self.spectrometer.is_ready,
+                        timeout=30, retries=1, ready_timeout=3 * Triax.REINITIALISE_TIME)
+        else:
+            startup.add('spectrometer', self.spectrometer.initialise, timeout=30, retries=1)
+        if not 'camera' in self.debug_skip:
+            startup.add('camera', self.camera.initialise, is_ready=self.camera.is_cooled, poll_interval=5.0, timeout=30, retries=1, ready_timeout=900)
+        startup.add('laser', self.laser.initialise, is_ready=self.laser.is_warmed_up, poll_interval=10.0, timeout=30, retries=2)
+        startup.add('microscope', self.microscope.initialise, depends_on=('controller', 'spectrometer'), timeout=60) # must be last as it relies on others
+        return startup
+
     def run_batch(self, commands):
         """
         Run a batch of commands from a list.
@@ -176,6 +221,9 @@ class Interface:
     def gui(self):
         # TODO: Implement thread event monitoring on closure of the GUI to stop the threads
         '''Launch the GUI interface for the microscope control.'''
+        from PyQt5.QtWidgets import QApplication
+        from acquisitioncontrol import MainWindow
+
         # Launch Qt
         app = QApplication.instance() or QApplication(sys.argv)
 
@@ -185,10 +233,11 @@ class Interface:
 
     def save_state(self):
         """
-        Save the current state of the microscope and its components.
+        Save the current state of the microscope and its components. The save runs in the background and only
+        happens if a command changed the tracked state, so it adds no hardware queries or disk I/O to the command.
         """
         try:
-            self.microscope.save_instrument_state()
+            self.microscope.request_state_save()
         except Exception as e:
             self.logger.error(f"Failed to save instrument state: {e}")
 
@@ -245,6 +294,7 @@ class Interface:
         if self.simulate or 'camera' in self.debug_skip or not self.connected_to_camera:
             self.logger.info("Attempting to connect to real camera...")
             try:
+                from instruments.cameras.tucsencam import TucsenCamera
                 self.camera = TucsenCamera(self, simulate=False)
                 self.camera.initialise()
                 self.logger.info("Successfully connected to real camera")
@@ -333,7 +383,7 @@ class Interface:
         # Check for interface level commands first
         if funct in self.interface_commands:
             try:
-                result = self.interface_commands[funct]()
+                result = self.interface_commands[funct](*(arguments or []))
             except Exception as e:
                 error_details = traceback.format_exc()
                 result = f" > Error: {e}\n{error_details}"
@@ -355,6 +405,7 @@ class Interface:
                 steps = int(arguments[0])
                 motion_command = 'o{}{}o'.format(motor_id, steps)
                 self.controller.send_command(motion_command)
+                self.microscope.motion_control.track_move({motor_id: steps})
             except Exception as e:
                 error_details = traceback.format_exc()
                 result = f" > Error: {e}\n{error_details}"
@@ -363,6 +414,7 @@ class Interface:
             try:
 
                 result = self.controller.send_command(command)
+                self.microscope.motion_control.invalidate_positions(command) # motors moved or re-zeroed by the raw command are re-queried on the next save
             except Exception as e:
                 error_details = traceback.format_exc()
                 result = f" > Error: {e}\n{error_details}"
@@ -400,7 +452,6 @@ def main(startup_commands=[], simulate=False):
     interface.cli()
 
 if __name__ == '__main__':
-    import sys
     # quick switch for testing
     if "Users\\Sam" in os.getcwd():
         simulate = True 
@@ -1,28 +1,52 @@
 import os
+import queue
+import atexit
 import logging
-from PyQt5.QtCore import QObject, pyqtSignal
+from logging.handlers import QueueHandler, QueueListener
 
-class QtLogHandler(logging.Handler, QObject):
-    """
-    A logging.Handler that emits each record as a Qt signal (str).
-    """
-    logMessage = pyqtSignal(str)
+COMMAND_LEVEL_NUM = 15
+LEVELS = {'debug': logging.DEBUG, 'cmd': COMMAND_LEVEL_NUM, 'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
 
-    def __init__(self, parent=None):
-        QObject.__init__(self, parent)
-        logging.Handler.__init__(self)
 
+def _build_qt_log_handler():
+    '''Defines QtLogHandler. PyQt5 is only imported when the GUI asks for the handler.'''
+    from PyQt5.QtCore import QObject, pyqtSignal
 
-    def emit(self, record):
-        msg = self.format(record)
-        # Emit the formatted message to any connected slots
-        self.logMessage.emit(msg)
+    class QtLogHandler(logging.Handler, QObject):
+        """
+        A logging.Handler that emits each record as a Qt signal (str).
+        """
+        logMessage = pyqtSignal(str)
+
+        def __init__(self, parent=None):
+            QObject.__init__(self, parent)
+            logging.Handler.__init__(self)
+
+
+        def emit(self, record):
+            msg = self.format(record)
+            # Emit the formatted message to any connected slots
+            self.logMessage.emit(msg)
+
+    return QtLogHandler
+
+
+def __getattr__(name):
+    if name == 'QtLogHandler':
+        globals()['QtLogHandler'] = handler = _build_qt_log_handler()
+        return handler
+    raise AttributeError(f"module 'logging_utils' has no attribute '{name}'")
 
 
 class LoggerInterface:
+    '''
+    Wraps the instrument logger. Records are put on a queue by a QueueHandler and written to the log file and console
+    by a QueueListener thread, so a logging call on a scan or device thread never waits on console or disk I/O.
+    Subsystems log through child loggers (getChild), whose verbosity can be set independently with set_verbosity.
+    '''
+
     def __init__(self, name: str = 'instrument'):
         # 1) Define your level number and name
-        COMMAND_LEVEL_NUM = 15
         logging.addLevelName(COMMAND_LEVEL_NUM, "CMD")
 
         # 2) Attach a .command(...) method to all Logger instances
@@ -52,11 +76,14 @@ class LoggerInterface:
         # self.qt_handler.setLevel(logging.DEBUG)
         # self.qt_handler.setFormatter(logging.Formatter('%(message)s'))
 
-        # 3) Attach them
+        # 3) Attach them behind a queue; the listener thread does the writing
         self.handlers = [self.file_handler, self.cli_handler]
-        for h in self.handlers:
-            # Add the handler to the logger
-            self.logger.addHandler(h)
+        self.log_queue = queue.SimpleQueue()
+        self.queue_handler = QueueHandler(self.log_queue)
+        self.logger.addHandler(self.queue_handler)
+        self.listener = QueueListener(self.log_queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop) # writes out any queued records on exit
 
     def modify_handler(self, handler: str, level: int):
         """
@@ -67,14 +94,55 @@ class LoggerInterface:
             raise ValueError("Handler not found.")
         handler.setLevel(level)
 
+    def set_verbosity(self, subsystem: str, level):
+        """
+        Sets the level of one subsystem's logger (e.g. 'triax', 'controller', 'camera_scanner'), or with 'all' sets
+        the main logger and returns every subsystem to it. level is a level name (debug, cmd, info, warning, error) or number. Returns a confirmation message.
+        """
+        if isinstance(level, str):
+            if level.lower() in LEVELS:
+                level = LEVELS[level.lower()]
+            elif level.isdigit():
+                level = int(level)
+            else:
+                raise ValueError(f"Unknown level '{level}'. Use one of: {', '.join(LEVELS)}")
+
+        subsystems = self.subsystems()
+        if subsystem == 'all':
+            self.logger.setLevel(level)
+            for logger in subsystems.values():
+                logger.setLevel(logging.NOTSET) # inherit the new level
+        else:
+            matches = [logger for name, logger in subsystems.items() if name.lower() == subsystem.lower()]
+            if not matches:
+                raise ValueError(f"Unknown subsystem '{subsystem}'. Subsystems: {', '.join(subsystems)}")
+            for logger in matches:
+                logger.setLevel(level)
+        return f"{subsystem} logging set to {logging.getLevelName(level)}"
+
+    def subsystems(self):
+        '''Returns {subsystem name: logger} for every child logger created so far.'''
+        prefix = self.logger.name + '.'
+        return {
+            name[len(prefix):]: logger
+            for name, logger in list(logging.Logger.manager.loggerDict.items())
+            if name.startswith(prefix) and isinstance(logger, logging.Logger)
+        }
+
+    def verbosity(self):
+        '''Returns {subsystem: level name} for the main logger ('all') and each subsystem.'''
+        levels = {'all': logging.getLevelName(self.logger.getEffectiveLevel())}
+        levels.update({name: logging.getLevelName(logger.getEffectiveLevel()) for name, logger in self.subsystems().items()})
+        return levels
+
 
     def getChild(self, suffix: str):
         """
         Return a LoggerInterface wrapping the child logger
-        instrument.<suffix>, inheriting handlers.
+        instrument.<suffix>, inheriting handlers. Its level is inherited
+        too, unless set with set_verbosity.
         """
         child = self.logger.getChild(suffix)
-        child.setLevel(logging.DEBUG)
         return self.__class__.from_logger(child)
 
     @classmethod
@@ -0,0 +1,106 @@
+'''
+Append-only storage for motor recordings (Microscope.record_motors) used by manual calibration.
+
+Each recording is one JSON object per line of a .jsonl file, e.g.
+    {"laser_positions": {"l1": -4812, ...}, "grating_positions": {...}, "triax_positions": 136680, "wavelength": 750.0}
+so adding a recording is a single append, independent of how many are already stored. load_recordings returns the
+columns as NumPy arrays, with nested groups (laser_positions, grating_positions, ...) as dicts of arrays per motor.
+The older motor_recordings.json format ({"0": {...}, "1": {...}}) is still readable and can be migrated.
+'''
+
+import os
+import json
+
+import numpy as np
+
+
+RECORDINGS_FILE = 'motor_recordings.jsonl'
+LEGACY_RECORDINGS_FILE = 'motor_recordings.json'
+
+
+def append_recording(filepath, recording):
+    '''Appends one recording to a .jsonl file and flushes it to disk. A torn last line (e.g. after a crash) is terminated first, so it cannot swallow the new recording.'''
+    with open(filepath, 'ab+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write((json.dumps(recording) + '\n').encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_entries(filepath):
+    '''Returns the recordings in a .jsonl or legacy .json file as a list of dicts, in recording order.'''
+    with open(filepath, 'r') as f:
+        text = f.read()
+
+    if filepath.endswith('.jsonl'):
+        lines = [line for line in text.splitlines() if line.strip()]
+        try:
+            return json.loads('[' + ','.join(lines) + ']') # one parse for the whole file
+        except json.JSONDecodeError:
+            # a partially written last line (e.g. after a crash) is skipped
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            return entries
+
+    data = json.loads(text)
+    return [data[key] for key in sorted(data, key=int)]
+
+
+def _column(values):
+    '''Builds an array from a column of values; integer columns stay integer unless values are missing (NaN).'''
+    if any(value is None for value in values):
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+    return np.array(values)
+
+
+def entries_to_arrays(entries):
+    '''
+    Converts recordings to columns: {key: array} for scalar fields and {group: {motor: array}} for nested groups.
+    Recordings missing a field hold NaN in that column.
+    '''
+    keys = {}
+    for entry in entries:
+        for key, value in entry.items():
+            if isinstance(value, dict):
+                keys.setdefault(key, {}).update(dict.fromkeys(value))
+            else:
+                keys.setdefault(key, None)
+
+    columns = {}
+    for key, subkeys in keys.items():
+        if subkeys is None:
+            columns[key] = _column([entry.get(key) for entry in entries])
+        else:
+            groups = [entry.get(key) or {} for entry in entries]
+            columns[key] = {subkey: _column([group.get(subkey) for group in groups]) for subkey in subkeys}
+    return columns
+
+
+def load_recordings(filepath):
+    '''Loads a recordings file (.jsonl or legacy .json) as NumPy columns (see entries_to_arrays).'''
+    return entries_to_arrays(read_entries(filepath))
+
+
+def migrate_legacy(directory):
+    '''
+    Converts motor_recordings.json in directory to motor_recordings.jsonl if the latter does not exist yet.
+    The legacy file is left in place. Returns the path of the .jsonl file.
+    '''
+    recordings_path = os.path.join(directory, RECORDINGS_FILE)
+    legacy_path = os.path.join(directory, LEGACY_RECORDINGS_FILE)
+    if not os.path.exists(recordings_path) and os.path.exists(legacy_path):
+        entries = read_entries(legacy_path)
+        tmp_path = recordings_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, recordings_path)
+    return recordings_path
@@ -0,0 +1,243 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+
+'''
+Self-contained, vectorised peak fitting for autocalibration data.
+
+Every wavelength of an autocal_*.json file is fitted at once: the scans are packed into NaN-padded
+(n_wavelengths, n_samples) arrays, initial guesses are computed for all rows with array operations,
+and a Levenberg-Marquardt least-squares fit is iterated for all rows together using batched linear
+solves. Large files can be split across a process pool.
+'''
+
+PROFILES = ('gaussian', 'lorentzian', 'pseudo_voigt')
+
+# parameter columns of the fit
+CENTER, AMPLITUDE, FWHM, ETA, BASELINE = range(5)
+
+
+def gaussian(x, center, amplitude, fwhm):
+    return amplitude * np.exp(-4 * np.log(2) * (x - center)**2 / fwhm**2)
+
+def lorentzian(x, center, amplitude, fwhm):
+    return amplitude / (1 + 4 * (x - center)**2 / fwhm**2)
+
+def pseudo_voigt(x, center, amplitude, fwhm, eta):
+    return eta * lorentzian(x, center, amplitude, fwhm) + (1 - eta) * gaussian(x, center, amplitude, fwhm)
+
+
+def profile_model(x, params):
+    '''Evaluates the pseudo-Voigt-plus-baseline model for each row of params (n, 5) over the rows of x (n, m).'''
+    center, amplitude, fwhm, eta, baseline = (params[:, [i]] for i in range(5))
+    return pseudo_voigt(x, center, amplitude, fwhm, eta) + baseline
+
+
+@dataclass
+class PeakTable:
+    '''Fitted peak parameters for every wavelength of an autocalibration scan. All fields are arrays of equal length.'''
+    profile: str
+    wavelengths: np.ndarray
+    center: np.ndarray
+    amplitude: np.ndarray
+    fwhm: np.ndarray
+    eta: np.ndarray
+    baseline: np.ndarray
+    rmse: np.ndarray
+    success: np.ndarray
+
+    def __len__(self):
+        return len(self.wavelengths)
+
+    def peak_positions(self):
+        '''Returns a list of (wavelength, peak position in steps) for the successfully fitted wavelengths.'''
+        return [(float(wl), float(pos)) for wl, pos in zip(self.wavelengths[self.success], self.center[self.success])]
+
+    def __repr__(self):
+        return f'PeakTable({self.profile}, {int(self.success.sum())}/{len(self)} fitted)'
+
+
+def load_autocal_file(filepath, data_mask=None):
+    '''
+    Loads an autocal_*.json file into NaN-padded arrays.
+    Returns (wavelengths (n,), positions (n, m), values (n, m)), sorted by wavelength. data_mask is an optional
+    (min, max) wavelength range to keep.
+    '''
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+
+    scans = []
+    for key, samples in data.items():
+        try:
+            wavelength = float(key)
+        except ValueError:
+            continue # metadata such as 'data_type'
+        if data_mask is not None and not data_mask[0] <= wavelength <= data_mask[1]:
+            continue
+        samples = np.asarray(samples, dtype=float).reshape(-1, 2)
+        if len(samples):
+            scans.append((wavelength, samples[np.argsort(samples[:, 0])]))
+    scans.sort(key=lambda scan: scan[0])
+
+    n_samples = max((len(samples) for _, samples in scans), default=0)
+    positions = np.full((len(scans), n_samples), np.nan)
+    values = np.full((len(scans), n_samples), np.nan)
+    for row, (_, samples) in enumerate(scans):
+        positions[row, :len(samples)] = samples[:, 0]
+        values[row, :len(samples)] = samples[:, 1]
+
+    return np.array([wavelength for wavelength, _ in scans]), positions, values
+
+
+def initial_guesses(x, y, profile='pseudo_voigt'):
+    '''Vectorised starting parameters (n, 5): centroid of the points above half maximum, peak height, width at half maximum.'''
+    n = len(x)
+    params = np.zeros((n, 5))
+    if n == 0:
+        return params
+
+    valid = np.isfinite(x) & np.isfinite(y)
+    y_filled = np.where(valid, y, -np.inf)
+    baseline = np.nanmin(np.where(valid, y, np.nan), axis=1)
+    peak = np.max(y_filled, axis=1)
+    amplitude = peak - baseline
+
+    above = valid & (y - baseline[:, None] >= amplitude[:, None] / 2)
+    weights = np.where(above, y - baseline[:, None], 0.0)
+    weight_sum = weights.sum(axis=1)
+    argmax_center = x[np.arange(n), np.argmax(y_filled, axis=1)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        center = np.where(weight_sum > 0, np.nansum(weights * np.nan_to_num(x), axis=1) / weight_sum, argmax_center)
+
+    spacing = np.nanmedian(np.abs(np.diff(x, axis=1)), axis=1)
+    spacing = np.where(np.isfinite(spacing) & (spacing > 0), spacing, 1.0)
+    x_above = np.where(above, x, np.nan)
+    with np.errstate(invalid='ignore'):
+        width = np.nanmax(x_above, axis=1) - np.nanmin(x_above, axis=1)
+    fwhm = np.fmax(np.nan_to_num(width), spacing)
+
+    params[:, CENTER] = center
+    params[:, AMPLITUDE] = amplitude
+    params[:, FWHM] = fwhm
+    params[:, ETA] = {'gaussian': 0.0, 'lorentzian': 1.0}.get(profile, 0.5)
+    params[:, BASELINE] = baseline
+    return params
+
+
+def _fit_block(x, y, profile='pseudo_voigt', max_iterations=100, tolerance=1e-8):
+    '''Levenberg-Marquardt fit of every row of (x, y) at once. Returns (params (n, 5), rmse (n,), success (n,)).'''
+    if x.size == 0:
+        return np.zeros((len(x), 5)), np.zeros(len(x)), np.zeros(len(x), dtype=bool)
+
+    valid = np.isfinite(x) & np.isfinite(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    n_points = valid.sum(axis=1)
+
+    params = initial_guesses(np.where(valid, x, np.nan), np.where(valid, y, np.nan), profile)
+    free = np.ones(5, dtype=bool)
+    if profile != 'pseudo_voigt':
+        free[ETA] = False # fixed at 0 (Gaussian) or 1 (Lorentzian)
+
+    def residuals(p):
+        return np.where(valid, profile_model(x, p) - y, 0.0)
+
+    def clamp(p):
+        p[:, FWHM] = np.fmax(p[:, FWHM], 1e-6)
+        p[:, ETA] = np.clip(p[:, ETA], 0.0, 1.0)
+        return p
+
+    r = residuals(params)
+    cost = np.sum(r**2, axis=1)
+    damping = np.full(len(x), 1e-3)
+    active = n_points >= 5
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+
+        # Jacobian by forward differences, one column per parameter, for all rows at once
+        scale = np.stack([
+            params[:, FWHM], np.abs(params[:, AMPLITUDE]) + 1.0, params[:, FWHM],
+            np.ones(len(x)), np.abs(params[:, AMPLITUDE]) + 1.0,
+        ], axis=1)
+        jacobian = np.zeros(x.shape + (5,))
+        for column in np.flatnonzero(free):
+            step = 1e-6 * scale[:, column]
+            shifted = params.copy()
+            shifted[:, column] += step
+            jacobian[..., column] = (residuals(shifted) - r) / step[:, None]
+
+        jtj = np.einsum('nmi,nmj->nij', jacobian, jacobian)
+        jtr = np.einsum('nmi,nm->ni', jacobian, r)
+        diagonal = np.einsum('nii->ni', jtj)
+        system = jtj + (damping[:, None] * diagonal + 1e-12)[:, :, None] * np.eye(5)
+        delta = np.linalg.solve(system, -jtr[:, :, None])[:, :, 0]
+
+        candidate = clamp(params + np.where(active[:, None], delta, 0.0))
+        candidate_r = residuals(candidate)
+        candidate_cost = np.sum(candidate_r**2, axis=1)
+
+        improved = active & (candidate_cost < cost)
+        converged = improved & ((cost - candidate_cost) <= tolerance * (cost + 1e-300))
+        params[improved] = candidate[improved]
+        r[improved] = candidate_r[improved]
+        cost = np.where(improved, candidate_cost, cost)
+        damping = np.where(improved, damping / 3, damping * 2)
+        active &= ~converged & (damping < 1e10)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rmse = np.sqrt(cost / np.maximum(n_points, 1))
+        x_min = np.min(np.where(valid, x, np.inf), axis=1)
+        x_max = np.max(np.where(valid, x, -np.inf), axis=1)
+    success = (
+        (n_points >= 5)
+        & (params[:, AMPLITUDE] > 0)
+        & (params[:, CENTER] >= x_min) & (params[:, CENTER] <= x_max)
+        & np.all(np.isfinite(params), axis=1)
+    )
+    return params, rmse, success
+
+
+def fit_peaks(wavelengths, x, y, profile='pseudo_voigt', processes=None, chunk_size=256, **kwargs):
+    '''
+    Fits one peak per row of the NaN-padded (n, m) arrays x and y. profile is 'gaussian', 'lorentzian' or
+    'pseudo_voigt'. If processes is given and there are more rows than chunk_size, the rows are fitted in
+    chunks across a process pool. Returns a PeakTable.
+    '''
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown peak profile '{profile}'. Must be one of: {', '.join(PROFILES)}")
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if processes and len(x) > chunk_size:
+        chunks = [slice(start, start + chunk_size) for start in range(0, len(x), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_fit_block, x[chunk], y[chunk], profile, **kwargs) for chunk in chunks]
+            results = [future.result() for future in futures]
+        params = np.concatenate([result[0] for result in results])
+        rmse = np.concatenate([result[1] for result in results])
+        success = np.concatenate([result[2] for result in results])
+    else:
+        params, rmse, success = _fit_block(x, y, profile, **kwargs)
+
+    return PeakTable(
+        profile=profile,
+        wavelengths=np.asarray(wavelengths, dtype=float),
+        center=params[:, CENTER],
+        amplitude=params[:, AMPLITUDE],
+        fwhm=params[:, FWHM],
+        eta=params[:, ETA],
+        baseline=params[:, BASELINE],
+        rmse=rmse,
+        success=success,
+    )
+
+
+def fit_autocal_file(filepath, profile='pseudo_voigt', data_mask=None, processes=None, **kwargs):
+    '''Loads an autocal_*.json file and fits the LDR peak at every wavelength. Returns a PeakTable.'''
+    wavelengths, x, y = load_autocal_file(filepath, data_mask)
+    return fit_peaks(wavelengths, x, y, profile=profile, processes=processes, **kwargs)
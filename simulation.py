@@ -82,6 +82,8 @@ class SimulatedArduinoSerial:
             response = self._set_positions(cmd[1:-1])
         elif cmd.startswith('m') and cmd.endswith('m'):
             response = self._hardware_command(cmd[1:-1])
+        elif cmd.startswith('w') and cmd.endswith('w'):
+            response = self._sweep_ldr(cmd[1:-1])
         elif cmd.startswith('h') and len(cmd) == 3:
             response = self._home_motor(cmd[1], cmd[2])
         elif cmd == 'imagemode':
@@ -184,6 +186,25 @@ class SimulatedArduinoSerial:
         # Arduino prints 't' + summed reading; here we'll just return one value
         return f"t{self.ldr_value}"
 
+    def _sweep_ldr(self, content: str) -> str:
+        """
+        w1X4000 800 10w → "n<count>" then "<position>,<ldr>" per sample, moving 1X by +4000
+        """
+        try:
+            token, speed, interval = content.split()
+            module, motor, distance, interval = token[0], token[1], int(token[2:]), int(interval)
+        except ValueError:
+            return "Invalid sweep command."
+        if module not in self.current or motor not in self.current[module] or interval <= 0:
+            return "Invalid sweep command."
+
+        start = self.current[module][motor]
+        direction = 1 if distance >= 0 else -1
+        positions = list(range(start, start + distance + direction, direction * interval))
+        self.current[module][motor] = start + distance
+        lines = [f"n{len(positions)}"] + [f"{pos},{self.ldr_value}" for pos in positions]
+        return '\r\n'.join(lines)
+
     def _toggle_led(self, state: str) -> str:
         on = (state == 'on')
         self.led1 = self.led2 = on
@@ -529,7 +550,7 @@ class SimulatedTriax:
         print("Simulated TRIAX spectrometer initialized")
         return self.spectrometer_position
     
-    def get_spectrometer_position(self):
+    def get_spectrometer_position(self, refresh=False):
         """Get the current position of the simulated spectrometer"""
         return self.spectrometer_position
     
@@ -0,0 +1,249 @@
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DeviceStartup:
+    '''
+    Runs device initialisation as a dependency graph on a thread pool.
+
+    Each device is added with its initialise function, the devices it depends on and an optional readiness check
+    (e.g. camera at target temperature, laser warmed up, TRIAX reset finished). A device starts initialising as soon
+    as every device it depends on has initialised (is connected), and once its initialise function returns its
+    readiness check is polled in the same worker until it passes. Dependants do not wait for a dependency's
+    readiness check, so e.g. the microscope connects while the TRIAX is still resetting, and devices with no
+    dependency between them initialise, cool and warm up concurrently. Readiness is only waited for by
+    wait_until_ready().
+
+    Each initialise call can be given a timeout and a number of retries, and the start, initialised and ready times
+    of every device are recorded; report() formats them as a timeline, which is logged once every device has
+    finished, so the slowest device can be identified.
+
+    wait_until_ready() is the readiness barrier: it blocks until the named devices are ready, and is used to gate
+    scans on the devices they need.
+    '''
+
+    PENDING, INITIALISING, WAITING, READY, FAILED = 'pending', 'initialising', 'waiting for ready', 'ready', 'failed'
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.devices = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._reported = False
+        self.start_time = None
+
+    def add(self, name, initialise, depends_on=(), is_ready=None, poll_interval=1.0, timeout=None, retries=0, retry_delay=1.0, ready_timeout=None):
+        '''
+        Adds a device to the graph. initialise is called with no arguments; is_ready, if given, is called every
+        poll_interval seconds after initialisation until it returns True.
+
+        If initialise raises, it is retried up to retries times, retry_delay seconds apart. If it has not returned
+        within timeout seconds the device fails without a retry, since the hung call cannot be cancelled and a second
+        call would compete with it for the hardware. ready_timeout limits the wait for is_ready.
+        '''
+        if self._executor is not None:
+            raise RuntimeError('Devices cannot be added once start-up has begun.')
+        self.devices[name] = {
+            'initialise': initialise,
+            'depends_on': tuple(depends_on),
+            'is_ready': is_ready,
+            'poll_interval': poll_interval,
+            'timeout': timeout,
+            'retries': retries,
+            'retry_delay': retry_delay,
+            'ready_timeout': ready_timeout,
+            'attempts': 0,
+            'started': None, # seconds after start() at which initialise was first called
+            'initialised': None, # seconds after start() at which initialise returned
+            'finished': None, # seconds after start() at which the device became ready or failed
+            'state': self.PENDING,
+            'connected': threading.Event(), # set once initialise has returned (or the device failed); dependants wait on this
+            'ready': threading.Event(),
+            'error': None,
+        }
+
+    def _log(self, message, error=False):
+        if self.logger is None:
+            print(message)
+        elif error:
+            self.logger.error(message)
+        else:
+            self.logger.info(message)
+
+    def _check_graph(self):
+        '''Raises ValueError for unknown dependencies or dependency cycles.'''
+        for name, device in self.devices.items():
+            unknown = [dependency for dependency in device['depends_on'] if dependency not in self.devices]
+            if unknown:
+                raise ValueError(f"Device '{name}' depends on unknown devices: {', '.join(unknown)}")
+
+        visited, visiting = set(), set()
+
+        def visit(name):
+            if name in visiting:
+                raise ValueError(f"Device start-up dependencies form a cycle through '{name}'.")
+            if name not in visited:
+                visiting.add(name)
+                for dependency in self.devices[name]['depends_on']:
+                    visit(dependency)
+                visiting.discard(name)
+                visited.add(name)
+
+        for name in self.devices:
+            visit(name)
+
+    def start(self):
+        '''Begins initialising every device and returns immediately.'''
+        self._check_graph()
+        self.start_time = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.devices), 1), thread_name_prefix='startup')
+        for name in self.devices:
+            self._executor.submit(self._run, name)
+        self._executor.shutdown(wait=False)
+
+    def _run(self, name):
+        device = self.devices[name]
+        for dependency in device['depends_on']:
+            self.devices[dependency]['connected'].wait()
+            if self.devices[dependency]['state'] == self.FAILED:
+                self._fail(name, f"dependency '{dependency}' failed")
+                return
+
+        device['started'] = self._elapsed()
+        device['state'] = self.INITIALISING
+        while True:
+            device['attempts'] += 1
+            try:
+                self._call_with_timeout(device['initialise'], device['timeout'])
+                break
+            except TimeoutError as e:
+                self._fail(name, str(e))
+                return
+            except Exception as e:
+                if device['attempts'] > device['retries']:
+                    self._fail(name, f"{e}\n{traceback.format_exc()}")
+                    return
+                self._log(f"{name} initialisation attempt {device['attempts']} failed ({e}), retrying in {device['retry_delay']} s", error=True)
+                time.sleep(device['retry_delay'])
+        device['initialised'] = self._elapsed()
+        device['connected'].set()
+
+        try:
+            if device['is_ready'] is not None:
+                device['state'] = self.WAITING
+                deadline = None if device['ready_timeout'] is None else time.time() + device['ready_timeout']
+                while not device['is_ready']():
+                    if deadline is not None and time.time() > deadline:
+                        raise TimeoutError(f"not ready after {device['ready_timeout']} s")
+                    time.sleep(device['poll_interval'])
+        except Exception as e:
+            self._fail(name, str(e))
+            return
+
+        device['state'] = self.READY
+        self._log(f"{name} ready")
+        self._settle(name)
+
+    @staticmethod
+    def _call_with_timeout(function, timeout):
+        '''Calls function, raising TimeoutError if it has not returned after timeout seconds (the call itself is left running).'''
+        if timeout is None:
+            return function()
+        result = {}
+
+        def target():
+            try:
+                result['value'] = function()
+            except BaseException as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            raise TimeoutError(f"initialise did not return within {timeout} s")
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
+
+    def _elapsed(self):
+        return time.time() - self.start_time
+
+    def _fail(self, name, reason):
+        device = self.devices[name]
+        device['state'] = self.FAILED
+        device['error'] = reason
+        self._log(f"{name} failed to initialise: {reason}", error=True)
+        self._settle(name) # release anything waiting on this device; they check the state
+
+    def _settle(self, name):
+        '''Marks a device as finished (ready or failed) and logs the timeline once every device has finished.'''
+        device = self.devices[name]
+        device['finished'] = self._elapsed()
+        device['connected'].set()
+        device['ready'].set()
+        with self._lock:
+            done = all(device['ready'].is_set() for device in self.devices.values())
+            if done and not self._reported:
+                self._reported = True
+                self._log(self.report())
+
+    def timeline(self):
+        '''Returns a list of per-device dicts: name, state, attempts and the started/initialised/finished times in seconds after start().'''
+        return [
+            {'name': name, **{key: device[key] for key in ('state', 'attempts', 'started', 'initialised', 'finished')}}
+            for name, device in self.devices.items()
+        ]
+
+    def report(self, width=40):
+        '''
+        Formats the start-up timeline as text. Each device gets a bar over the total start-up time: '.' waiting for
+        dependencies, '#' initialising, '~' waiting to become ready (cooling, warm-up, reset).
+        '''
+        entries = self.timeline()
+        now = self._elapsed() if self.start_time is not None else 0.0
+        total = max([entry['finished'] or now for entry in entries] + [1e-9])
+        slowest = max(entries, key=lambda entry: entry['finished'] or now)['name'] if entries else None
+
+        def column(seconds):
+            return min(int(round(width * seconds / total)), width)
+
+        lines = [f"Start-up timeline: {total:.1f} s, slowest device: {slowest}"]
+        for entry in entries:
+            started = entry['started'] if entry['started'] is not None else now
+            initialised = entry['initialised'] if entry['initialised'] is not None else (entry['finished'] or now)
+            finished = entry['finished'] if entry['finished'] is not None else now
+            bar = '.' * column(started)
+            bar += '#' * max(column(initialised) - len(bar), 0)
+            bar += '~' * max(column(finished) - len(bar), 0)
+            retries = f", {entry['attempts']} attempts" if entry['attempts'] > 1 else ''
+            lines.append(
+                f"  {entry['name']:<14}|{bar:<{width}}| init {initialised - started:6.1f} s, done at {finished:6.1f} s ({entry['state']}{retries})"
+            )
+        return '\n'.join(lines)
+
+    def is_ready(self, name):
+        device = self.devices.get(name)
+        return device is None or device['state'] == self.READY
+
+    def status(self):
+        '''Returns a dict of device name to start-up state.'''
+        return {name: device['state'] for name, device in self.devices.items()}
+
+    def wait_until_ready(self, names=None, timeout=None):
+        '''
+        Blocks until the named devices (default: all) are ready. Devices not in the graph, e.g. skipped ones, are
+        ignored. Raises TimeoutError if they are not ready within timeout seconds and RuntimeError if any failed.
+        '''
+        names = [name for name in (self.devices if names is None else names) if name in self.devices]
+        deadline = None if timeout is None else time.time() + timeout
+        for name in names:
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            if not self.devices[name]['ready'].wait(remaining):
+                raise TimeoutError(f"Timed out waiting for {name} to become ready ({self.devices[name]['state']}).")
+
+        failed = [name for name in names if self.devices[name]['state'] == self.FAILED]
+        if failed:
+            raise RuntimeError(f"Devices failed to initialise: {', '.join(failed)}")
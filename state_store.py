@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+
+
+class InstrumentState:
+    '''
+    Change-tracking model of the instrument state.
+
+    Devices report changes as they make them (motor moves and position writes, stage moves, wavelengths calculated
+    from motor positions, detector temperature readings, scan progress) instead of the state being re-read from the
+    hardware. Every change that alters a value increments `version`, so consumers such as StateWriter can tell
+    cheaply whether anything needs persisting.
+
+    Observers registered with subscribe() are called with the changed keys after every change. They run on the
+    thread that made the change (a device, command or scan thread), so they should only record that something
+    changed; the GUI, for example, marks itself dirty and redraws from snapshot() on its own timer.
+    '''
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._values = {'motor_positions': {}, 'stage_positions': {}}
+        self.version = 0
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        '''Registers callback(changed_keys), called after every change of the state.'''
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, keys):
+        '''Calls the subscribers outside the lock, so a slow subscriber cannot hold up other devices.'''
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(keys)
+            except Exception as e:
+                self.logger.exception(f"Instrument state subscriber failed: {e}")
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def set(self, key, value):
+        '''Sets a value, counting a change only if it differs from the current one.'''
+        self.update({key: value})
+
+    def update(self, values):
+        '''Sets several values as one change.'''
+        with self._lock:
+            changed = [key for key, value in values.items() if self._values.get(key) != value]
+            for key in changed:
+                self._values[key] = values[key]
+            if changed:
+                self.version += 1
+        if changed:
+            self._notify(changed)
+
+    def update_motors(self, positions):
+        '''Records absolute motor positions in steps, keyed by motor label.'''
+        with self._lock:
+            motors = self._values['motor_positions']
+            changed = {label: int(steps) for label, steps in positions.items() if motors.get(label) != int(steps)}
+            if changed:
+                motors.update(changed)
+                self.version += 1
+        if changed:
+            self._notify(['motor_positions'])
+
+    def move_motors(self, steps):
+        '''Records relative motor moves in steps, keyed by motor label. Moves of motors with no known position are ignored.'''
+        with self._lock:
+            motors = self._values['motor_positions']
+            moved = {label: motors[label] + int(delta) for label, delta in steps.items() if label in motors and delta}
+            if moved:
+                motors.update(moved)
+                self.version += 1
+        if moved:
+            self._notify(['motor_positions'])
+
+    def invalidate_motors(self, labels=None):
+        '''Forgets the positions of the given motor labels (all motors if None), after they moved in a way that was not tracked.'''
+        with self._lock:
+            motors = self._values['motor_positions']
+            dropped = [label for label in (list(motors) if labels is None else labels) if label in motors]
+            for label in dropped:
+                del motors[label]
+            if dropped:
+                self.version += 1
+        if dropped:
+            self._notify(['motor_positions'])
+
+    @property
+    def motor_positions(self):
+        with self._lock:
+            return dict(self._values['motor_positions'])
+
+    def snapshot(self):
+        '''Returns (version, copy of every value) taken atomically.'''
+        with self._lock:
+            return self.version, json.loads(json.dumps(self._values))
+
+
+class StateWriter:
+    '''
+    Persists an InstrumentState to a JSON file in the background.
+
+    request_save() returns immediately. The writer thread then writes the state only if its version has changed since
+    the last write, and at most once every min_interval seconds, so a burst of commands costs one write and
+    commands that change nothing cost none. Files are written to a temporary file and renamed into place, so a crash
+    never leaves a truncated state file. flush() writes synchronously and is also run at interpreter exit.
+    '''
+
+    def __init__(self, state, filepath, serialise, min_interval=2.0, logger=None):
+        self.state = state
+        self.logger = logger or logging.getLogger(__name__)
+        self.filepath = filepath
+        self.serialise = serialise # maps the state snapshot dict to the JSON document written
+        self.min_interval = min_interval
+
+        self.written_version = None
+        self._written_document = None
+        self._last_write = 0.0
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def request_save(self):
+        '''Schedules a write if the state has changed. Never blocks on I/O.'''
+        if self.state.version == self.written_version:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='state-writer', daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            delay = self._last_write + self.min_interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.exception(f"Failed to save instrument state: {e}")
+
+    def flush(self):
+        '''Writes the state now if it has changed since the last write. Returns True if a file was written.'''
+        with self._write_lock:
+            version, values = self.state.snapshot()
+            if version == self.written_version:
+                return False
+            document = self.serialise(values)
+            self.written_version = version
+            if document == self._written_document:
+                return False # only values that are not persisted (e.g. scan status) changed
+            tmp_path = self.filepath + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(document, f, indent=2)
+            os.replace(tmp_path, self.filepath)
+            self._written_document = document
+            self._last_write = time.time()
+            return True
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from calibration import CalibrationRegistry, NumericalInverse
+
+# steps rise from 7500 at 500 nm to a turning point of 10000 at 1000 nm, then fall again
+FORWARD = np.poly1d([-0.01, 20.0, 0.0])
+
+
+@pytest.fixture
+def inverse():
+    return NumericalInverse(FORWARD, domain=(500.0, 1300.0))
+
+def test_table_is_longest_monotonic_run(inverse):
+    assert inverse.domain == pytest.approx((500.0, 1000.0))
+    assert inverse.table_steps[0] == pytest.approx(7500.0)
+    assert inverse.table_steps[-1] == pytest.approx(10000.0)
+
+def test_in_table_round_trip(inverse):
+    wavelengths = np.array([500.0, 640.5, 812.25, 999.0])
+    assert inverse(FORWARD(wavelengths)) == pytest.approx(wavelengths, abs=1e-6)
+    assert inverse(FORWARD(700.0)) == pytest.approx(700.0, abs=1e-6)
+
+def test_out_of_table_without_fallback_is_nan(inverse):
+    assert np.isnan(inverse(5000.0))
+    result = inverse(np.array([0.0, FORWARD(700.0), -2e5]))
+    assert np.isnan(result[0]) and np.isnan(result[2])
+    assert result[1] == pytest.approx(700.0, abs=1e-6)
+
+def test_out_of_table_uses_fallback(inverse):
+    inverse.fallback = lambda steps: np.full(np.shape(steps), 1466.0)
+    result = inverse(np.array([0.0, FORWARD(700.0), 12000.0]))
+    assert result == pytest.approx([1466.0, 700.0, 1466.0], abs=1e-6)
+    assert inverse(-200.0) == pytest.approx(1466.0)
+
+def test_registry_derives_inverses_for_motors_only():
+    registry = CalibrationRegistry()
+    registry.register('wl_to_l1', [-0.01, 20.0, 0.0])
+    registry.register('wl_to_pixel', [2.0, -1000.0])
+    assert 'l1' in registry.derived_inverse
+    assert 'pixel' not in registry.derived_inverse
+    assert list(registry.round_trip_errors()) == ['l1']
+
+def test_pixel_to_wl_stays_the_fitted_function():
+    registry = CalibrationRegistry()
+    registry.register('wl_to_pixel', [2.0, -1000.0])
+    registry.register('pixel_to_wl', [0.5, 500.0])
+    pixel_to_wl = registry.inverse_function('pixel')
+    assert pixel_to_wl is registry.inverse['pixel'].function
+    assert pixel_to_wl(3000.0) == pytest.approx(2000.0) # far outside the motor wavelength domain
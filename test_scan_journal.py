@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+from acquisitioncontrol.journal import ScanJournal
+from acquisitioncontrol.scanplan import ScanPlan
+
+
+@pytest.fixture
+def plan():
+    return ScanPlan({'y': [0.0, 1.0], 'x': [0.0, 1.0, 2.0]})
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'journals' / 'scan.journal.jsonl')
+
+def test_read_missing_journal(journal_path):
+    summary = ScanJournal.read(journal_path)
+    assert summary['start'] is None and summary['completed'] == set()
+
+def test_read_reports_completed_and_failed_steps(plan, journal_path):
+    journal = ScanJournal(journal_path)
+    journal.start(plan, {'motion_parameters': {}}, axis_order=('y', 'x'))
+    journal.record_step(0, 'done', {'stage_positions': {'x': np.float64(0.0)}})
+    journal.record_step(1, 'failed')
+    journal.record_step(2, 'done', {'stage_positions': {'x': 2.0}})
+    journal.close()
+
+    summary = ScanJournal.read(journal_path)
+    assert summary['start']['plan_hash'] == plan.plan_hash
+    assert summary['start']['axis_order'] == ['y', 'x']
+    assert summary['completed'] == {0, 2}
+    assert summary['failed'] == {1}
+    assert summary['last_state'] == {'stage_positions': {'x': 2.0}}
+    assert not summary['finished']
+
+def test_resume_after_torn_last_line(plan, journal_path):
+    journal = ScanJournal(journal_path)
+    journal.start(plan, {})
+    journal.record_step(0, 'done')
+    journal.record_step(1, 'done')
+    journal.close()
+    with open(journal_path, 'a') as f:
+        f.write('{"event": "step", "index": 2, "sta') # crash mid-write
+
+    summary = ScanJournal.read(journal_path)
+    assert summary['completed'] == {0, 1}
+    pending = [index for index in range(len(plan)) if index not in summary['completed']]
+    assert pending == [2, 3, 4, 5]
+
+    journal = ScanJournal(journal_path)
+    journal.resume(plan, len(pending))
+    for index in pending:
+        journal.record_step(index, 'done')
+    journal.finish([])
+    journal.close()
+
+    with open(journal_path) as f:
+        lines = f.read().splitlines()
+    assert lines[3] == '{"event": "step", "index": 2, "sta' # the torn line stays on its own
+    assert [json.loads(line)['event'] for line in lines[4:]] == ['resume', 'step', 'step', 'step', 'step', 'end']
+    summary = ScanJournal.read(journal_path)
+    assert summary['completed'] == set(range(len(plan)))
+    assert summary['finished']
+
+def test_new_start_supersedes_previous_scan(plan, journal_path):
+    journal = ScanJournal(journal_path)
+    journal.start(plan, {})
+    journal.record_step(0, 'done')
+    journal.finish([])
+    journal.start(plan, {})
+    journal.close()
+
+    summary = ScanJournal.read(journal_path)
+    assert summary['completed'] == set() and not summary['finished']
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+from acquisitioncontrol.acqcontrol import ScanSequenceGenerator
+
+
+def make_acq_ctrl(scan_mode='map'):
+    return SimpleNamespace(
+        scan_mode=scan_mode,
+        motion_parameters={
+            'start_position': {'x': 0.0, 'y': 10.0, 'z': 5.0},
+            'end_position': {'x': 3.0, 'y': 12.0, 'z': 5.0},
+            'resolution': {'x': 1.0, 'y': 1.0, 'z': 1.0},
+        },
+        wavelength_parameters={'start_wavelength': 700.0, 'end_wavelength': 720.0, 'resolution': 10.0},
+        polarization_parameters={'input': {'start_angle': 0.0, 'end_angle': 90.0, 'resolution': 45.0}},
+        adaptive_parameters={},
+        general_parameters={'acquisition_time': 1.0, 'n_frames': 1},
+    )
+
+def materialised_sequence(acq_ctrl):
+    '''The nested-loop list the scan sequence was built as before ScanPlan (wavelength outermost, x innermost).'''
+    generator = ScanSequenceGenerator(acq_ctrl)
+    values = generator._map_axis_values()
+    z = acq_ctrl.motion_parameters['start_position']['z']
+    sequence, prev = [], [None, None, None]
+    for wl in values['wavelength']:
+        for pol in values['polarization']:
+            for y in values['y']:
+                for x in values['x']:
+                    current = [[x, y, z], pol, wl]
+                    sequence.append([current[i] if current[i] != prev[i] else None for i in range(3)])
+                    prev = current
+    return sequence
+
+@pytest.fixture
+def plan():
+    return ScanSequenceGenerator(make_acq_ctrl()).generate_map_sequence(ScanSequenceGenerator.MAP_AXES)
+
+def test_map_plan_length_matches_materialised_sequence(plan):
+    assert len(plan) == len(materialised_sequence(make_acq_ctrl())) == 2 * 2 * 2 * 3
+
+def test_map_plan_steps_match_materialised_sequence(plan):
+    expected = materialised_sequence(make_acq_ctrl())
+    assert [plan[index] for index in range(len(plan))] == expected
+    assert plan.to_list() == expected
+
+def test_negative_and_out_of_range_indices(plan):
+    assert plan.point(-1) == plan.point(len(plan) - 1)
+    assert plan.point(-1) == {'position': [2.0, 11.0, 5.0], 'polarization': 45.0, 'wavelength': 710.0}
+    with pytest.raises(IndexError):
+        plan[len(plan)]
+    with pytest.raises(IndexError):
+        plan[-len(plan) - 1]
+
+def test_generate_scan_sequence_dispatches_on_scan_mode():
+    assert len(ScanSequenceGenerator(make_acq_ctrl('map')).generate_scan_sequence(ScanSequenceGenerator.MAP_AXES)) == 24
+    linescan = ScanSequenceGenerator(make_acq_ctrl('linescan')).generate_scan_sequence()
+    assert len(linescan) == 4 # hypot(3, 2) / 1 = 3 segments
+    assert linescan[0] == [[0.0, 10.0, 5.0], None, None]
+    assert linescan[-1][0] == pytest.approx([3.0, 12.0, 5.0])
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+from acquisitioncontrol.progress import ScanProgressBus, callback_subscriber
+
+
+@pytest.fixture
+def bus():
+    bus = ScanProgressBus(max_rate=1000.0)
+    yield bus
+    bus.close()
+
+def dispatcher_alive():
+    return any(thread.name == 'scan-progress' for thread in threading.enumerate())
+
+def test_progress_is_coalesced_and_events_keep_their_order(bus):
+    delivered = []
+    bus.subscribe(delivered.append)
+    with bus._delivery_lock: # hold deliveries back so everything below is pending at once
+        for step in range(10):
+            bus.progress(step=step)
+        bus.event('status', message='half way')
+        for step in range(10, 20):
+            bus.progress(step=step)
+        bus.event('finished', state='finished')
+    bus.close()
+
+    assert [(event['type'], event.get('step')) for event in delivered] == [
+        ('progress', 9), ('status', None), ('progress', 19), ('finished', None),
+    ]
+
+def test_close_stops_the_dispatcher_and_delivers_pending_events(bus):
+    delivered = []
+    bus.subscribe(delivered.append)
+    bus.progress(step=1)
+    assert dispatcher_alive()
+    bus.close()
+    assert not dispatcher_alive()
+    assert delivered[-1]['step'] == 1
+
+    bus.event('status', message='next scan') # publishing again restarts the dispatcher
+    bus.close()
+    assert not dispatcher_alive()
+    assert delivered[-1]['message'] == 'next scan'
+
+def test_failing_subscriber_does_not_stop_delivery(bus):
+    delivered = []
+    bus.subscribe(lambda event: 1 / 0)
+    bus.subscribe(delivered.append)
+    bus.event('status', message='still delivered')
+    bus.close()
+    assert delivered == [{'type': 'status', 'message': 'still delivered'}]
+
+def test_unsubscribed_callbacks_get_nothing(bus):
+    delivered = []
+    bus.subscribe(delivered.append)
+    bus.unsubscribe(delivered.append)
+    bus.progress(step=1)
+    bus.close()
+    assert delivered == []
+
+def test_callback_subscriber():
+    statuses, percentages = [], []
+    deliver = callback_subscriber(statuses.append, percentages.append)
+    deliver({'type': 'progress', 'percent': 50.0, 'message': 'Step 5/10'})
+    deliver({'type': 'finished', 'state': 'finished'})
+    deliver({'type': 'status', 'message': 'Scan cancelled.'})
+    assert statuses == ['Step 5/10', 'Scan cancelled.']
+    assert percentages == [50.0]
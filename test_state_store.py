@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from instruments_old import Microscope, MotionControl
+from state_store import InstrumentState, StateWriter
+
+
+@pytest.fixture
+def state():
+    state = InstrumentState()
+    state.update_motors({'l1': 100, 'l2': 200, 'g1': 300})
+    return state
+
+def test_move_and_invalidate_motors(state):
+    changes = []
+    state.subscribe(changes.append)
+    version = state.version
+
+    state.move_motors({'l1': 5, 'g1': 0})
+    assert state.motor_positions == {'l1': 105, 'l2': 200, 'g1': 300}
+    state.invalidate_motors(['l2', 'unknown'])
+    assert state.motor_positions == {'l1': 105, 'g1': 300}
+    state.move_motors({'l2': 10}) # moves of motors with no known position are ignored
+    assert 'l2' not in state.motor_positions
+    assert state.version == version + 2
+    assert changes == [['motor_positions'], ['motor_positions']]
+
+    state.invalidate_motors()
+    assert state.motor_positions == {}
+    state.invalidate_motors()
+    assert state.version == version + 3
+
+def test_failing_subscriber_does_not_stop_changes(state):
+    state.subscribe(lambda keys: 1 / 0)
+    state.update_motors({'l1': 1})
+    assert state.motor_positions['l1'] == 1
+
+def test_motors_changed_by_raw_commands(state):
+    motion_control = MotionControl(None, {'l1': '1X', 'l2': '1Y', 'g1': '2X', 'mode': '2A'}, {}, state=state)
+    assert motion_control.motors_changed_by('o1X100 2X-50o') == ['l1', 'g1']
+    assert motion_control.motors_changed_by('s1y0s') == ['l2']
+    assert motion_control.motors_changed_by('w1X200 500.0 10w') == ['l1']
+    assert motion_control.motors_changed_by('h2X') == ['g1']
+    assert motion_control.motors_changed_by('ramanmode') == ['mode']
+    for query in ('g1X 1Yg', 'c1Xc', 'mld0m', 'get_laser_positions', 'h9Q'):
+        assert motion_control.motors_changed_by(query) == []
+
+    motion_control.invalidate_positions('g1X 1Yg')
+    assert set(state.motor_positions) == {'l1', 'l2', 'g1'}
+    motion_control.invalidate_positions('o1X100o')
+    assert set(state.motor_positions) == {'l2', 'g1'}
+
+def test_unknown_positions_are_queried_before_saving(state):
+    queries = []
+    microscope = SimpleNamespace(
+        state=state,
+        motor_map={'l1': '1X', 'l2': '1Y', 'g1': '2X', 'triax': 'T'},
+        controller=SimpleNamespace(report=True),
+        get_all_motor_positions=lambda report=False: queries.append(report) or state.update_motors({'l1': 7}),
+    )
+    Microscope._query_unknown_motor_positions(microscope) # every position known (the TRIAX is not a tracked motor)
+    assert queries == []
+
+    state.invalidate_motors(['l1'])
+    Microscope._query_unknown_motor_positions(microscope)
+    assert queries == [False]
+    assert state.motor_positions['l1'] == 7
+    assert microscope.controller.report is True
+
+def test_state_writer_writes_only_changes(state, tmp_path):
+    filepath = str(tmp_path / 'instrument_state.json')
+    writer = StateWriter(state, filepath, lambda values: {'motor_dict': values['motor_positions']})
+    assert writer.flush()
+    assert not writer.flush()
+    state.set('scan_status', 'running') # not persisted
+    assert not writer.flush()
+    state.invalidate_motors(['g1'])
+    assert writer.flush()
+    with open(filepath) as f:
+        assert json.load(f) == {'motor_dict': {'l1': 100, 'l2': 200}}
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from tracing import DISABLED_TRACER, NULL_SPAN, ScanTracer, tracer_for
+
+
+@pytest.fixture
+def tracer():
+    tracer = ScanTracer(enabled=True)
+    origin = tracer._origin
+    tracer.step = 0
+    tracer.record('wavelength_move', origin + 0.0, origin + 0.5, device='triax')
+    tracer.record('exposure', origin + 0.5, origin + 1.5, device='camera')
+    tracer.step = 1
+    tracer.record('exposure', origin + 1.5, origin + 2.5, device='camera')
+    tracer.record('write', origin + 2.5, origin + 2.6, step=7)
+    return tracer
+
+def test_chrome_trace_has_one_track_per_device(tracer):
+    trace = tracer.chrome_trace()
+    metadata = [event for event in trace['traceEvents'] if event['ph'] == 'M']
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+
+    tracks = {event['args']['name']: event['tid'] for event in metadata}
+    assert set(tracks) == {'triax', 'camera', next(name for name in tracks if name.startswith('thread '))}
+    assert len(set(tracks.values())) == 3
+
+    assert [(event['name'], event['tid'], event['args']['step']) for event in spans] == [
+        ('wavelength_move', tracks['triax'], 0),
+        ('exposure', tracks['camera'], 0),
+        ('exposure', tracks['camera'], 1),
+        ('write', spans[3]['tid'], 7),
+    ]
+    assert spans[1]['ts'] == pytest.approx(0.5e6)
+    assert spans[1]['dur'] == pytest.approx(1e6)
+    assert trace['displayTimeUnit'] == 'ms'
+
+def test_export_chrome_trace_writes_json(tracer, tmp_path):
+    filepath = str(tmp_path / 'traces' / 'scan.trace.json')
+    assert tracer.export_chrome_trace(filepath) == filepath
+    with open(filepath) as f:
+        assert json.load(f) == json.loads(json.dumps(tracer.chrome_trace()))
+
+def test_summary_is_per_phase_and_device(tracer):
+    summary = tracer.summary()
+    assert list(summary) == ['exposure:camera', 'wavelength_move:triax', 'write']
+    assert summary['exposure:camera']['count'] == 2
+    assert summary['exposure:camera']['total'] == pytest.approx(2.0)
+    assert tracer.report().startswith('Scan trace: 3 steps, 2.60 s elapsed') # steps 0, 1 and 7
+
+def test_ring_buffer_keeps_the_latest_spans():
+    tracer = ScanTracer(capacity=3, enabled=True)
+    for index in range(5):
+        tracer.record(f'span{index}', index, index + 1)
+    assert [span['name'] for span in tracer.spans()] == ['span2', 'span3', 'span4']
+
+def test_disabled_tracer_records_nothing():
+    tracer = ScanTracer()
+    assert tracer.span('exposure') is NULL_SPAN
+    with tracer.span('exposure'):
+        pass
+    tracer.record('exposure', 0.0, 1.0)
+    assert tracer.spans() == []
+    assert tracer.chrome_trace()['traceEvents'] == []
+    assert tracer_for(object()) is DISABLED_TRACER
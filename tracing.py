@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class _Span:
+    '''Context manager that records one span in a ScanTracer when it exits.'''
+
+    __slots__ = ('tracer', 'name', 'device', 'step', 'start')
+
+    def __init__(self, tracer, name, device, step):
+        self.tracer = tracer
+        self.name = name
+        self.device = device
+        self.step = step
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.device, self.step)
+        return False
+
+
+class _NullSpan:
+    '''Shared do-nothing span returned while tracing is disabled.'''
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class ScanTracer:
+    '''
+    Records timed spans of the phases of a scan step (stage and wavelength moves, serial waits, exposure, readout,
+    accumulation, metadata, compression and writing) for finding where a step's time goes.
+
+    Each span is tagged with a name, the device it ran on and the scan step index (by default the current `step`,
+    which the scanner sets as each step starts). Spans are kept in a ring buffer of the last `capacity` spans, so
+    tracing a long scan has bounded memory. export_chrome_trace() writes them as Chrome trace JSON, which opens in
+    chrome://tracing or https://ui.perfetto.dev with one track per device, and report() summarises them per phase.
+
+    While `enabled` is False, span() returns a shared no-op context manager and record() returns at once, so the
+    instrumentation left in the scan code costs one attribute check per phase.
+    '''
+
+    def __init__(self, capacity=100_000, enabled=False):
+        self.enabled = enabled
+        self.step = None
+        self._spans = deque(maxlen=capacity) # (name, device, step, start, end, thread id)
+        self._origin = time.perf_counter()
+
+    def span(self, name, device=None, step=None):
+        '''Returns a context manager timing the enclosed block as a span.'''
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, device, self.step if step is None else step)
+
+    def record(self, name, start, end, device=None, step=None):
+        '''Records a span from perf_counter start and end times measured by the caller.'''
+        if not self.enabled:
+            return
+        self._spans.append((name, device, self.step if step is None else step, start, end, threading.get_ident()))
+
+    def clear(self):
+        self._spans.clear()
+        self._origin = time.perf_counter()
+        self.step = None
+
+    def spans(self):
+        '''Returns the recorded spans as dicts with name, device, step, start and duration in seconds (start relative to clear()).'''
+        return [
+            {'name': name, 'device': device, 'step': step, 'start': start - self._origin, 'duration': end - start}
+            for name, device, step, start, end, _ in list(self._spans)
+        ]
+
+    def chrome_trace(self):
+        '''Returns the spans as a Chrome trace event dict, with one track (thread) per device.'''
+        tracks = {}
+        events = []
+        for name, device, step, start, end, thread_id in list(self._spans):
+            track = device if device is not None else f"thread {thread_id}"
+            tid = tracks.setdefault(track, len(tracks) + 1)
+            events.append({
+                'name': name,
+                'cat': track,
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': 1,
+                'tid': tid,
+                'args': {'step': step, 'device': device},
+            })
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': track}}
+            for track, tid in tracks.items()
+        ]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, filepath):
+        '''Writes the Chrome trace JSON to filepath and returns the path.'''
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def summary(self):
+        '''
+        Returns {phase: {'count', 'total', 'mean', 'p95', 'max'}} in seconds, where phase is the span name, or
+        'name:device' for spans tagged with a device. Phases are ordered by total time, largest first.
+        '''
+        durations = {}
+        for name, device, _, start, end, _ in list(self._spans):
+            phase = name if device is None else f"{name}:{device}"
+            durations.setdefault(phase, []).append(end - start)
+
+        summary = {}
+        for phase, values in durations.items():
+            values = np.asarray(values)
+            summary[phase] = {
+                'count': len(values),
+                'total': float(values.sum()),
+                'mean': float(values.mean()),
+                'p95': float(np.percentile(values, 95)),
+                'max': float(values.max()),
+            }
+        return dict(sorted(summary.items(), key=lambda item: item[1]['total'], reverse=True))
+
+    def report(self):
+        '''
+        Formats summary() as a table, with each phase's share of the elapsed time from the first span to the last.
+        Nested phases (e.g. a TRIAX serial wait within a wavelength move) are counted in both, so shares can sum to over 100%.
+        '''
+        summary = self.summary()
+        if not summary:
+            return "Scan trace: no spans recorded."
+        spans = list(self._spans)
+        steps = {step for _, _, step, _, _, _ in spans if step is not None}
+        elapsed = max(max(span[4] for span in spans) - min(span[3] for span in spans), 1e-9)
+        lines = [
+            f"Scan trace: {len(steps)} steps, {elapsed:.2f} s elapsed",
+            f"  {'phase':<30} {'count':>7} {'total (s)':>10} {'share':>6} {'mean (ms)':>10} {'p95 (ms)':>9} {'max (ms)':>9}",
+        ]
+        for phase, stats in summary.items():
+            lines.append(
+                f"  {phase:<30} {stats['count']:>7} {stats['total']:>10.3f} {stats['total'] / elapsed:>6.1%} "
+                f"{stats['mean'] * 1e3:>10.2f} {stats['p95'] * 1e3:>9.2f} {stats['max'] * 1e3:>9.2f}"
+            )
+        return '\n'.join(lines)
+
+
+DISABLED_TRACER = ScanTracer(capacity=1)
+
+
+def tracer_for(interface):
+    '''Returns the scan tracer of an interface's acquisition control, or a disabled tracer before one exists.'''
+    return getattr(getattr(interface, 'acq_ctrl', None), 'tracer', None) or DISABLED_TRACER